@@ -0,0 +1,90 @@
+"""
+Compare storing responses uncompressed, gzipped, or zstd-compressed against a shared dictionary.
+
+Each page is written to its own file, as a response cache would, then all files are read back and decompressed.
+The dictionary is trained on half of the pages and measured on the other half.
+
+Usage::
+
+	python benchmarks/codec_benchmark.py                      # pages recorded in tests/vcr_cassettes
+	python benchmarks/codec_benchmark.py --archive responses.db  # pages from a ResponseArchive
+"""
+
+import argparse
+import glob
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from first_cycling_api.codec import IdentityCodec, GzipCodec, ZstdDictCodec
+
+
+def load_cassette_pages():
+	import yaml
+
+	pages = []
+	for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'tests', 'vcr_cassettes', '*', '*.yaml'))):
+		with open(path) as f:
+			cassette = yaml.load(f, Loader=yaml.Loader)
+		for interaction in cassette['interactions']:
+			body = interaction['response']['body']['string']
+			if 'gzip' in interaction['response']['headers'].get('content-encoding', []):
+				body = gzip.decompress(body)
+			pages.append(body)
+	return pages
+
+
+def load_archive_pages(path, limit):
+	from first_cycling_api.archive import ResponseArchive
+
+	archive = ResponseArchive(path)
+	return [body for *_, body in archive.records(ids=archive.record_ids()[:limit])]
+
+
+def measure(codec, pages, repeat):
+	with tempfile.TemporaryDirectory() as directory:
+		paths = []
+		for i, page in enumerate(pages):
+			paths.append(os.path.join(directory, f'{i}.bin'))
+			with open(paths[-1], 'wb') as f:
+				f.write(codec.compress(page))
+		stored = sum(os.path.getsize(path) for path in paths)
+
+		start = time.perf_counter()
+		for _ in range(repeat):
+			for path in paths:
+				with open(path, 'rb') as f:
+					codec.decompress(f.read())
+		elapsed = time.perf_counter() - start
+
+	raw = sum(len(page) for page in pages)
+	return raw / stored, raw * repeat / elapsed / 1e6
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+	parser.add_argument('--archive', help='Path of a ResponseArchive to take pages from')
+	parser.add_argument('--limit', type=int, default=2000, help='Maximum number of archived pages to use')
+	parser.add_argument('--repeat', type=int, default=20, help='Number of times to read all pages')
+	args = parser.parse_args()
+
+	pages = load_archive_pages(args.archive, args.limit) if args.archive else load_cassette_pages()
+	train, test = pages[::2], pages[1::2]
+	print(f'{len(pages)} pages, {sum(map(len, pages)) / len(pages) / 1e3:.0f} kB on average. Training on {len(train)}, measuring on {len(test)}.\n')
+
+	if len(train) < 100: # zstd needs many samples to train on, so split the few pages available into chunks
+		train = [page[i:i + 8192] for page in train for i in range(0, len(page), 8192)]
+
+	codecs = {'uncompressed': IdentityCodec(), 'gzip': GzipCodec(), 'zstd + dictionary': ZstdDictCodec.train(train)}
+	print(f'{"codec":<20}{"ratio":>8}{"read MB/s":>12}')
+	for name, codec in codecs.items():
+		ratio, throughput = measure(codec, test, args.repeat)
+		print(f'{name:<20}{ratio:>8.1f}{throughput:>12.0f}')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,177 @@
+"""
+Measure how a crawl scales with the number of workers against a local mock of firstcycling.com.
+
+Each run loads the same mix of rider year results, race results and ranking pages through a fresh FirstCyclingAPI
+pointed at benchmarks/mock_server.py, running in its own process. Throttled (429) and failed (5xx) responses are
+retried with exponential backoff, honouring Retry-After. For each worker count, the harness reports pages per second,
+latency percentiles of each page load including retries, the number of 429 and 5xx responses, and where the time went:
+CPU cores used by the client process, and the share of load time spent waiting on the network versus parsing.
+
+Usage::
+
+	python benchmarks/load_test.py --workers 1 2 4 8 16 32 --latency 0.3 --jitter 0.2
+	python benchmarks/load_test.py --mode async --max-rate 20 --throttle-rate 0.02 --failure-rate 0.01
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from first_cycling_api import Rider, RaceEdition, Ranking
+from first_cycling_api.api import FirstCyclingAPI
+from first_cycling_api.batch import map_concurrently
+from first_cycling_api.instrumentation import Metrics
+from first_cycling_api.ratelimit import RateLimiter
+
+from mock_server import serve_in_subprocess
+
+
+def workload(pages):
+	""" Return a mix of page loads, as (kind, ID) pairs, of rider year results, race results and ranking pages in a 2:1:1 ratio. """
+	kinds = ['rider', 'race', 'rider', 'ranking']
+	return [(kinds[i % len(kinds)], i + 1) for i in range(pages)]
+
+
+def load(client, kind, id_):
+	if kind == 'rider':
+		return Rider(id_, client=client).year_results(2020)
+	if kind == 'race':
+		return RaceEdition(id_, 2019, client=client).results()
+	return Ranking(h=1, rank=1, y=2020, page=id_, client=client)
+
+
+def load_with_retries(client, item, max_retries, retry_delay, backoff):
+	""" Load a page, retrying 429 and 5xx responses. """
+	for attempt in range(max_retries + 1):
+		try:
+			return load(client, *item)
+		except requests.HTTPError as e:
+			if attempt == max_retries or e.response.status_code not in (429, 500, 502, 503, 504):
+				raise
+			delay = retry_delay * 2 ** attempt
+			retry_after = e.response.headers.get('Retry-After')
+			if e.response.status_code == 429 and retry_after:
+				delay = max(delay, float(retry_after))
+			with backoff():
+				time.sleep(delay)
+
+
+class Backoff:
+	""" Thread-safe total of seconds spent sleeping between retries. """
+
+	def __init__(self):
+		self.seconds = 0.0
+		self._lock = threading.Lock()
+
+	@contextlib.contextmanager
+	def __call__(self):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			with self._lock:
+				self.seconds += time.perf_counter() - start
+
+
+def run(url, items, workers, mode, rate, max_retries, retry_delay):
+	""" Load every item with workers workers, returning a dict of measurements. """
+	client = FirstCyclingAPI(base_url=url, pool_size=workers, metrics=Metrics(), rate_limiter=RateLimiter(rate) if rate else None)
+	backoff = Backoff()
+	statuses = requests.get(f'{url}/_stats').json()
+	durations = []
+
+	def timed(item):
+		start = time.perf_counter()
+		try:
+			load_with_retries(client, item, max_retries, retry_delay, backoff)
+			return time.perf_counter() - start
+		finally:
+			durations.append(time.perf_counter() - start)
+
+	async def run_async():
+		semaphore = asyncio.Semaphore(workers)
+		async def bounded(item):
+			async with semaphore:
+				return await asyncio.to_thread(timed, item)
+		return await asyncio.gather(*(bounded(item) for item in items), return_exceptions=True)
+
+	cpu, wall = time.process_time(), time.perf_counter()
+	with client.instrumented():
+		if mode == 'async':
+			results = asyncio.run(run_async())
+		else:
+			results = map_concurrently(timed, items, max_workers=workers, return_exceptions=True)
+	cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+	client._store['session'].close()
+
+	after = requests.get(f'{url}/_stats').json()
+	statuses = {status: count - statuses.get(status, 0) for status, count in after.items()}
+	latencies = np.array([result for result in results if isinstance(result, float)])
+	timings = client.metrics.timings
+	fetch = timings['fetch'].sum if 'fetch' in timings else 0.0
+	parse = sum(histogram.sum for name, histogram in timings.items() if name == 'soup' or name.endswith('._parse_soup'))
+	busy = sum(durations) or 1.0 # Seconds spent loading pages, summed over workers
+
+	return {
+		'workers': workers,
+		'pages/s': len(latencies) / wall,
+		'p50 ms': np.percentile(latencies, 50) * 1e3 if len(latencies) else np.nan,
+		'p95 ms': np.percentile(latencies, 95) * 1e3 if len(latencies) else np.nan,
+		'p99 ms': np.percentile(latencies, 99) * 1e3 if len(latencies) else np.nan,
+		'errors': len(results) - len(latencies),
+		'429s': int(statuses.get('429', 0)),
+		'5xx': sum(count for status, count in statuses.items() if status.startswith('5')),
+		'cpu cores': cpu / wall,
+		'network %': 100 * fetch / busy,
+		'parse %': 100 * parse / busy,
+		'backoff %': 100 * backoff.seconds / busy,
+	}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+	parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32], help='Worker counts to measure')
+	parser.add_argument('--pages', type=int, default=200, help='Number of pages loaded by each run')
+	parser.add_argument('--mode', choices=['batch', 'async'], default='batch',
+		help='Load pages with batch.map_concurrently threads, or with asyncio tasks running loads in threads')
+	parser.add_argument('--rate', type=float, help='Client-side rate limit in requests per second')
+	parser.add_argument('--max-retries', type=int, default=5, help='Retries of each page after 429 or 5xx responses')
+	parser.add_argument('--retry-delay', type=float, default=0.1, help='Seconds before the first retry, doubled on each further retry')
+	parser.add_argument('--latency', type=float, default=0.2, help='Seconds each response is delayed by')
+	parser.add_argument('--jitter', type=float, default=0.1, help='Maximum seconds added to or removed from the latency')
+	parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+	parser.add_argument('--max-rate', type=float, help='Requests per second beyond which the server answers with 429')
+	parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+	parser.add_argument('--retry-after', type=int, default=0, help='Seconds sent in the Retry-After header of 429 responses')
+	parser.add_argument('--json', action='store_true', help='Print one JSON object per run instead of a table')
+	args = parser.parse_args()
+
+	server_options = dict(latency=args.latency, jitter=args.jitter, throttle_rate=args.throttle_rate, max_rate=args.max_rate,
+		failure_rate=args.failure_rate, retry_after=args.retry_after, seed=0)
+	items = workload(args.pages)
+	with serve_in_subprocess(**server_options) as url:
+		load(FirstCyclingAPI(base_url=url), *items[0]) # Warm up imports and parser caches
+		if not args.json:
+			print(f'{args.pages} pages per run, {args.mode} mode, server {server_options}\n')
+		for i, workers in enumerate(args.workers):
+			result = run(url, items, workers, args.mode, args.rate, args.max_retries, args.retry_delay)
+			if args.json:
+				print(json.dumps(result))
+				continue
+			if i == 0:
+				print(''.join(f'{name:>11}' for name in result))
+			print(''.join(f'{value:>11.0f}' if isinstance(value, int) else f'{value:>11.1f}' for value in result.values()))
+
+
+if __name__ == '__main__':
+	main()
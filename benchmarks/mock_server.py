@@ -0,0 +1,260 @@
+"""
+Local stand-in for firstcycling.com serving recorded pages, with configurable latency, jitter, throttling and failures.
+
+Requests for rider.php, race.php and ranking.php are answered with the recorded page for the same query if there is
+one, or else with a recorded page parsed by the same endpoint class, so any rider, race or ranking page can be
+requested. Point a client at it with ``FirstCyclingAPI(base_url=server.url)``.
+
+The counts of responses sent with each status are served as JSON at ``/_stats``.
+
+Usage::
+
+	python benchmarks/mock_server.py --port 8000 --latency 0.2 --jitter 0.1 --throttle-rate 0.05
+"""
+
+import argparse
+import contextlib
+import gzip
+import glob
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from first_cycling_api.archive import resolve_endpoint
+
+
+def load_cassette_records():
+	""" Return (page, params, body) for every response recorded in tests/vcr_cassettes, e.g. ('race.php', {'r': '9'}, b'...'). """
+	import yaml
+
+	records = []
+	for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'tests', 'vcr_cassettes', '*', '*.yaml'))):
+		with open(path) as f:
+			cassette = yaml.load(f, Loader=yaml.Loader)
+		for interaction in cassette['interactions']:
+			body = interaction['response']['body']['string']
+			if 'gzip' in interaction['response']['headers'].get('content-encoding', []):
+				body = gzip.decompress(body)
+			url = urlsplit(interaction['request']['uri'])
+			records.append((url.path.rsplit('/', maxsplit=1)[-1], dict(parse_qsl(url.query)), body))
+	return records
+
+
+class _Server(ThreadingHTTPServer):
+	daemon_threads = True
+
+	def handle_error(self, request, client_address):
+		if not isinstance(sys.exc_info()[1], ConnectionError): # Clients closing kept-alive connections are expected
+			super().handle_error(request, client_address)
+
+
+class MockServer:
+	"""
+	Threaded HTTP server answering firstcycling.com requests with recorded pages.
+
+	Parameters
+	----------
+	records : list[tuple]
+		(page, params, body) of the recorded responses. Defaults to the pages in tests/vcr_cassettes.
+	latency : float
+		Seconds each response is delayed by.
+	jitter : float
+		Maximum seconds added to or removed from latency at random, uniformly.
+	throttle_rate : float
+		Fraction of requests answered with 429 Too Many Requests at random.
+	max_rate : float
+		If given, requests beyond this many per second are answered with 429 Too Many Requests.
+	failure_rate : float
+		Fraction of requests answered with 500 Internal Server Error at random.
+	retry_after : int
+		Seconds sent in the Retry-After header of 429 responses.
+	port : int
+		Port to listen on. If 0, a free port is chosen.
+	seed : int
+		Seed of the random choices of latency, throttling and failures.
+
+	Attributes
+	----------
+	statuses : dict {int : int}
+		Number of responses sent with each status code.
+	"""
+
+	def __init__(self, records=None, latency=0.0, jitter=0.0, throttle_rate=0.0, max_rate=None, failure_rate=0.0, retry_after=1, port=0, seed=None):
+		self.latency = latency
+		self.jitter = jitter
+		self.throttle_rate = throttle_rate
+		self.max_rate = max_rate
+		self.failure_rate = failure_rate
+		self.retry_after = retry_after
+		self.statuses = {}
+		self._random = random.Random(seed)
+		self._lock = threading.Lock()
+		self._tokens = max_rate or 0
+		self._updated = time.monotonic()
+
+		self._pages = {}
+		self._fallbacks = {}
+		for page, params, body in load_cassette_records() if records is None else records:
+			self._pages[(page, self._key(params))] = body
+			self._fallbacks.setdefault(resolve_endpoint(page, params), []).append(body)
+
+		self._server = _Server(('127.0.0.1', port), self._handler_class())
+		self._thread = None
+
+	@staticmethod
+	def _key(params):
+		return tuple(sorted((k, str(v)) for k, v in params.items()))
+
+	@property
+	def url(self):
+		""" Base URL to give FirstCyclingAPI. """
+		host, port = self._server.server_address[:2]
+		return f'http://{host}:{port}'
+
+	def page(self, page, params):
+		""" Return the body served for page and params, or None if there is no recorded page of the same kind. """
+		body = self._pages.get((page, self._key(params)))
+		if body is not None:
+			return body
+		fallbacks = self._fallbacks.get(resolve_endpoint(page, params))
+		return fallbacks[zlib.crc32(repr(self._key(params)).encode()) % len(fallbacks)] if fallbacks else None
+
+	def _status(self):
+		""" Choose the status of the next response and its delay. """
+		with self._lock:
+			delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+			if self.max_rate is not None:
+				now = time.monotonic()
+				self._tokens = min(self.max_rate, self._tokens + (now - self._updated) * self.max_rate)
+				self._updated = now
+				if self._tokens < 1:
+					return 429, delay
+				self._tokens -= 1
+			draw = self._random.random()
+		if draw < self.failure_rate:
+			return 500, delay
+		if draw < self.failure_rate + self.throttle_rate:
+			return 429, delay
+		return 200, delay
+
+	def _count(self, status):
+		with self._lock:
+			self.statuses[status] = self.statuses.get(status, 0) + 1
+
+	def _handler_class(self):
+		server = self
+
+		class Handler(BaseHTTPRequestHandler):
+			protocol_version = 'HTTP/1.1' # Keep connections alive so the client's connection pool is exercised
+
+			def do_GET(self):
+				url = urlsplit(self.path)
+				if url.path == '/_stats':
+					with server._lock:
+						body = json.dumps(server.statuses).encode()
+					self.send_response(200)
+					self.send_header('Content-Type', 'application/json')
+					self.send_header('Content-Length', str(len(body)))
+					self.end_headers()
+					self.wfile.write(body)
+					return
+
+				status, delay = server._status()
+				body = server.page(url.path.rsplit('/', maxsplit=1)[-1], dict(parse_qsl(url.query)))
+				if body is None:
+					status = 404
+				time.sleep(delay)
+				if status != 200:
+					body = self.responses[status][0].encode()
+
+				self.send_response(status)
+				self.send_header('Content-Type', 'text/html; charset=utf-8')
+				self.send_header('Content-Length', str(len(body)))
+				if status == 429:
+					self.send_header('Retry-After', str(server.retry_after))
+				self.end_headers()
+				self.wfile.write(body)
+				server._count(status)
+
+			def log_message(self, format, *args):
+				pass
+
+		return Handler
+
+	def start(self):
+		""" Serve requests in a background thread. """
+		self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		""" Stop serving and close the socket. """
+		self._server.shutdown()
+		self._server.server_close()
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc_info):
+		self.stop()
+
+
+@contextlib.contextmanager
+def serve_in_subprocess(**kwargs):
+	"""
+	Run a MockServer in a separate process, so its CPU time is not counted against the client being measured.
+
+	Parameters
+	----------
+	**kwargs
+		Parameters of MockServer, except records.
+
+	Yields
+	------
+	str
+		Base URL of the server.
+	"""
+	args = [sys.executable, __file__, '--port', str(kwargs.pop('port', 0))]
+	for name, value in kwargs.items():
+		if value is not None:
+			args += [f'--{name.replace("_", "-")}', str(value)]
+	process = subprocess.Popen(args, stdout=subprocess.PIPE, text=True)
+	try:
+		yield process.stdout.readline().split()[-1]
+	finally:
+		process.terminate()
+		process.wait()
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+	parser.add_argument('--port', type=int, default=8000, help='Port to listen on, or 0 for any free port')
+	parser.add_argument('--latency', type=float, default=0.0, help='Seconds each response is delayed by')
+	parser.add_argument('--jitter', type=float, default=0.0, help='Maximum seconds added to or removed from the latency')
+	parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+	parser.add_argument('--max-rate', type=float, help='Requests per second beyond which requests are answered with 429')
+	parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+	parser.add_argument('--retry-after', type=int, default=1, help='Seconds sent in the Retry-After header of 429 responses')
+	parser.add_argument('--seed', type=int, help='Seed of the random choices of latency, throttling and failures')
+	args = parser.parse_args()
+
+	server = MockServer(latency=args.latency, jitter=args.jitter, throttle_rate=args.throttle_rate, max_rate=args.max_rate,
+		failure_rate=args.failure_rate, retry_after=args.retry_after, port=args.port, seed=args.seed)
+	print(f'Serving recorded pages on {server.url}', flush=True)
+	try:
+		server._server.serve_forever()
+	except KeyboardInterrupt:
+		server._server.server_close()
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,139 @@
+"""
+Measure the cost of moving parsed endpoints between processes.
+
+Each recorded page is parsed, then pickled and unpickled four ways: with its BeautifulSoup tree, as endpoints used to
+be; with the raw response, as inside keep_responses; with only the parsed fields, as endpoints pickle by default; and
+with pickle protocol 5 out-of-band buffers (to_frames). The size of the raw response is shown for comparison.
+Finally, a process pool parses every page and sends the endpoints back at the executor's default protocol, and the
+time over parsing alone is the IPC cost per endpoint.
+
+Usage::
+
+	python benchmarks/pickle_benchmark.py
+	python benchmarks/pickle_benchmark.py --archive responses.db --limit 500
+"""
+
+import argparse
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from first_cycling_api.archive import ResponseArchive, resolve_endpoint
+from first_cycling_api.endpoints import keep_responses, to_frames, from_frames
+
+from mock_server import load_cassette_records
+
+sys.setrecursionlimit(100000) # Deep soups exceed the default limit when pickled
+
+
+class WithSoup:
+	""" Wrapper pickling an endpoint with every attribute, including its soup. """
+
+	def __init__(self, endpoint):
+		self.endpoint = endpoint
+
+	def __reduce__(self):
+		return _restore_with_soup, (type(self.endpoint), vars(self.endpoint))
+
+
+def _restore_with_soup(cls, state):
+	endpoint = cls.__new__(cls)
+	vars(endpoint).update(state)
+	return endpoint
+
+
+def load_archive_records(path, limit):
+	archive = ResponseArchive(path)
+	return [(url.rsplit('/', maxsplit=1)[-1], params, body) for _, url, params, _, body in archive.records(ids=archive.record_ids()[:limit])]
+
+
+def parse(record, mode='none'):
+	page, params, body = record
+	sys.setrecursionlimit(100000)
+	endpoint = resolve_endpoint(page, params)(body)
+	return None if mode == 'none' else WithSoup(endpoint) if mode == 'soup' else WithResponse(endpoint) if mode == 'response' else endpoint
+
+
+class WithResponse:
+	""" Wrapper pickling an endpoint with its raw response. """
+
+	def __init__(self, endpoint):
+		self.endpoint = endpoint
+
+	def __reduce_ex__(self, protocol):
+		with keep_responses():
+			return _identity, (pickle.dumps(self.endpoint, protocol=protocol),)
+
+
+def _identity(data):
+	return pickle.loads(data)
+
+
+def _dumps_with_response(endpoint):
+	with keep_responses():
+		return pickle.dumps(endpoint, protocol=pickle.DEFAULT_PROTOCOL)
+
+
+def measure(endpoints, dumps, loads, repeat):
+	""" Return the mean size in kB and the mean microseconds to pickle and unpickle an endpoint. """
+	size = sum(len(memoryview(frame)) for endpoint in endpoints for frame in _frames(dumps(endpoint)))
+	start = time.perf_counter()
+	for _ in range(repeat):
+		for endpoint in endpoints:
+			loads(dumps(endpoint))
+	elapsed = time.perf_counter() - start
+	return size / len(endpoints) / 1e3, elapsed / repeat / len(endpoints) * 1e6
+
+
+def _frames(data):
+	return data if isinstance(data, list) else [data]
+
+
+def measure_pool(records, mode, processes):
+	""" Return the mean milliseconds to parse a page in a worker process and return the result. """
+	with ProcessPoolExecutor(max_workers=processes) as executor:
+		list(executor.map(parse, records[:processes], [mode] * processes)) # Start workers and import parsers
+		start = time.perf_counter()
+		list(executor.map(parse, records, [mode] * len(records)))
+		return (time.perf_counter() - start) / len(records) * processes * 1e3
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+	parser.add_argument('--archive', help='Path of a ResponseArchive to take pages from')
+	parser.add_argument('--limit', type=int, default=500, help='Maximum number of archived pages to use')
+	parser.add_argument('--repeat', type=int, default=5, help='Number of times to pickle every endpoint')
+	parser.add_argument('--processes', type=int, default=2, help='Number of worker processes')
+	parser.add_argument('--pool-pages', type=int, default=100, help='Number of pages parsed by the process pool')
+	args = parser.parse_args()
+
+	records = load_archive_records(args.archive, args.limit) if args.archive else load_cassette_records()
+	endpoints = [parse(record, mode='endpoint') for record in records]
+	print(f'{len(endpoints)} endpoints, {sum(len(endpoint.response) for endpoint in endpoints) / len(endpoints) / 1e3:.1f} kB of HTML each\n')
+
+	methods = {
+		'with soup': (lambda endpoint: pickle.dumps(WithSoup(endpoint), protocol=pickle.DEFAULT_PROTOCOL), pickle.loads),
+		'with response': (_dumps_with_response, pickle.loads),
+		'fields only': (lambda endpoint: pickle.dumps(endpoint, protocol=pickle.DEFAULT_PROTOCOL), pickle.loads),
+		'out-of-band': (to_frames, from_frames),
+	}
+	print(f'{"pickle":<14}{"kB":>8}{"µs round trip":>16}')
+	for name, (dumps, loads) in methods.items():
+		size, micros = measure(endpoints, dumps, loads, args.repeat)
+		print(f'{name:<14}{size:>8.1f}{micros:>16.0f}')
+
+	pool_records = [records[i % len(records)] for i in range(args.pool_pages)]
+	baseline = measure_pool(pool_records, 'none', args.processes)
+	print(f'\n{"process pool":<14}{"ms/page":>8}{"IPC ms":>16}')
+	print(f'{"parse only":<14}{baseline:>8.2f}{"":>16}')
+	for mode, name in (('soup', 'with soup'), ('response', 'with response'), ('endpoint', 'fields only')):
+		total = measure_pool(pool_records, mode, args.processes)
+		print(f'{name:<14}{total:>8.2f}{total - baseline:>16.2f}')
+
+
+if __name__ == '__main__':
+	main()
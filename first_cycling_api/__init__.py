@@ -7,5 +7,7 @@ An unofficial Python API wrapper for https://firstcycling.com/.
 
 from .rider import Rider
 from .race import Race, RaceEdition
-from .ranking import Ranking
+from .ranking import Ranking, RankingHistory, PointsRanking
+from .calendar import Calendar
+from .team import Team
 from .constants import Country, Profile, Classification
\ No newline at end of file
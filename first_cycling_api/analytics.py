@@ -0,0 +1,294 @@
+"""
+Analytics
+=========
+
+Provides head-to-head and rivalry statistics for every pair of riders in a set of results.
+
+Results are stored as a sparse race by rider matrix, so records for all pairs of riders in a season are computed at once
+with sparse matrix operations rather than by joining results tables rider by rider. Requires scipy.
+
+Examples
+--------
+>>> matrix = ResultsMatrix.from_race_results({(race_id, 2023): RaceEdition(race_id, 2023).results() for race_id in race_ids})
+>>> matrix.head_to_head(18655).head()
+>>> matrix.rivalries(min_races=5).head()
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+def parse_gap(time):
+	"""
+	Convert a results table time to the gap to the winner in seconds.
+
+	Parameters
+	----------
+	time : str
+		Time from a results table, e.g. '+ 01:12'. The winner's time, without a leading '+', is a gap of 0.
+
+	Returns
+	-------
+	float
+		Gap in seconds, or NaN if time is missing.
+	"""
+	if not isinstance(time, str) or not time.strip():
+		return np.nan
+	if not time.strip().startswith('+'):
+		return 0.
+	seconds = 0.
+	for part in time.strip().lstrip('+').strip().split(':'):
+		seconds = seconds * 60 + float(part)
+	return seconds
+
+
+class ResultsMatrix:
+	"""
+	Finishing positions of riders in a set of races, stored as a sparse race by rider matrix.
+
+	Riders who did not finish a race (DNF, DNS, ...) are ranked together behind all finishers of that race.
+
+	Parameters
+	----------
+	results : pd.DataFrame
+		Results in long format with Race, Rider_ID and Pos columns, and optionally Gap (seconds behind the winner)
+		and Rider (rider name) columns. Race can hold any hashable race key.
+
+	Attributes
+	----------
+	races : pd.Index
+		Race keys, in the order of the matrix rows.
+	riders : pd.Index
+		Rider IDs, in the order of the matrix columns.
+	rider_names : pd.Series
+		Maps Rider_ID to rider name, if names were given.
+	ranks : scipy.sparse.csr_matrix
+		Finishing position of each rider in each race, 0 where the rider did not take part.
+	gaps : scipy.sparse.csr_matrix
+		Seconds behind the winner, stored only for finishers with a time, and 0 for the winner.
+	"""
+
+	def __init__(self, results):
+		results = results.drop_duplicates(['Race', 'Rider_ID']).reset_index(drop=True)
+		race_codes, self.races = pd.factorize(results['Race'])
+		rider_codes, self.riders = pd.factorize(results['Rider_ID'])
+		self.riders.name = 'Rider_ID'
+		self.rider_names = results.drop_duplicates('Rider_ID').set_index('Rider_ID')['Rider'] if 'Rider' in results else pd.Series(dtype=object, name='Rider')
+
+		positions = pd.to_numeric(results['Pos'], errors='coerce').to_numpy(dtype=float)
+		finishers = pd.Series(positions).groupby(race_codes).transform('max').fillna(0).to_numpy()
+		ranks = np.where(np.isnan(positions), finishers + 1, positions)
+
+		shape = (len(self.races), len(self.riders))
+		self._race_codes, self._rider_codes, self._ranks = race_codes, rider_codes, ranks
+		self.ranks = sp.csr_matrix((ranks, (race_codes, rider_codes)), shape=shape)
+
+		gaps = results['Gap'].to_numpy(dtype=float) if 'Gap' in results else np.full(len(results), np.nan)
+		self._gaps = np.where(np.isnan(positions), np.nan, gaps)
+		timed = ~np.isnan(self._gaps)
+		self.gaps = sp.csr_matrix((self._gaps[timed], (race_codes[timed], rider_codes[timed])), shape=shape)
+
+		self._pairs = None
+		self._matrices = {} # Pairwise matrices, computed on first use
+
+	@classmethod
+	def from_race_results(cls, results):
+		"""
+		Build the matrix from race results tables.
+
+		Parameters
+		----------
+		results : dict
+			Maps race keys, e.g. (race_id, year, stage_num), to RaceEditionResults or their results_table.
+
+		Returns
+		-------
+		ResultsMatrix
+		"""
+		frames = []
+		for race, table in results.items():
+			table = getattr(table, 'results_table', table)
+			if table is None or table.empty or 'Rider_ID' not in table:
+				continue
+			frame = table[[col for col in ('Rider_ID', 'Rider', 'Pos') if col in table]].assign(Race=[race] * len(table))
+			if 'Time' in table:
+				gaps = table['Time'].map(parse_gap)
+				finished = pd.to_numeric(table['Pos'], errors='coerce').notna()
+				frame['Gap'] = gaps.where(finished).ffill().where(finished) # Blank times are the same time as the rider ahead
+			frames.append(frame)
+		return cls(pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Race', 'Rider_ID', 'Pos']))
+
+	@classmethod
+	def from_rider_results(cls, results):
+		"""
+		Build the matrix from riders' year results tables.
+
+		Races are matched across riders by year, race name and date, since stages of a race share the same Race_ID.
+		Rider year results hold no times, so gaps are not available.
+
+		Parameters
+		----------
+		results : dict
+			Maps (rider_id, year) to RiderYearResults or their results_df.
+
+		Returns
+		-------
+		ResultsMatrix
+		"""
+		frames = []
+		for (rider_id, year), table in results.items():
+			table = getattr(table, 'results_df', table)
+			if table is None or table.empty:
+				continue
+			races = list(zip([year] * len(table), table['Race'], table['Date'].astype(str)))
+			frames.append(pd.DataFrame({'Race': races, 'Rider_ID': rider_id, 'Pos': table['Pos'].to_numpy()}))
+		return cls(pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Race', 'Rider_ID', 'Pos']))
+
+	def co_participation(self):
+		"""
+		Count the races each pair of riders took part in together.
+
+		Returns
+		-------
+		scipy.sparse.csr_matrix
+			Rider by rider matrix, with the number of races each rider took part in on the diagonal.
+		"""
+		if 'co_participation' not in self._matrices:
+			presence = sp.csr_matrix((np.ones(len(self._ranks), dtype=np.int32), (self._race_codes, self._rider_codes)), shape=self.ranks.shape)
+			self._matrices['co_participation'] = (presence.T @ presence).tocsr()
+		return self._matrices['co_participation']
+
+	def _pair_indices(self):
+		""" Return (ahead, behind, gap) for every pair of riders in the same race, in rider codes, ahead finishing first. """
+		if self._pairs is not None:
+			return self._pairs
+
+		order = np.lexsort((self._ranks, self._race_codes))
+		races, riders, ranks, gaps = self._race_codes[order], self._rider_codes[order], self._ranks[order], self._gaps[order]
+		race_end = np.searchsorted(races, races, side='right')
+
+		# Pair each entry with every entry after it in the same race
+		counts = race_end - np.arange(len(races)) - 1
+		left = np.repeat(np.arange(len(races)), counts)
+		right = left + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+
+		strict = ranks[left] < ranks[right] # Riders tied on rank, e.g. both DNF, are not ranked against each other
+		left, right = left[strict], right[strict]
+		self._pairs = (riders[left], riders[right], gaps[right] - gaps[left])
+		return self._pairs
+
+	def wins(self):
+		"""
+		Count the races each rider finished ahead of each other rider.
+
+		Returns
+		-------
+		scipy.sparse.csr_matrix
+			Rider by rider matrix whose entry (i, j) is the number of races rider i finished ahead of rider j.
+		"""
+		if 'wins' not in self._matrices:
+			ahead, behind, _ = self._pair_indices()
+			shape = (len(self.riders), len(self.riders))
+			self._matrices['wins'] = sp.csr_matrix((np.ones(len(ahead), dtype=np.int32), (ahead, behind)), shape=shape)
+		return self._matrices['wins']
+
+	def gap_totals(self):
+		"""
+		Sum the time gaps between each pair of riders over the races they both finished with a time.
+
+		Returns
+		-------
+		tuple (scipy.sparse.csr_matrix, scipy.sparse.csr_matrix)
+			Rider by rider matrices of the total seconds rider j finished behind rider i (negative if j finished ahead),
+			and of the number of races the total is over.
+		"""
+		if 'gap_totals' not in self._matrices:
+			ahead, behind, gap = self._pair_indices()
+			timed = ~np.isnan(gap)
+			ahead, behind, gap = ahead[timed], behind[timed], gap[timed]
+			shape = (len(self.riders), len(self.riders))
+			totals = sp.csr_matrix((gap, (ahead, behind)), shape=shape)
+			counts = sp.csr_matrix((np.ones(len(gap), dtype=np.int32), (ahead, behind)), shape=shape)
+			self._matrices['gap_totals'] = ((totals - totals.T).tocsr(), (counts + counts.T).tocsr())
+		return self._matrices['gap_totals']
+
+	def head_to_head(self, rider_id):
+		"""
+		Get a rider's record against every rider they raced with.
+
+		Parameters
+		----------
+		rider_id : int
+			Rider ID.
+
+		Returns
+		-------
+		pd.DataFrame
+			Table with opponent Rider_ID, Rider (if names are known), Races, Wins, Losses and Mean_Gap columns, where
+			Mean_Gap is the average number of seconds the opponent finished behind the rider. Sorted by races together.
+		"""
+		i = self.riders.get_loc(rider_id)
+		races = self.co_participation()[i].toarray().ravel()
+		wins = self.wins()
+		totals, counts = self.gap_totals()
+
+		df = pd.DataFrame({
+			'Rider_ID': self.riders,
+			'Races': races,
+			'Wins': wins[i].toarray().ravel(),
+			'Losses': wins[:, i].toarray().ravel(),
+			'Mean_Gap': _safe_divide(totals[i].toarray().ravel(), counts[i].toarray().ravel()),
+		})
+		df = df[(df['Races'] > 0) & (df['Rider_ID'] != rider_id)]
+		if not self.rider_names.empty:
+			df.insert(1, 'Rider', df['Rider_ID'].map(self.rider_names))
+		return df.sort_values(['Races', 'Wins'], ascending=False).reset_index(drop=True)
+
+	def rivalries(self, min_races=1):
+		"""
+		Get head-to-head records for every pair of riders who raced together.
+
+		Parameters
+		----------
+		min_races : int
+			Minimum number of races together for a pair to be included.
+
+		Returns
+		-------
+		pd.DataFrame
+			Table with Rider_ID_A, Rider_ID_B, Races, Wins_A, Wins_B and Mean_Gap columns, where Mean_Gap is the average
+			number of seconds rider B finished behind rider A. Sorted by races together.
+		"""
+		pairs = sp.triu(self.co_participation(), k=1).tocoo()
+		keep = pairs.data >= min_races
+		a, b, races = pairs.row[keep], pairs.col[keep], pairs.data[keep]
+
+		wins = self.wins()
+		totals, counts = self.gap_totals()
+
+		df = pd.DataFrame({
+			'Rider_ID_A': self.riders[a],
+			'Rider_ID_B': self.riders[b],
+			'Races': races,
+			'Wins_A': _values_at(wins, a, b),
+			'Wins_B': _values_at(wins, b, a),
+			'Mean_Gap': _safe_divide(_values_at(totals, a, b), _values_at(counts, a, b)),
+		})
+		if not self.rider_names.empty:
+			df.insert(1, 'Rider_A', df['Rider_ID_A'].map(self.rider_names))
+			df.insert(3, 'Rider_B', df['Rider_ID_B'].map(self.rider_names))
+		return df.sort_values(['Races', 'Rider_ID_A', 'Rider_ID_B'], ascending=[False, True, True]).reset_index(drop=True)
+
+
+def _values_at(matrix, rows, cols):
+	""" Look up the entries of a sparse matrix at pairs of rows and columns. """
+	if len(rows) == 0:
+		return np.zeros(0, dtype=matrix.dtype)
+	return np.asarray(matrix[rows, cols]).ravel()
+
+
+def _safe_divide(totals, counts):
+	""" Divide elementwise, giving NaN where counts is 0. """
+	with np.errstate(divide='ignore', invalid='ignore'):
+		return np.where(counts > 0, totals / np.where(counts > 0, counts, 1), np.nan)
@@ -3,23 +3,173 @@ API
 =========
 
 Provides tools to access the FirstCycling API.
+
+Objects such as Rider and RaceEdition fetch pages through a client. If none is given, they use the client set for
+the current context with use_client, or else the module-level default client fc.
+
+Examples
+--------
+Isolate an interactive client from a bulk crawl running in the same process:
+
+>>> interactive = FirstCyclingAPI(cache=ResponseCache())
+>>> bulk = FirstCyclingAPI(pool_size=32, rate_limiter=RateLimiter(rate=5), metrics=Metrics())
+>>> Rider(18655, client=interactive).year_results(2020)
+>>> with use_client(bulk):
+...     crawl_season(2023)
 """
 
+import contextlib
+import contextvars
+
+import requests
+from requests.adapters import HTTPAdapter
 from slumber import API
 
+from .instrumentation import timer, increment, collect
+from .search import collect as collect_names
+
+DEFAULT_BASE_URL = "https://firstcycling.com"
+
 class FirstCyclingAPI(API):
-    """ Wrapper for FirstCycling API """
-    def __init__(self):
-        super().__init__("https://firstcycling.com", append_slash=False)
-        
+    """
+    Wrapper for FirstCycling API
+
+    Each client owns its HTTP session, response cache, rate limiter and metrics, so clients in the same process
+    can be tuned for different workloads without affecting each other.
+
+    Parameters
+    ----------
+    base_url : str
+        Root URL of the site, e.g. to point the client at a mirror or a test server.
+    pool_size : int
+        Maximum number of connections kept open to the site, which should cover the number of concurrent requests.
+    cache : cache.ResponseCache
+        If given, responses are served from and stored in it.
+    rate_limiter : ratelimit.RateLimiter or ratelimit.RedisRateLimiter
+        If given, limits the rate of requests made by the client.
+    archive : archive.ResponseArchive
+        If given, every fetched response is appended to it.
+    metrics : instrumentation.Metrics
+        If given, records the timings and counters of everything fetched and parsed through the client.
+    prefetcher : prefetch.Prefetcher
+        If given, pages likely to be requested next are fetched in the background.
+    name_index : search.NameIndex
+        If given, the names and IDs in every table parsed through the client are added to it.
+    scheduler : scheduler.RequestScheduler
+        If given, requests wait in it for their turn by priority, and can share its rate limiter with other clients.
+    session : requests.Session
+        Session to make requests with. If given, pool_size is ignored.
+    """
+    def __init__(self, base_url=DEFAULT_BASE_URL, pool_size=10, cache=None, rate_limiter=None, archive=None, metrics=None, prefetcher=None, name_index=None, scheduler=None, session=None):
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        super().__init__(base_url, append_slash=False, session=session)
+        self.cache = cache
+        """ If set, responses are served from and stored in it, e.g. cache.ResponseCache. """
+        self.rate_limiter = rate_limiter
+        """ If set, its acquire() method is called before every request, e.g. ratelimit.RateLimiter. """
+        self.archive = archive
+        """ If set, every response is appended to it, e.g. archive.ResponseArchive. """
+        self.metrics = metrics
+        """ If set, records everything fetched and parsed through the client, e.g. instrumentation.Metrics. """
+        self.prefetcher = prefetcher
+        """ If set, fetches pages likely to be requested next in the background, e.g. prefetch.Prefetcher. """
+        self.name_index = name_index
+        """ If set, collects the names and IDs of every table parsed through the client, e.g. search.NameIndex. """
+        self.scheduler = scheduler
+        """ If set, orders requests by priority before they are sent, e.g. scheduler.RequestScheduler. """
+
     def __getitem__(self, key):
         return getattr(self, key)
-    
+
+    @contextlib.contextmanager
+    def instrumented(self):
+        """ Return a context manager recording instrumented calls and parsed names in its body into the client's metrics and name index, if set. """
+        with contextlib.ExitStack() as stack:
+            if self.metrics is not None:
+                stack.enter_context(collect(self.metrics))
+            if self.name_index is not None:
+                stack.enter_context(collect_names(self.name_index))
+            yield
+
     def _fix_kwargs(self, **kwargs):
         return {k: v for k, v in kwargs.items() if v}
-    
+
     def _get_resource_response(self, resource, **kwargs):
-        return self._store['session'].get(resource.url(), params=self._fix_kwargs(**kwargs)).content
+        with self.instrumented():
+            url = resource.url()
+            params = self._fix_kwargs(**kwargs)
+            content = self.prefetcher.take(url, params, scheduler=self.scheduler) if self.prefetcher is not None else None
+            fetched = content is not None # Served by a prefetch
+            if content is None and self.cache is not None:
+                content = self.cache.get(url, params)
+            if content is None:
+                content = self._fetch(url, params)
+                fetched = True
+            if fetched and self.prefetcher is not None: # A cache hit means the caller is revisiting, not walking on
+                self.prefetcher.schedule(self._fetch, url, params, content, cache=self.cache)
+            return content
+
+    def _fetch(self, url, params):
+        """ Request a page, going through the client's scheduler, rate limiter, archive and cache. """
+        if self.scheduler is not None:
+            return self.scheduler.run(self._send, url, params, caller=self)
+        return self._send(url, params)
+
+    def _send(self, url, params):
+        if self.rate_limiter is not None:
+            with timer('rate_limit'):
+                self.rate_limiter.acquire()
+        with timer('fetch'):
+            response = self._store['session'].get(url, params=params)
+            content = response.content
+        increment('requests')
+        increment('bytes', len(content))
+        response.raise_for_status() # Error pages, e.g. 429 or 500, are neither archived nor cached
+        if self.archive is not None:
+            self.archive.append(url, params, content)
+        if self.cache is not None:
+            self.cache.put(url, params, content)
+        return content
+
+    def _stream(self, url, params, chunk_size):
+        """ Yield the body of a page in chunks as it downloads, going through the client's cache, scheduler, rate limiter and archive. """
+        content = self.cache.get(url, params) if self.cache is not None else None
+        if content is not None:
+            yield content
+            return
+
+        keep = self.archive is not None or self.cache is not None # Otherwise chunks are not held once parsed
+        chunks, size = [], 0
+        with contextlib.ExitStack() as stack:
+            if self.scheduler is not None: # Hold the request's in-flight slot until the body has been read
+                stack.enter_context(self.scheduler.dispatch(url, params, caller=self))
+            with self._open(url, params) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size):
+                    size += len(chunk)
+                    if keep:
+                        chunks.append(chunk)
+                    yield chunk
+        increment('requests')
+        increment('bytes', size)
+        if keep:
+            content = b''.join(chunks)
+            if self.archive is not None:
+                self.archive.append(url, params, content)
+            if self.cache is not None:
+                self.cache.put(url, params, content)
+
+    def _open(self, url, params):
+        """ Send a request and return the response once its headers arrive, without reading the body. """
+        if self.rate_limiter is not None:
+            with timer('rate_limit'):
+                self.rate_limiter.acquire()
+        with timer('fetch'):
+            return self._store['session'].get(url, params=params, stream=True)
 
     def get_rider_endpoint(self, rider_id, **kwargs):
         return self._get_resource_response(self['rider.php'], r=rider_id, **kwargs)
@@ -27,7 +177,46 @@ class FirstCyclingAPI(API):
     def get_race_endpoint(self, race_id, **kwargs):
         return self._get_resource_response(self['race.php'], r=race_id, **kwargs)
 
+    def get_calendar_endpoint(self, **kwargs):
+        return self._get_resource_response(self['race.php'], **kwargs)
+
     def get_ranking_endpoint(self, **kwargs):
         return self._get_resource_response(self['ranking.php'], **kwargs)
 
-fc = FirstCyclingAPI()
\ No newline at end of file
+    def get_team_endpoint(self, team_id, **kwargs):
+        return self._get_resource_response(self['team.php'], l=team_id, **kwargs)
+
+fc = FirstCyclingAPI()
+""" Default client, used by objects given no client outside a use_client context. """
+
+_current_client = contextvars.ContextVar('first_cycling_api_client', default=None)
+
+
+def get_client(client=None):
+    """ Return client if given, else the client set for the current context with use_client, else fc. """
+    if client is not None:
+        return client
+    current = _current_client.get()
+    return current if current is not None else fc
+
+
+@contextlib.contextmanager
+def use_client(client):
+    """
+    Make client the default for objects created without a client in this context.
+
+    The context is inherited by batch.map_concurrently worker threads.
+
+    Parameters
+    ----------
+    client : FirstCyclingAPI
+
+    Yields
+    ------
+    FirstCyclingAPI
+    """
+    token = _current_client.set(client)
+    try:
+        yield client
+    finally:
+        _current_client.reset(token)
@@ -0,0 +1,308 @@
+"""
+Archive
+=========
+
+Provides an append-only archive of raw firstcycling.com responses, and tools to parse it again.
+
+When a parser is fixed, replaying the archive through the current endpoint classes regenerates every parsed output
+without requesting any pages. Clients only archive successful responses, so error pages such as 429 Too Many Requests
+are never replayed as real pages.
+
+Examples
+--------
+Record every response while crawling:
+
+>>> from first_cycling_api.api import fc
+>>> fc.archive = ResponseArchive('responses.db')
+>>> RaceEdition(race_id=9, year=2019).results()
+
+Later, parse everything again on all cores:
+
+.. code-block:: bash
+
+	python -m first_cycling_api.archive responses.db parsed/
+"""
+
+import json
+import os
+import pickle
+import sqlite3
+import time
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+
+from .codec import IdentityCodec, ZstdDictCodec, get_codec
+
+
+def resolve_endpoint(url, params):
+	"""
+	Get the endpoint class which parses the page at url with params.
+
+	Parameters
+	----------
+	url : str
+		Page URL without query string, e.g. 'https://firstcycling.com/race.php'.
+	params : dict
+		Query parameters of the request, e.g. {'r': 9, 'y': 2019}.
+
+	Returns
+	-------
+	type
+		Endpoint class, e.g. RaceEditionResults.
+	"""
+	from .endpoints import Endpoint
+	from .race.endpoints import RaceEndpoint, RaceOverview, RaceYearByYear, RaceYoungestOldestWinners, RaceVictoryTable, RaceStageVictories, RaceEditionResults, RaceStageProfiles
+	from .rider.endpoints import RiderYearResults, RiderTableEndpoint
+	from .ranking.endpoints import RankingEndpoint
+	from .calendar.endpoints import CalendarEndpoint
+	from .team.endpoints import TeamEndpoint
+
+	page = url.rsplit('/', maxsplit=1)[-1]
+	params = {k: str(v) for k, v in params.items()}
+
+	if page == 'rider.php':
+		return RiderYearResults if set(params) <= {'r', 'y'} else RiderTableEndpoint
+
+	if page == 'race.php':
+		if 'r' not in params:
+			return CalendarEndpoint
+		race_tables = {'W': RaceVictoryTable, 'X': RaceYearByYear, 'Y': RaceYoungestOldestWinners, 'Z': RaceStageVictories}
+		if params.get('k') in race_tables:
+			return race_tables[params['k']]
+		if params.get('e') == 'all':
+			return RaceStageProfiles
+		if 'y' not in params:
+			return RaceOverview
+		return RaceEndpoint if 'k' in params else RaceEditionResults # e.g. k=8 for startlists
+
+	if page == 'ranking.php':
+		return RankingEndpoint
+
+	if page == 'team.php':
+		return TeamEndpoint
+
+	return Endpoint
+
+
+class ResponseArchive:
+	"""
+	Append-only archive of raw responses stored in an SQLite database.
+
+	Each record holds the request URL and parameters, the time it was fetched and the response body, compressed with the archive's codec.
+	Assign an archive to FirstCyclingAPI.archive to record every response the client fetches.
+
+	Parameters
+	----------
+	path : str
+		Path of the SQLite database file. The database is created if it does not exist.
+	codec : codec.IdentityCodec, codec.GzipCodec or codec.ZstdDictCodec
+		Codec used to compress new records. Records are always read with the codec they were stored with.
+		Defaults to storing bodies uncompressed.
+	"""
+
+	def __init__(self, path, codec=None):
+		self.path = path
+		self._codecs = {}
+		with closing(self._connect()) as conn:
+			conn.execute('''CREATE TABLE IF NOT EXISTS responses (
+				id INTEGER PRIMARY KEY,
+				url TEXT NOT NULL,
+				params TEXT NOT NULL,
+				fetched_at REAL NOT NULL,
+				body BLOB NOT NULL,
+				codec TEXT NOT NULL DEFAULT 'identity')''')
+			if 'codec' not in [row[1] for row in conn.execute('PRAGMA table_info(responses)')]: # Archive created before codecs
+				conn.execute("ALTER TABLE responses ADD COLUMN codec TEXT NOT NULL DEFAULT 'identity'")
+			conn.execute('CREATE INDEX IF NOT EXISTS responses_key ON responses (url, params, fetched_at)')
+			conn.execute('CREATE TABLE IF NOT EXISTS dictionaries (codec TEXT PRIMARY KEY, data BLOB NOT NULL)')
+		self.set_codec(codec or IdentityCodec())
+
+	def _connect(self):
+		conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+		conn.execute('PRAGMA journal_mode=WAL')
+		return conn
+
+	def __getstate__(self):
+		return {'path': self.path, 'codec': self.codec}
+
+	def __setstate__(self, state):
+		self.__init__(**state)
+
+	def set_codec(self, codec):
+		""" Compress new records with codec, storing its dictionary in the archive if it has one. """
+		if isinstance(codec, ZstdDictCodec):
+			with closing(self._connect()) as conn:
+				conn.execute('INSERT OR IGNORE INTO dictionaries (codec, data) VALUES (?, ?)', (codec.name, codec.dictionary))
+		self.codec = codec
+		self._codecs[codec.name] = codec
+
+	def train_codec(self, samples=500, **kwargs):
+		"""
+		Train a zstd dictionary on archived responses and compress new records with it.
+
+		Parameters
+		----------
+		samples : int
+			Maximum number of archived responses to train on, spread evenly over the archive.
+		**kwargs
+			Further parameters for codec.ZstdDictCodec.train.
+
+		Returns
+		-------
+		codec.ZstdDictCodec
+		"""
+		ids = self.record_ids()
+		ids = ids[::max(1, len(ids) // samples)][:samples]
+		codec = ZstdDictCodec.train([body for *_, body in self.records(ids=ids)], **kwargs)
+		self.set_codec(codec)
+		return codec
+
+	def _decode(self, codec_name, data):
+		if codec_name not in self._codecs:
+			with closing(self._connect()) as conn:
+				row = conn.execute('SELECT data FROM dictionaries WHERE codec = ?', (codec_name,)).fetchone()
+			self._codecs[codec_name] = get_codec(codec_name, dictionary=row[0] if row else None)
+		return self._codecs[codec_name].decompress(data)
+
+	def append(self, url, params, body, fetched_at=None):
+		"""
+		Add a response to the archive.
+
+		Parameters
+		----------
+		url : str
+			Page URL without query string.
+		params : dict
+			Query parameters of the request.
+		body : bytes
+			Raw response body.
+		fetched_at : float
+			Unix time the response was fetched. Defaults to now.
+		"""
+		with closing(self._connect()) as conn:
+			conn.execute('INSERT INTO responses (url, params, fetched_at, body, codec) VALUES (?, ?, ?, ?, ?)',
+				(url, json.dumps(params, sort_keys=True), fetched_at or time.time(), self.codec.compress(body), self.codec.name))
+
+	def latest(self, url, params):
+		""" Return the most recently fetched body for url and params, or None if it was never archived. """
+		with closing(self._connect()) as conn:
+			row = conn.execute('SELECT codec, body FROM responses WHERE url = ? AND params = ? ORDER BY fetched_at DESC LIMIT 1',
+				(url, json.dumps(params, sort_keys=True))).fetchone()
+		return self._decode(*row) if row else None
+
+	def record_ids(self, latest_only=True):
+		"""
+		List the IDs of archived records.
+
+		Parameters
+		----------
+		latest_only : bool
+			If True, only list the most recent record for each URL and parameters.
+
+		Returns
+		-------
+		list[int]
+		"""
+		query = 'SELECT MAX(id) FROM responses GROUP BY url, params ORDER BY 1' if latest_only else 'SELECT id FROM responses ORDER BY id'
+		with closing(self._connect()) as conn:
+			return [row[0] for row in conn.execute(query)]
+
+	def records(self, ids=None, latest_only=True):
+		"""
+		Iterate over archived records.
+
+		Parameters
+		----------
+		ids : list[int]
+			If given, only these records.
+		latest_only : bool
+			If True and ids is None, only the most recent record for each URL and parameters.
+
+		Yields
+		------
+		tuple (int, str, dict, float, bytes)
+			Record ID, URL, parameters, fetch time and body.
+		"""
+		ids = self.record_ids(latest_only=latest_only) if ids is None else ids
+		with closing(self._connect()) as conn:
+			for record_id in ids:
+				url, params, fetched_at, codec_name, body = conn.execute('SELECT url, params, fetched_at, codec, body FROM responses WHERE id = ?', (record_id,)).fetchone()
+				yield record_id, url, json.loads(params), fetched_at, self._decode(codec_name, body)
+
+	def __len__(self):
+		with closing(self._connect()) as conn:
+			return conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+
+def parsed_fields(endpoint):
+	""" Return the parsed attributes of an endpoint, without the raw response and soup. """
+	return {k: v for k, v in vars(endpoint).items() if k not in ('response', 'soup')}
+
+
+def _reparse_records(path, ids, output_dir):
+	""" Parse archived records and write their parsed fields to output_dir. Return the IDs that failed with their errors. """
+	errors = {}
+	for record_id, url, params, fetched_at, body in ResponseArchive(path).records(ids=ids):
+		try:
+			endpoint = resolve_endpoint(url, params)(body)
+		except Exception as e:
+			errors[record_id] = repr(e)
+			continue
+		output = {'url': url, 'params': params, 'fetched_at': fetched_at, 'endpoint': type(endpoint).__name__, 'fields': parsed_fields(endpoint)}
+		with open(os.path.join(output_dir, f'{record_id}.pkl'), 'wb') as f:
+			pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+	return errors
+
+
+def reparse(archive, output_dir, processes=None, chunk_size=50, latest_only=True):
+	"""
+	Parse every archived response again with the current endpoint classes, using a process pool.
+
+	Parameters
+	----------
+	archive : ResponseArchive or str
+		The archive or the path to its database.
+	output_dir : str
+		Directory to write parsed outputs to, one pickle file per record named after the record ID.
+		Each holds a dict with the url, params, fetched_at, endpoint class name and the endpoint's parsed fields.
+	processes : int
+		Number of worker processes. Defaults to the number of CPUs.
+	chunk_size : int
+		Number of records handled by a worker at a time.
+	latest_only : bool
+		If True, only parse the most recent response for each URL and parameters.
+
+	Returns
+	-------
+	dict {int : str}
+		Maps the IDs of records which could not be parsed to the error raised.
+	"""
+	path = archive.path if isinstance(archive, ResponseArchive) else archive
+	os.makedirs(output_dir, exist_ok=True)
+	ids = ResponseArchive(path).record_ids(latest_only=latest_only)
+	chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+
+	errors = {}
+	with ProcessPoolExecutor(max_workers=processes) as executor:
+		for chunk_errors in executor.map(_reparse_records, [path] * len(chunks), chunks, [output_dir] * len(chunks)):
+			errors.update(chunk_errors)
+	return errors
+
+
+def main(argv=None):
+	import argparse
+
+	parser = argparse.ArgumentParser(description='Parse every response in an archive again with the current parsers.')
+	parser.add_argument('archive', help='Path of the archive database')
+	parser.add_argument('output_dir', help='Directory to write parsed outputs to')
+	parser.add_argument('--processes', type=int, help='Number of worker processes')
+	parser.add_argument('--all', action='store_true', help='Parse every archived response, not only the latest for each page')
+	args = parser.parse_args(argv)
+
+	errors = reparse(args.archive, args.output_dir, processes=args.processes, latest_only=not args.all)
+	for record_id, error in errors.items():
+		print(f"Warning: could not parse record {record_id}: {error}")
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,58 @@
+"""
+Batch
+=========
+
+Provides tools to load many endpoints concurrently.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+DEFAULT_MAX_WORKERS = 8
+""" Default number of requests to keep in flight at once. """
+
+
+def map_concurrently(func, items, max_workers=DEFAULT_MAX_WORKERS, progress=None, return_exceptions=False):
+	"""
+	Call func on each item using a pool of threads.
+
+	Parameters
+	----------
+	func : callable
+		Function taking a single item, e.g. ``lambda n: edition.results(stage_num=n)``.
+	items : iterable
+		Items to call func on.
+	max_workers : int
+		Maximum number of calls to run at once.
+	progress : callable
+		If given, called as ``progress(done, total, item)`` each time a call finishes.
+	return_exceptions : bool
+		If True, exceptions raised by func are returned in place of the result instead of being raised.
+
+	Returns
+	-------
+	list
+		Results of func, in the same order as items.
+	"""
+	items = list(items)
+	results = [None] * len(items)
+	if not items:
+		return results
+
+	with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+		# Run each call in a copy of the caller's context so context-scoped settings (e.g. instrumentation.collect) apply
+		futures = {executor.submit(contextvars.copy_context().run, func, item): i for i, item in enumerate(items)}
+		for done, future in enumerate(as_completed(futures), start=1):
+			i = futures[future]
+			try:
+				results[i] = future.result()
+			except Exception as e:
+				if not return_exceptions:
+					for f in futures:
+						f.cancel()
+					raise
+				results[i] = e
+			if progress:
+				progress(done, len(items), items[i])
+
+	return results
@@ -0,0 +1,92 @@
+"""
+Cache
+=========
+
+Provides an in-memory cache of responses for API clients.
+
+Examples
+--------
+>>> client = FirstCyclingAPI(cache=ResponseCache(max_entries=500, ttl=3600))
+>>> Rider(18655, client=client).year_results(2020) # Fetched
+>>> Rider(18655, client=client).year_results(2020) # Served from the cache
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from .instrumentation import record_cache_lookup
+
+
+class ResponseCache:
+	"""
+	Thread-safe least recently used cache of response bodies, keyed on URL and query parameters.
+
+	Parameters
+	----------
+	max_entries : int
+		Maximum number of responses kept. The least recently used response is evicted first.
+	ttl : float
+		Seconds after which a cached response is stale and fetched again. If None, responses never go stale.
+	"""
+
+	def __init__(self, max_entries=1024, ttl=None):
+		self.max_entries = max_entries
+		self.ttl = ttl
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	@staticmethod
+	def _key(url, params):
+		return url, json.dumps(params, sort_keys=True, default=str)
+
+	def get(self, url, params):
+		"""
+		Look up a response, counting the lookup as a cache hit or miss.
+
+		Parameters
+		----------
+		url : str
+			Page URL without query string.
+		params : dict
+			Query parameters of the request.
+
+		Returns
+		-------
+		bytes
+			Cached response body, or None if it is not cached or is stale.
+		"""
+		key = self._key(url, params)
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+				del self._entries[key]
+				entry = None
+			if entry is not None:
+				self._entries.move_to_end(key)
+		record_cache_lookup(entry is not None)
+		return entry[1] if entry is not None else None
+
+	def __contains__(self, item):
+		""" Check whether a fresh response is cached for a (url, params) pair, without counting a lookup. """
+		with self._lock:
+			entry = self._entries.get(self._key(*item))
+		return entry is not None and (self.ttl is None or time.monotonic() - entry[0] <= self.ttl)
+
+	def put(self, url, params, content):
+		""" Store a response body for url and params. """
+		key = self._key(url, params)
+		with self._lock:
+			self._entries[key] = (time.monotonic(), content)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+
+	def clear(self):
+		""" Remove all cached responses. """
+		with self._lock:
+			self._entries.clear()
+
+	def __len__(self):
+		return len(self._entries)
@@ -0,0 +1,14 @@
+"""
+Calendar
+========
+
+Access the list of races taking place in a season.
+
+Examples
+--------
+>>> from first_cycling_api.constants import one_day_categories
+>>> Calendar(y=2023, t=1).races(categories=one_day_categories)[['Date', 'Race', 'CAT', 'Race_ID']].head()
+
+"""
+
+from .calendar import Calendar
@@ -0,0 +1,34 @@
+from .endpoints import CalendarEndpoint
+from ..api import get_client
+
+class Calendar:
+	"""
+	Object to retrieve race calendar pages.
+
+	Examples
+	--------
+	>>> Calendar(y=2023, t=1)
+	<first_cycling_api.calendar.endpoints.CalendarEndpoint at 0x295caddccd0>
+	"""
+	def __new__(cls, client=None, **kwargs):
+		"""
+		Obtain a race calendar endpoint.
+
+		Parameters
+		----------
+		client : FirstCyclingAPI
+			Client to fetch the page with. If None, uses the client set with api.use_client, or else api.fc.
+		y : int
+			The season for which to list races, e.g. 2023.
+		t : int
+			The race category group to list, as in the calendar page URL on firstcycling.com.
+		m : int
+			If given, only list races in that month (1-12).
+
+		Returns
+		-------
+		CalendarEndpoint
+		"""
+		client = get_client(client)
+		with client.instrumented():
+			return CalendarEndpoint(client.get_calendar_endpoint(**kwargs))
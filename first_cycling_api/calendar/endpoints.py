@@ -0,0 +1,44 @@
+from ..endpoints import ParsedEndpoint
+from ..parser import parse_table
+
+
+class CalendarEndpoint(ParsedEndpoint):
+	"""
+	Race calendar page response.
+
+	Attributes
+	----------
+	table : pd.DataFrame
+		Table of races in the calendar, including the Race_ID and CAT of each race.
+	"""
+
+	_regions = [('table', {'class': 'tablesorter'})]
+
+	def _parse_soup(self):
+		self._get_calendar_table()
+
+	def _get_calendar_table(self):
+		calendar_table = self.soup.find('table', {'class': 'tablesorter sort'})
+		if not calendar_table:
+			calendar_table = self.soup.find('table', {'class': 'tablesorter'})
+		self.table = parse_table(calendar_table)
+
+	def races(self, categories=None):
+		"""
+		Get races in the calendar, optionally filtered by category.
+
+		Parameters
+		----------
+		categories : list[str]
+			UCI categories to keep, e.g. constants.uci_categories or constants.one_day_categories.
+			If None, keeps all races.
+
+		Returns
+		-------
+		pd.DataFrame
+		"""
+		if self.table is None:
+			return None
+		if categories is None or 'CAT' not in self.table:
+			return self.table
+		return self.table[self.table['CAT'].isin(categories)].reset_index(drop=True)
@@ -0,0 +1,147 @@
+"""
+Codecs
+=========
+
+Provides codecs to compress stored responses.
+
+Pages on firstcycling.com share most of their markup (header, menus, sidebar), so a zstd dictionary trained on sample
+pages compresses each page far better than compressing it alone. The ZstdDictCodec requires the optional zstandard package.
+
+Examples
+--------
+>>> codec = ZstdDictCodec.train(sample_pages)
+>>> archive = ResponseArchive('responses.db', codec=codec)
+"""
+
+import gzip
+import threading
+
+
+class IdentityCodec:
+	""" Codec which stores bodies uncompressed. """
+	name = 'identity'
+
+	def compress(self, data):
+		return data
+
+	def decompress(self, data):
+		return data
+
+
+class GzipCodec:
+	"""
+	Codec compressing each body separately with gzip.
+
+	Parameters
+	----------
+	level : int
+		Compression level from 1 to 9.
+	"""
+	name = 'gzip'
+
+	def __init__(self, level=6):
+		self.level = level
+
+	def compress(self, data):
+		return gzip.compress(data, compresslevel=self.level)
+
+	def decompress(self, data):
+		return gzip.decompress(data)
+
+
+class ZstdDictCodec:
+	"""
+	Codec compressing each body with zstd against a shared dictionary.
+
+	Parameters
+	----------
+	dictionary : bytes
+		Raw zstd dictionary, e.g. from ZstdDictCodec.train(...).dictionary.
+	level : int
+		Compression level from 1 to 22.
+
+	Attributes
+	----------
+	name : str
+		'zstd-dict:' followed by the dictionary ID, so stored bodies can be matched with their dictionary.
+	"""
+
+	def __init__(self, dictionary, level=9):
+		zstandard = _import_zstandard()
+		self.dictionary = dictionary
+		self.level = level
+		self._dict_data = zstandard.ZstdCompressionDict(dictionary)
+		self.name = f'zstd-dict:{self._dict_data.dict_id()}'
+		self._local = threading.local() # Compressor objects must not be shared between threads
+
+	@classmethod
+	def train(cls, samples, dict_size=112640, level=9):
+		"""
+		Train a dictionary on sample responses.
+
+		Parameters
+		----------
+		samples : list[bytes]
+			Sample response bodies, ideally a few hundred pages of the kinds that will be stored.
+		dict_size : int
+			Size of the dictionary in bytes.
+		level : int
+			Compression level from 1 to 22.
+
+		Returns
+		-------
+		ZstdDictCodec
+		"""
+		zstandard = _import_zstandard()
+		return cls(zstandard.train_dictionary(dict_size, list(samples)).as_bytes(), level=level)
+
+	def __getstate__(self):
+		return {'dictionary': self.dictionary, 'level': self.level}
+
+	def __setstate__(self, state):
+		self.__init__(**state)
+
+	def compress(self, data):
+		if not hasattr(self._local, 'compressor'):
+			self._local.compressor = _import_zstandard().ZstdCompressor(level=self.level, dict_data=self._dict_data, write_content_size=True)
+		return self._local.compressor.compress(data)
+
+	def decompress(self, data):
+		if not hasattr(self._local, 'decompressor'):
+			self._local.decompressor = _import_zstandard().ZstdDecompressor(dict_data=self._dict_data)
+		# The content size is stored in each frame, so the output is allocated once at its final size
+		return self._local.decompressor.decompress(data)
+
+
+def _import_zstandard():
+	try:
+		import zstandard
+	except ImportError as e:
+		raise ImportError('ZstdDictCodec requires the zstandard package. Install it with `pip install zstandard`.') from e
+	return zstandard
+
+
+def get_codec(name, dictionary=None):
+	"""
+	Get a codec from its name.
+
+	Parameters
+	----------
+	name : str
+		Codec name, e.g. 'gzip' or 'zstd-dict:1234'.
+	dictionary : bytes
+		Raw zstd dictionary, required for 'zstd-dict' codecs.
+
+	Returns
+	-------
+	IdentityCodec, GzipCodec or ZstdDictCodec
+	"""
+	if name in (None, '', IdentityCodec.name):
+		return IdentityCodec()
+	if name == GzipCodec.name:
+		return GzipCodec()
+	if name.startswith('zstd-dict:'):
+		if dictionary is None:
+			raise ValueError(f'Codec {name} requires its dictionary.')
+		return ZstdDictCodec(dictionary)
+	raise ValueError(f'Unknown codec {name}.')
@@ -0,0 +1,63 @@
+"""
+Crawl
+=========
+
+Provides tools to crawl many pages of firstcycling.com.
+"""
+
+import os
+
+from .batch import map_concurrently, DEFAULT_MAX_WORKERS
+from .calendar import Calendar
+from .constants import uci_categories
+from .race import RaceEdition
+from .race.endpoints import RaceEditionResults
+
+
+def crawl_season(year, categories=uci_categories, max_workers=DEFAULT_MAX_WORKERS, checkpoint_dir=None, progress=None, **calendar_kwargs):
+	"""
+	Load the results of every race in a season concurrently.
+
+	Parameters
+	----------
+	year : int
+		The season to crawl.
+	categories : list[str]
+		UCI categories of races to crawl, e.g. constants.one_day_categories.
+		If None, crawls every race in the calendar.
+	max_workers : int
+		Maximum number of race pages to request at once.
+	checkpoint_dir : str
+		If given, the raw response for each race is saved in this directory as soon as it is loaded.
+		Races already saved there are parsed from disk instead of requested again, so an interrupted crawl can be resumed by calling crawl_season again with the same directory.
+	progress : callable
+		If given, called as ``progress(done, total, race_id)`` each time a race finishes.
+	**calendar_kwargs
+		Further parameters for Calendar, e.g. t.
+
+	Returns
+	-------
+	dict {int : RaceEditionResults or Exception}
+		Maps race IDs to their results. Races which failed to load map to the exception raised, and are retried on the next run.
+	"""
+	races = Calendar(y=year, **calendar_kwargs).races(categories=categories)
+	race_ids = [] if races is None else list(dict.fromkeys(int(race_id) for race_id in races['Race_ID'].dropna()))
+
+	if checkpoint_dir:
+		os.makedirs(checkpoint_dir, exist_ok=True)
+
+	def crawl_race(race_id):
+		path = os.path.join(checkpoint_dir, f'{year}_{race_id}.html') if checkpoint_dir else None
+		if path and os.path.exists(path):
+			with open(path, 'rb') as f:
+				return RaceEditionResults(f.read())
+
+		results = RaceEdition(race_id, year).results()
+		if path:
+			with open(path + '.tmp', 'wb') as f:
+				f.write(results.response)
+			os.replace(path + '.tmp', path)
+		return results
+
+	results = map_concurrently(crawl_race, race_ids, max_workers=max_workers, progress=progress, return_exceptions=True)
+	return dict(zip(race_ids, results))
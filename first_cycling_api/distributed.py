@@ -0,0 +1,262 @@
+"""
+Distributed
+===========
+
+Provides a Redis task queue so crawl jobs can be shared by workers on several machines.
+
+Producers add tasks to a CrawlJob using a RedisTaskQueue, and each machine runs workers which pull tasks from the queue,
+load and parse them with the usual endpoint classes, and write the responses back to Redis.
+A RedisRateLimiter keeps the combined request rate of all workers under a global limit.
+
+Examples
+--------
+On the producer:
+
+>>> job = CrawlJob(queue=RedisTaskQueue('redis://queue-host:6379/0'))
+>>> for year in range(2000, 2023):
+...     job.add(RaceEdition(9, year), 'results')
+
+On each worker machine:
+
+.. code-block:: bash
+
+	python -m first_cycling_api.distributed redis://queue-host:6379/0 --workers 8 --rate 5
+
+Once the queue is empty, on any machine:
+
+>>> {task['args'][1]: endpoint.results_table for task, endpoint in job.results()}
+"""
+
+import json
+import time
+
+from .jobs import CrawlJob, _work
+from .ratelimit import RedisRateLimiter
+
+
+def _decode(value):
+	return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisTaskQueue:
+	"""
+	Task queue stored on a Redis server, with the same interface as jobs.SQLiteTaskQueue.
+
+	Parameters
+	----------
+	redis : str or redis.Redis
+		Redis URL, e.g. 'redis://localhost:6379/0', or a Redis-compatible client such as fakeredis.FakeRedis.
+	name : str
+		Prefix for the Redis keys used by the queue, so several jobs can share a server.
+	lease : float
+		Seconds after which a running task is assumed to belong to a killed worker and may be claimed again.
+	"""
+
+	def __init__(self, redis, name='first_cycling_api:job', lease=600):
+		self.url, self._client = (redis, None) if isinstance(redis, str) else (None, redis)
+		self.name = name
+		self.lease = lease
+
+	@property
+	def client(self):
+		if self._client is None:
+			import redis
+			self._client = redis.Redis.from_url(self.url)
+		return self._client
+
+	def __getstate__(self):
+		if self.url is None:
+			raise TypeError('RedisTaskQueue can only be sent to other processes when created from a Redis URL.')
+		return {**vars(self), '_client': None}
+
+	def _key(self, *parts):
+		return ':'.join([self.name, *map(str, parts)])
+
+	def put(self, object_path, args, method, kwargs):
+		""" Add a task to the queue, unless an identical task was already added. Return the task ID. """
+		key = json.dumps([object_path, list(args), method, kwargs], sort_keys=True)
+
+		def add(pipe):
+			task_id = pipe.hget(self._key('keys'), key)
+			if task_id is not None:
+				return int(task_id)
+			task_id = pipe.incr(self._key('seq')) # A retried transaction leaves a gap in the IDs, which tasks() skips
+			pipe.multi()
+			pipe.hset(self._key('keys'), key, task_id)
+			pipe.hset(self._key('task', task_id), mapping={
+				'id': task_id, 'object': object_path, 'args': json.dumps(list(args)), 'method': method,
+				'kwargs': json.dumps(kwargs, sort_keys=True), 'status': 'pending', 'attempts': 0,
+			})
+			pipe.rpush(self._key('pending'), task_id)
+			return task_id
+
+		# Deduplicated and queued at once, so a producer killed halfway leaves no task that is never run
+		return self._transaction(add, self._key('keys'))
+
+	def _transaction(self, func, *watch):
+		""" Call func(pipe) in a WATCH/MULTI transaction on the watch keys, retrying until no other client changed them. """
+		from redis.exceptions import WatchError
+
+		with self.client.pipeline() as pipe:
+			while True:
+				try:
+					pipe.watch(*watch)
+					result = func(pipe)
+					pipe.execute()
+					return result
+				except WatchError:
+					continue
+
+	def _requeue_due(self, max_retries=3):
+		""" Move tasks whose backoff has expired, and running tasks whose lease has expired, back to pending. """
+		now = time.time()
+		for zset, cutoff in (('delayed', now), ('running', now - self.lease)):
+			def requeue(pipe):
+				task_ids = pipe.zrangebyscore(self._key(zset), '-inf', cutoff)
+				attempts = [int(pipe.hget(self._key('task', _decode(task_id)), 'attempts')) for task_id in task_ids]
+				pipe.multi()
+				for task_id, attempt in zip(task_ids, attempts): # Only one worker's transaction goes through if several find the same tasks
+					pipe.zrem(self._key(zset), task_id)
+					if zset == 'running': # The killed worker's run counts as a failed attempt
+						attempt += 1
+						pipe.hincrby(self._key('task', _decode(task_id)), 'attempts', 1)
+					if attempt < max_retries or zset == 'delayed':
+						pipe.hset(self._key('task', _decode(task_id)), 'status', 'pending')
+						pipe.rpush(self._key('pending'), task_id)
+					else:
+						pipe.hset(self._key('task', _decode(task_id)), mapping={'status': 'failed', 'error': 'Lease expired'})
+						pipe.sadd(self._key('failed'), task_id)
+			self._transaction(requeue, self._key(zset))
+
+	def claim(self, max_retries=3):
+		"""
+		Mark the next available task as running and return it, or return None if no task is available.
+
+		A running task whose lease has expired counts as a failed attempt, as its worker was killed while running it,
+		and is marked failed instead of claimed once it has failed max_retries times.
+		"""
+		self._requeue_due(max_retries)
+
+		def take(pipe):
+			task_id = pipe.lindex(self._key('pending'), 0)
+			pipe.multi()
+			if task_id is not None: # Removed from pending and leased at once, so a killed worker's task is reclaimed
+				pipe.lpop(self._key('pending'))
+				pipe.zadd(self._key('running'), {task_id: time.time()})
+				pipe.hset(self._key('task', _decode(task_id)), 'status', 'running')
+			return task_id
+
+		task_id = self._transaction(take, self._key('pending'))
+		return self._get_task(_decode(task_id)) if task_id is not None else None
+
+	def complete(self, task_id, endpoint_path, response):
+		""" Mark a task as done and store its endpoint class and raw response. """
+		with self.client.pipeline() as pipe:
+			pipe.hset(self._key('task', task_id), mapping={'status': 'done', 'error': '', 'endpoint': endpoint_path, 'response': response})
+			pipe.zrem(self._key('running'), task_id)
+			pipe.sadd(self._key('done'), task_id)
+			pipe.execute()
+
+	def fail(self, task_id, error, max_retries=3, retry_delay=1.0):
+		""" Record a failed attempt at a task. The task is retried with exponential backoff until it has failed max_retries times. """
+		attempts = self.client.hincrby(self._key('task', task_id), 'attempts', 1)
+		with self.client.pipeline() as pipe: # Leased until the whole update is applied, so a killed worker loses no task
+			pipe.zrem(self._key('running'), task_id)
+			if attempts < max_retries:
+				pipe.hset(self._key('task', task_id), mapping={'status': 'pending', 'error': error})
+				pipe.zadd(self._key('delayed'), {task_id: time.time() + retry_delay * 2 ** (attempts - 1)})
+			else:
+				pipe.hset(self._key('task', task_id), mapping={'status': 'failed', 'error': error})
+				pipe.sadd(self._key('failed'), task_id)
+			pipe.execute()
+
+	def retry_failed(self):
+		""" Move all failed tasks back to pending. """
+		for task_id in self.client.smembers(self._key('failed')):
+			if self.client.srem(self._key('failed'), task_id):
+				self.client.hset(self._key('task', _decode(task_id)), mapping={'status': 'pending', 'attempts': 0})
+				self.client.rpush(self._key('pending'), task_id)
+
+	def counts(self):
+		""" Return the number of tasks with each status. """
+		counts = {
+			'pending': self.client.llen(self._key('pending')) + self.client.zcard(self._key('delayed')),
+			'running': self.client.zcard(self._key('running')),
+			'done': self.client.scard(self._key('done')),
+			'failed': self.client.scard(self._key('failed')),
+		}
+		return {status: n for status, n in counts.items() if n}
+
+	def has_unfinished(self):
+		""" Return True if any task is still pending or running. """
+		counts = self.counts()
+		return bool(counts.get('pending') or counts.get('running'))
+
+	def tasks(self, status=None):
+		""" Iterate over tasks, optionally only those with the given status. """
+		if status in ('done', 'failed'):
+			task_ids = sorted(int(task_id) for task_id in self.client.smembers(self._key(status)))
+		else:
+			task_ids = range(1, int(self.client.get(self._key('seq')) or 0) + 1)
+		for task_id in task_ids:
+			task = self._get_task(task_id)
+			if task and (status is None or task['status'] == status):
+				yield task
+
+	def _get_task(self, task_id):
+		raw = self.client.hgetall(self._key('task', task_id))
+		if not raw:
+			return None
+		task = {_decode(k): v for k, v in raw.items()}
+		task.update({k: _decode(task[k]) for k in task if k != 'response'})
+		task['id'] = int(task['id'])
+		task['attempts'] = int(task['attempts'])
+		task['args'] = json.loads(task['args'])
+		task['kwargs'] = json.loads(task['kwargs'])
+		task['error'] = task.get('error') or None
+		return task
+
+
+def run_worker(queue, workers=4, rate_limiter=None, max_retries=3, retry_delay=1.0, poll_interval=1.0):
+	"""
+	Process tasks from a shared queue until it is empty.
+
+	Parameters
+	----------
+	queue : RedisTaskQueue
+		Queue to pull tasks from.
+	workers : int
+		Number of worker threads on this machine.
+	rate_limiter : ratelimit.RedisRateLimiter
+		If given, limits the combined rate of requests made by all workers using the same limiter.
+	max_retries : int
+		Number of attempts at a task before it is marked as failed.
+	retry_delay : float
+		Seconds to wait before the first retry of a task. Doubles with each further attempt.
+	poll_interval : float
+		Seconds an idle worker waits before checking for tasks again.
+
+	Returns
+	-------
+	dict {str : int}
+		Number of tasks with each status once the queue is empty.
+	"""
+	return CrawlJob(queue=queue).run(workers=workers, max_retries=max_retries, retry_delay=retry_delay, poll_interval=poll_interval, rate_limiter=rate_limiter)
+
+
+def main(argv=None):
+	import argparse
+
+	parser = argparse.ArgumentParser(description='Run crawl workers pulling tasks from a shared Redis queue.')
+	parser.add_argument('redis_url', help='URL of the Redis server holding the queue, e.g. redis://localhost:6379/0')
+	parser.add_argument('--name', default='first_cycling_api:job', help='Prefix of the queue keys')
+	parser.add_argument('--workers', type=int, default=4, help='Number of worker threads')
+	parser.add_argument('--rate', type=float, help='Maximum number of requests per second across all workers sharing the server')
+	args = parser.parse_args(argv)
+
+	rate_limiter = RedisRateLimiter(args.redis_url, args.rate, name=args.name + ':ratelimit') if args.rate else None
+	print(run_worker(RedisTaskQueue(args.redis_url, name=args.name), workers=args.workers, rate_limiter=rate_limiter))
+
+
+if __name__ == '__main__':
+	main()
@@ -3,12 +3,26 @@ Endpoints
 =========
 
 Provides classes for API objects.
+
+Parsed endpoints pickle with only their parsed fields, so sending them between processes costs a fraction of the
+raw HTML. Inside keep_responses, or with to_frames(obj, keep_response=True), the response is pickled too and the soup
+is rebuilt from it when next accessed. With pickle protocol 5, the response and the numeric columns of DataFrames are
+transferred as out-of-band buffers, e.g. with to_frames and from_frames.
 """
 
 import bs4
+import contextlib
+import contextvars
+import copy
 import json
+import pickle
 import pandas as pd
 import datetime
+import functools
+
+from .instrumentation import timer, muted
+
+_pickle_responses = contextvars.ContextVar('first_cycling_api_pickle_responses', default=False)
 
 
 class Endpoint:
@@ -25,6 +39,29 @@ class Endpoint:
 		self.response = response
 		""" Raw response from firstcycling.com. """
 
+	@classmethod
+	def from_bytes(cls, response, **kwargs):
+		"""
+		Parse an endpoint from a raw response without side effects.
+
+		Parsing runs in an empty context with instrumentation muted, so neither metrics nor name indexes collecting in
+		the caller's context nor hooks added with instrumentation.add_hook record it. Safe to call in any worker of a
+		process pool, Dask or Spark.
+
+		Parameters
+		----------
+		response : bytes or bytes-like
+			Raw response from firstcycling.com.
+		**kwargs
+			Further parameters of the endpoint class, e.g. full_tree.
+
+		Returns
+		-------
+		Endpoint
+			Instance of the class the method is called on, e.g. RaceEditionResults.from_bytes(body).
+		"""
+		return contextvars.Context().run(_parse_muted, cls, bytes(response), kwargs)
+
 	def _to_json(self):
 		return vars(self).copy()
 
@@ -33,17 +70,194 @@ class Endpoint:
 		return json.dumps(self, default=ComplexHandler)
 
 
+class MissingResponseError(AttributeError):
+	""" Raised when the soup of an endpoint pickled without its response is accessed. """
+
+
 class ParsedEndpoint(Endpoint):
-	def __init__(self, response):
+	"""
+	Endpoint parsed from its HTML response. Extends Endpoint.
+
+	Only the regions of the page listed in the _regions attribute of each class are built into the soup.
+	A class which defines _parse_soup without declaring _regions gets the full tree.
+
+	Parameters
+	----------
+	response : bytes
+		Raw response from firstcycling.com.
+	full_tree : bool
+		If True, build the soup for the whole page instead of only the regions the endpoint reads.
+	"""
+
+	_regions = ()
+	""" Regions of the page read by _parse_soup, as (tag name, attrs) pairs, e.g. ('table', {'class': 'tablesorter'}). """
+
+	def __init__(self, response, full_tree=False):
 		super().__init__(response)
-		self._parse_result()
+		self._parse_result(full_tree=full_tree)
+
+	def __init_subclass__(cls, **kwargs):
+		super().__init_subclass__(**kwargs)
+		# Time each parsing step, e.g. RaceEditionResults._get_results_table
+		for name, attr in list(vars(cls).items()):
+			if name.startswith('_get_') and callable(attr):
+				setattr(cls, name, _timed_step(f'{cls.__name__}.{name}', attr))
+
+	@classmethod
+	def _page_regions(cls):
+		""" Return the regions read by every parsing step of the class, or None if any step needs the full tree. """
+		regions = []
+		for klass in cls.__mro__:
+			if klass is not ParsedEndpoint and '_parse_soup' in vars(klass):
+				if '_regions' not in vars(klass):
+					return None
+				regions.extend(klass._regions)
+		return regions
 
-	def _parse_result(self):
-		self.soup = bs4.BeautifulSoup(self.response, 'html.parser')
-		self._parse_soup()
+	def _parse_result(self, full_tree=False):
+		regions = None if full_tree else self._page_regions()
+		with timer('soup'):
+			parse_only = _RegionFilter(regions) if regions else None
+			self.soup = bs4.BeautifulSoup(self.response, 'html.parser', parse_only=parse_only)
+		with timer(f'{type(self).__name__}._parse_soup'):
+			self._parse_soup()
 	def _parse_soup(self):
 		return
 
+	def __getattr__(self, name):
+		# The soup is not pickled, so rebuild it from the response, if that was pickled, the first time it is accessed
+		if name == 'soup' and vars(self).get('response') is not None:
+			regions = self._page_regions()
+			self.soup = bs4.BeautifulSoup(self.response, 'html.parser', parse_only=_RegionFilter(regions) if regions else None)
+			return self.soup
+		if name == 'soup':
+			raise MissingResponseError(f'{type(self).__name__} has no soup because it was pickled without its response. '
+				'Pickle it inside keep_responses(), or with to_frames(obj, keep_response=True), to rebuild the soup later.')
+		raise AttributeError(f'{type(self).__name__!r} object has no attribute {name!r}')
+
+	def __copy__(self):
+		endpoint = type(self).__new__(type(self))
+		vars(endpoint).update(vars(self))
+		return endpoint
+
+	def __deepcopy__(self, memo):
+		# Copies keep their response, unlike pickles, and rebuild the soup from it when accessed
+		endpoint = type(self).__new__(type(self))
+		memo[id(self)] = endpoint
+		vars(endpoint).update({k: copy.deepcopy(v, memo) for k, v in vars(self).items() if k != 'soup'})
+		return endpoint
+
+	def __reduce_ex__(self, protocol):
+		keep_response = _pickle_responses.get()
+		state = {k: v for k, v in vars(self).items() if k != 'soup' and (k != 'response' or keep_response)}
+		if protocol >= 5 and isinstance(state.get('response'), bytes):
+			state['response'] = pickle.PickleBuffer(state['response'])
+		return _restore_endpoint, (type(self), state)
+
+
+def _parse_muted(cls, response, kwargs):
+	with muted():
+		return cls(response, **kwargs)
+
+
+def _restore_endpoint(cls, state):
+	""" Recreate a pickled endpoint from its parsed fields without parsing it again. """
+	endpoint = cls.__new__(cls)
+	if state.get('response') is not None and not isinstance(state['response'], bytes): # Out-of-band buffer
+		state['response'] = bytes(state['response'])
+	state.setdefault('response', None)
+	vars(endpoint).update(state)
+	return endpoint
+
+
+@contextlib.contextmanager
+def keep_responses():
+	"""
+	Pickle parsed endpoints with their raw response in this context.
+
+	Unpickled endpoints then rebuild their soup from the response when it is accessed. Otherwise their response is
+	None and they have no soup.
+	"""
+	token = _pickle_responses.set(True)
+	try:
+		yield
+	finally:
+		_pickle_responses.reset(token)
+
+
+def to_frames(obj, keep_response=False):
+	"""
+	Pickle endpoints, or any object containing them, with pickle protocol 5 out-of-band buffers.
+
+	Numeric DataFrame columns, and responses if kept, are not copied into the pickle but returned as separate frames,
+	which can be sent as they are, e.g. with socket.sendmsg or multiprocessing.connection.Connection.send_bytes.
+
+	Parameters
+	----------
+	obj : object
+		Object to pickle, e.g. a RaceEditionResults or a dict of them.
+	keep_response : bool
+		If True, the raw responses are pickled too, so the soup can be rebuilt after unpickling.
+
+	Returns
+	-------
+	list
+		The pickle followed by the out-of-band buffers, as bytes-like objects.
+	"""
+	buffers = []
+	with keep_responses() if keep_response else contextlib.nullcontext():
+		data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+	return [data] + [buffer.raw() for buffer in buffers]
+
+
+def from_frames(frames):
+	""" Unpickle an object pickled with to_frames from its frames. """
+	return pickle.loads(frames[0], buffers=frames[1:])
+
+
+def _tag_in_regions(regions, name, attrs):
+	""" Check whether a tag with name and raw attrs starts one of the regions. """
+	for region_name, region_attrs in regions:
+		if name != region_name:
+			continue
+		if not region_attrs:
+			return True
+		for key, value in region_attrs.items():
+			tag_value = attrs.get(key)
+			if tag_value is None:
+				break
+			tag_values = tag_value.split() if isinstance(tag_value, str) else list(tag_value)
+			if key == 'class' and value not in tag_values or key != 'class' and value != tag_value:
+				break
+		else:
+			return True
+	return False
+
+
+if hasattr(bs4, 'ElementFilter'): # Beautiful Soup 4.13+
+	class _RegionFilter(bs4.ElementFilter):
+		""" Filter keeping only the tags which start a region, with all of their contents. """
+		def __init__(self, regions):
+			super().__init__()
+			self.regions = regions
+
+		def allow_tag_creation(self, nsprefix, name, attrs):
+			return _tag_in_regions(self.regions, name, attrs or {})
+
+		def allow_string_creation(self, string):
+			return False
+else:
+	def _RegionFilter(regions):
+		return bs4.SoupStrainer(lambda name, attrs: _tag_in_regions(regions, name, dict(attrs)))
+
+
+def _timed_step(name, func):
+	@functools.wraps(func)
+	def timed_step(*args, **kwargs):
+		with timer(name):
+			return func(*args, **kwargs)
+	return timed_step
+
 
 def ComplexHandler(obj):
 	"""
@@ -0,0 +1,232 @@
+"""
+Instrumentation
+===============
+
+Provides timing hooks around fetching and parsing pages.
+
+Timings are recorded for each request ('fetch'), BeautifulSoup construction ('soup'), each step of an endpoint's parsing
+(e.g. 'RaceEditionResults._get_results_table'), and the pd.read_html and column post-processing stages of parse_table.
+Bytes transferred and response cache hits and misses are counted as well.
+When no collector or hook is active, the hooks cost a single context variable lookup.
+
+Examples
+--------
+>>> with collect() as metrics:
+...     RaceEdition(race_id=9, year=2019).results()
+>>> metrics.to_dict()['timings']['fetch']['count']
+1
+>>> print(metrics.to_prometheus())
+"""
+
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+""" Upper bounds in seconds of the latency histogram buckets. """
+
+_collectors = contextvars.ContextVar('first_cycling_api_collectors', default=())
+_hooks = []
+_muted = contextvars.ContextVar('first_cycling_api_muted', default=False)
+_null_timer = contextlib.nullcontext()
+
+
+class Histogram:
+	"""
+	Latency histogram with fixed buckets.
+
+	Attributes
+	----------
+	buckets : tuple[float]
+		Upper bounds of the buckets in seconds.
+	counts : list[int]
+		Number of observations in each bucket, with a final bucket for observations above the last bound.
+	count : int
+		Total number of observations.
+	sum : float
+		Sum of all observations in seconds.
+	"""
+
+	def __init__(self, buckets=DEFAULT_BUCKETS):
+		self.buckets = tuple(buckets)
+		self.counts = [0] * (len(self.buckets) + 1)
+		self.count = 0
+		self.sum = 0.0
+
+	def observe(self, value):
+		self.counts[bisect.bisect_left(self.buckets, value)] += 1
+		self.count += 1
+		self.sum += value
+
+	def to_dict(self):
+		return {'count': self.count, 'sum': self.sum, 'buckets': dict(zip([*self.buckets, float('inf')], self.counts))}
+
+
+class Metrics:
+	"""
+	Collector of latency histograms and counters.
+
+	Attributes
+	----------
+	timings : dict {str : Histogram}
+		Latency histogram for each instrumented stage.
+	counters : dict {str : float}
+		Counters such as 'requests', 'bytes', 'cache_hits' and 'cache_misses'.
+	"""
+
+	def __init__(self, buckets=DEFAULT_BUCKETS):
+		self.buckets = buckets
+		self.timings = {}
+		self.counters = {}
+		self._lock = threading.Lock()
+
+	def observe(self, name, seconds):
+		""" Record a duration for the stage name. """
+		with self._lock:
+			if name not in self.timings:
+				self.timings[name] = Histogram(self.buckets)
+			self.timings[name].observe(seconds)
+
+	def increment(self, name, value=1):
+		""" Add value to the counter name. """
+		with self._lock:
+			self.counters[name] = self.counters.get(name, 0) + value
+
+	def reset(self):
+		""" Clear all recorded metrics. """
+		with self._lock:
+			self.timings = {}
+			self.counters = {}
+
+	def to_dict(self):
+		""" Return recorded metrics as a dict with 'timings' and 'counters'. """
+		with self._lock:
+			return {'timings': {name: h.to_dict() for name, h in self.timings.items()}, 'counters': dict(self.counters)}
+
+	def to_prometheus(self, prefix='first_cycling_api'):
+		""" Return recorded metrics in the Prometheus text exposition format. """
+		with self._lock:
+			lines = [f'# TYPE {prefix}_duration_seconds histogram']
+			for name, h in sorted(self.timings.items()):
+				cumulative = 0
+				for bound, count in zip([*h.buckets, '+Inf'], h.counts):
+					cumulative += count
+					lines.append(f'{prefix}_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+				lines.append(f'{prefix}_duration_seconds_sum{{stage="{name}"}} {h.sum}')
+				lines.append(f'{prefix}_duration_seconds_count{{stage="{name}"}} {h.count}')
+			for name, value in sorted(self.counters.items()):
+				lines.append(f'# TYPE {prefix}_{name}_total counter')
+				lines.append(f'{prefix}_{name}_total {value}')
+			return '\n'.join(lines) + '\n'
+
+
+@contextlib.contextmanager
+def collect(metrics=None):
+	"""
+	Record metrics for all instrumented calls made in this context.
+
+	The context is inherited by batch.map_concurrently worker threads, so concurrent loads are included.
+
+	Parameters
+	----------
+	metrics : Metrics
+		Collector to record into. If None, a new one is created.
+
+	Yields
+	------
+	Metrics
+	"""
+	metrics = metrics if metrics is not None else Metrics()
+	if metrics in _collectors.get(): # Already collecting into it, e.g. a client's metrics around nested calls
+		yield metrics
+		return
+	token = _collectors.set(_collectors.get() + (metrics,))
+	try:
+		yield metrics
+	finally:
+		_collectors.reset(token)
+
+
+def add_hook(callback):
+	"""
+	Register a callback for all instrumented calls in the process.
+
+	Parameters
+	----------
+	callback : callable
+		Called as ``callback(kind, name, value)`` where kind is 'timing' (value in seconds) or 'counter'.
+	"""
+	_hooks.append(callback)
+
+def remove_hook(callback):
+	""" Unregister a callback added with add_hook. """
+	_hooks.remove(callback)
+
+
+@contextlib.contextmanager
+def muted():
+	"""
+	Record nothing for instrumented calls made in this context, not even into process-wide hooks.
+
+	Collectors entered inside the context record as usual.
+	"""
+	token = _muted.set(True)
+	try:
+		yield
+	finally:
+		_muted.reset(token)
+
+
+def _active_hooks():
+	return () if not _hooks or _muted.get() else _hooks
+
+
+def enabled():
+	""" Return True if any collector or hook is active. """
+	return bool(_collectors.get() or _active_hooks())
+
+
+class _Timer:
+	__slots__ = ('name', 'start')
+
+	def __init__(self, name):
+		self.name = name
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, *exc_info):
+		record_timing(self.name, time.perf_counter() - self.start)
+
+
+def timer(name):
+	""" Return a context manager recording the duration of its body as stage name. """
+	if not _collectors.get() and not _active_hooks():
+		return _null_timer
+	return _Timer(name)
+
+
+def record_timing(name, seconds):
+	""" Record a duration for the stage name. """
+	for metrics in _collectors.get():
+		metrics.observe(name, seconds)
+	for callback in _active_hooks():
+		callback('timing', name, seconds)
+
+
+def increment(name, value=1):
+	""" Add value to the counter name. """
+	if not _collectors.get() and not _active_hooks():
+		return
+	for metrics in _collectors.get():
+		metrics.increment(name, value)
+	for callback in _active_hooks():
+		callback('counter', name, value)
+
+
+def record_cache_lookup(hit):
+	""" Count a response cache hit or miss. Called by response caches. """
+	increment('cache_hits' if hit else 'cache_misses')
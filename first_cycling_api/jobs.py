@@ -0,0 +1,320 @@
+"""
+Jobs
+=========
+
+Provides resumable crawl jobs backed by a persistent task queue.
+
+Examples
+--------
+>>> job = CrawlJob('crawl.db')
+>>> for year in range(2015, 2023):
+...     job.add(Rider(18655), 'year_results', year=year)
+>>> job.run(workers=4)
+>>> {task['kwargs']['year']: endpoint.results_df for task, endpoint in job.results()}
+"""
+
+import contextvars
+import copy
+import importlib
+import json
+import sqlite3
+import time
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from .ratelimit import RateLimiter
+
+
+def _class_path(cls):
+	return f'{cls.__module__}.{cls.__qualname__}'
+
+def _load_class(path):
+	module, name = path.rsplit('.', maxsplit=1)
+	return getattr(importlib.import_module(module), name)
+
+
+class SQLiteTaskQueue:
+	"""
+	Persistent queue of endpoint fetches stored in an SQLite database.
+
+	Each task records the object, endpoint method and parameters to call, its status ('pending', 'running', 'done' or 'failed'),
+	the number of attempts so far and, once done, the endpoint class and raw response so the result can be parsed again without a request.
+
+	Parameters
+	----------
+	path : str
+		Path of the SQLite database file. The database is created if it does not exist.
+	lease : float
+		Seconds after which a running task is assumed to belong to a killed worker and may be claimed again.
+	"""
+
+	def __init__(self, path, lease=600):
+		self.path = path
+		self.lease = lease
+		with closing(self._connect()) as conn:
+			conn.execute('''CREATE TABLE IF NOT EXISTS tasks (
+				id INTEGER PRIMARY KEY,
+				key TEXT UNIQUE NOT NULL,
+				object TEXT NOT NULL,
+				args TEXT NOT NULL,
+				method TEXT NOT NULL,
+				kwargs TEXT NOT NULL,
+				status TEXT NOT NULL DEFAULT 'pending',
+				attempts INTEGER NOT NULL DEFAULT 0,
+				not_before REAL NOT NULL DEFAULT 0,
+				claimed_at REAL,
+				error TEXT,
+				endpoint TEXT,
+				response BLOB)''')
+			conn.execute('CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, not_before)')
+
+	def _connect(self):
+		conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+		conn.row_factory = sqlite3.Row
+		conn.execute('PRAGMA journal_mode=WAL')
+		return conn
+
+	def put(self, object_path, args, method, kwargs):
+		""" Add a task to the queue, unless an identical task was already added. Return the task ID. """
+		key = json.dumps([object_path, list(args), method, kwargs], sort_keys=True)
+		with closing(self._connect()) as conn:
+			conn.execute('INSERT OR IGNORE INTO tasks (key, object, args, method, kwargs) VALUES (?, ?, ?, ?, ?)',
+				(key, object_path, json.dumps(list(args)), method, json.dumps(kwargs, sort_keys=True)))
+			return conn.execute('SELECT id FROM tasks WHERE key = ?', (key,)).fetchone()['id']
+
+	def claim(self, max_retries=3):
+		"""
+		Mark the next available task as running and return it, or return None if no task is available.
+
+		A running task whose lease has expired counts as a failed attempt, as its worker was killed while running it,
+		and is marked failed instead of claimed once it has failed max_retries times.
+		"""
+		now = time.time()
+		with closing(self._connect()) as conn:
+			conn.execute('BEGIN IMMEDIATE')
+			while True:
+				row = conn.execute('''SELECT * FROM tasks
+					WHERE (status = 'pending' AND not_before <= ?) OR (status = 'running' AND claimed_at < ?)
+					ORDER BY id LIMIT 1''', (now, now - self.lease)).fetchone()
+				if row is None or row['status'] == 'pending' or row['attempts'] + 1 < max_retries:
+					break
+				conn.execute("UPDATE tasks SET status = 'failed', attempts = attempts + 1, error = ? WHERE id = ?",
+					('Lease expired', row['id']))
+			if row:
+				conn.execute("""UPDATE tasks SET status = 'running', claimed_at = ?,
+					attempts = attempts + (status = 'running') WHERE id = ?""", (now, row['id']))
+				row = conn.execute('SELECT * FROM tasks WHERE id = ?', (row['id'],)).fetchone()
+			conn.execute('COMMIT')
+		return self._row_to_task(row) if row else None
+
+	def complete(self, task_id, endpoint_path, response):
+		""" Mark a task as done and store its endpoint class and raw response. """
+		with closing(self._connect()) as conn:
+			conn.execute("UPDATE tasks SET status = 'done', error = NULL, endpoint = ?, response = ? WHERE id = ?", (endpoint_path, response, task_id))
+
+	def fail(self, task_id, error, max_retries=3, retry_delay=1.0):
+		""" Record a failed attempt at a task. The task is retried with exponential backoff until it has failed max_retries times. """
+		with closing(self._connect()) as conn:
+			attempts = conn.execute('SELECT attempts FROM tasks WHERE id = ?', (task_id,)).fetchone()['attempts'] + 1
+			status = 'pending' if attempts < max_retries else 'failed'
+			conn.execute('UPDATE tasks SET status = ?, attempts = ?, error = ?, not_before = ? WHERE id = ?',
+				(status, attempts, error, time.time() + retry_delay * 2 ** (attempts - 1), task_id))
+
+	def retry_failed(self):
+		""" Move all failed tasks back to pending. """
+		with closing(self._connect()) as conn:
+			conn.execute("UPDATE tasks SET status = 'pending', attempts = 0, not_before = 0 WHERE status = 'failed'")
+
+	def counts(self):
+		""" Return the number of tasks with each status. """
+		with closing(self._connect()) as conn:
+			return {row['status']: row['n'] for row in conn.execute('SELECT status, COUNT(*) AS n FROM tasks GROUP BY status')}
+
+	def has_unfinished(self):
+		""" Return True if any task is still pending or running. """
+		with closing(self._connect()) as conn:
+			return conn.execute("SELECT 1 FROM tasks WHERE status IN ('pending', 'running') LIMIT 1").fetchone() is not None
+
+	def tasks(self, status=None):
+		""" Iterate over tasks, optionally only those with the given status. """
+		query, params = ('SELECT * FROM tasks WHERE status = ? ORDER BY id', (status,)) if status else ('SELECT * FROM tasks ORDER BY id', ())
+		with closing(self._connect()) as conn:
+			for row in conn.execute(query, params):
+				yield self._row_to_task(row)
+
+	def _row_to_task(self, row):
+		task = {k: row[k] for k in row.keys() if k != 'key'}
+		task['args'] = json.loads(task['args'])
+		task['kwargs'] = json.loads(task['kwargs'])
+		return task
+
+
+def run_task(task):
+	"""
+	Load the endpoint for a task.
+
+	Parameters
+	----------
+	task : dict
+		Task with the object class path, object args, endpoint method name and method kwargs.
+
+	Returns
+	-------
+	Endpoint
+	"""
+	obj = _load_class(task['object'])(*task['args'])
+	return getattr(obj, task['method'])(**task['kwargs'])
+
+
+def _work(queue, max_retries, retry_delay, poll_interval, rate_limiter=None, client=None):
+	""" Process tasks from queue until none are left. Return the number of tasks attempted. """
+	from .api import get_client, use_client
+
+	client = _with_rate_limiter(get_client(client), rate_limiter)
+	with use_client(client):
+		return _work_loop(queue, max_retries, retry_delay, poll_interval)
+
+
+def _with_rate_limiter(client, rate_limiter):
+	""" Return a copy of client using rate_limiter, sharing its session, cache and everything else, or client itself if rate_limiter is None. """
+	if rate_limiter is None:
+		return client
+	client = copy.copy(client) # Never set on the client itself, which other jobs or interactive callers may be using
+	client.rate_limiter = rate_limiter
+	return client
+
+
+def _work_loop(queue, max_retries, retry_delay, poll_interval):
+	attempted = 0
+	while True:
+		task = queue.claim(max_retries=max_retries)
+		if task is None:
+			if not queue.has_unfinished():
+				return attempted
+			time.sleep(poll_interval) # Wait for tasks in backoff or held by other workers
+			continue
+
+		attempted += 1
+		try:
+			endpoint = run_task(task)
+		except Exception as e:
+			queue.fail(task['id'], repr(e), max_retries=max_retries, retry_delay=retry_delay)
+		else:
+			queue.complete(task['id'], _class_path(type(endpoint)), endpoint.response)
+
+
+class CrawlJob:
+	"""
+	Resumable crawl of many endpoints.
+
+	Tasks are stored in an SQLite database along with their results, so a killed job resumes where it left off
+	when run is called again, and several processes may run the same job at once.
+
+	Parameters
+	----------
+	path : str
+		Path of the SQLite database file for the job.
+	lease : float
+		Seconds after which a running task is assumed to belong to a killed worker and may be claimed again.
+	queue : SQLiteTaskQueue or distributed.RedisTaskQueue
+		If given, the task queue to use instead of an SQLite database at path, e.g. to share the job between machines.
+	"""
+
+	def __init__(self, path=None, lease=600, queue=None):
+		self.queue = queue if queue is not None else SQLiteTaskQueue(path, lease=lease)
+
+	def add(self, obj, method, **kwargs):
+		"""
+		Add an endpoint fetch to the job.
+
+		Parameters
+		----------
+		obj : FirstCyclingObject
+			Object to load the endpoint from, e.g. Rider(18655) or RaceEdition(9, 2019).
+		method : str
+			Name of the endpoint method, e.g. 'year_results'.
+		**kwargs
+			Parameters for the endpoint method.
+
+		Returns
+		-------
+		int
+			Task ID.
+		"""
+		return self.queue.put(_class_path(type(obj)), obj._get_init_args(), method, kwargs)
+
+	def run(self, workers=4, processes=False, max_retries=3, retry_delay=1.0, poll_interval=0.5, rate_limiter=None, client=None):
+		"""
+		Process the job's remaining tasks.
+
+		Parameters
+		----------
+		workers : int
+			Number of workers.
+		processes : bool
+			If True, workers run in separate processes, otherwise in threads.
+		max_retries : int
+			Number of attempts at a task before it is marked as failed.
+		retry_delay : float
+			Seconds to wait before the first retry of a task. Doubles with each further attempt.
+		poll_interval : float
+			Seconds an idle worker waits before checking for tasks again.
+		rate_limiter : ratelimit.RateLimiter or ratelimit.RedisRateLimiter
+			If given, limits the rate of requests made by the workers, in place of the client's own rate limiter.
+			The client itself is not changed, so other users of it keep their rate limiter.
+			Process workers need a ratelimit.RedisRateLimiter created from a Redis URL, which all processes share.
+		client : api.FirstCyclingAPI
+			Client thread workers fetch pages with. If None, uses the default client.
+			Process workers always use the default client of their process.
+			Thread workers run in a copy of the caller's context, so e.g. its scheduler.request_priority applies.
+
+		Returns
+		-------
+		dict {str : int}
+			Number of tasks with each status once the run finishes.
+
+		Raises
+		------
+		ValueError
+			If processes is True and rate_limiter is a ratelimit.RateLimiter, which only limits its own process.
+		"""
+		from .api import get_client
+		if processes and isinstance(rate_limiter, RateLimiter):
+			raise ValueError('A RateLimiter only limits requests in its own process, so each worker process would get its '
+				'own rate. Use a RedisRateLimiter to limit process workers.')
+		shared_client = None if processes else _with_rate_limiter(get_client(client), rate_limiter)
+
+		executor_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+		with executor_class(max_workers=workers) as executor:
+			if processes:
+				futures = [executor.submit(_work, self.queue, max_retries, retry_delay, poll_interval, rate_limiter) for _ in range(workers)]
+			else:
+				futures = [executor.submit(contextvars.copy_context().run, _work, self.queue, max_retries, retry_delay, poll_interval, None, shared_client)
+					for _ in range(workers)]
+			for future in futures:
+				future.result()
+		return self.status()
+
+	def status(self):
+		""" Return the number of tasks with each status. """
+		return self.queue.counts()
+
+	def retry_failed(self):
+		""" Move all failed tasks back to pending so the next run tries them again. """
+		self.queue.retry_failed()
+
+	def errors(self):
+		""" Return a dict mapping failed task IDs to their last error. """
+		return {task['id']: task['error'] for task in self.queue.tasks(status='failed')}
+
+	def results(self):
+		"""
+		Iterate over completed tasks.
+
+		Yields
+		------
+		tuple (dict, Endpoint)
+			The task and its endpoint, parsed from the stored response.
+		"""
+		for task in self.queue.tasks(status='done'):
+			yield task, _load_class(task['endpoint'])(task['response'])
@@ -6,20 +6,29 @@ Provides base class for API objects.
 """
 
 from .endpoints import Endpoint
+from .api import get_client
 
 class FirstCyclingObject:
 	_default_endpoint = Endpoint
 
-	def __init__(self, ID):
+	def __init__(self, ID, client=None):
 		self.ID = ID
+		self.client = client
 
 	def __repr__(self):
 		return f"{self.__class__.__name__}({self.ID})"
 
+	def _get_init_args(self):
+		return (self.ID,)
+
+	def _get_client(self):
+		return get_client(self.client)
+
 	def _get_response(self, **kwargs):
 		return "That endpoint is not supported."
 
 	def _get_endpoint(self, endpoint=None, **kwargs):
 		endpoint = endpoint if endpoint else self._default_endpoint
-		response = self._get_response(**kwargs)
-		return endpoint(response)
\ No newline at end of file
+		with self._get_client().instrumented():
+			response = self._get_response(**kwargs)
+			return endpoint(response)
\ No newline at end of file
@@ -5,6 +5,10 @@ Parser
 Provides useful functions to parse API responses.
 """
 
+from .constants import Profile
+from .instrumentation import timer
+from .search import record_table
+
 # Parsing dates ----
 
 def parse_date(date_text):
@@ -50,8 +54,8 @@ def img_to_country_code(img):
 	return get_img_name(img).split('.')[0]
 
 def img_to_profile(img):
-	""" Return profile type for image """
-	return profile_icon_map[get_img_name(img)]
+	""" Return Profile enum member for stage profile icon html img tag """
+	return Profile[get_img_name(img)]
 
 
 # Parsing tables ----
@@ -62,11 +66,22 @@ def parse_table(table):
 	import pandas as pd
 
 	# Load pandas DataFrame from raw text only
-	out_df = pd.read_html(str(table), decimal=',')[0]
+	with timer('parse_table.read_html'):
+		out_df = pd.read_html(str(table), decimal=',')[0]
 
 	if out_df.iat[0, 0] == 'No data': # No data
 		return None
 
+	with timer('parse_table.postprocess'):
+		out_df = _add_tag_columns(table, out_df)
+	record_table(out_df)
+	return out_df
+
+
+def _add_tag_columns(table, out_df):
+	""" Clean DataFrame loaded from HTML table and add columns for information hidden in tags. """
+	import pandas as pd
+
 	# Convert decimal points to thousands separator
 	# NOTE: Cannot use thousands='.' in pd.read_html because will ruin other columns (e.g. CAT for races)
 	thousands_cols = ['Points']
@@ -0,0 +1,177 @@
+"""
+Partitions
+==========
+
+Provides parsing of raw responses into DataFrames, partition by partition, for pipelines which already hold the HTML.
+
+Records are (url, params, body) tuples, e.g. from ResponseArchive.records or a Dask bag of crawled pages. Each record
+is parsed with the endpoint class archive.resolve_endpoint picks for it, without any requests. Every table the
+endpoint parses becomes a row group of a result DataFrame named after the class and field, e.g.
+'RaceEditionResults.results_table' or 'RaceEditionResults.standings.gc', and dicts such as header_details become
+one row per record. Each row is tagged with the Source_URL and Source_Params of its record. Records which cannot be
+parsed are listed in the 'errors' table.
+
+Examples
+--------
+Parse an archive on all cores:
+
+>>> archive = ResponseArchive('responses.db')
+>>> records = ((url, params, body) for _, url, params, _, body in archive.records())
+>>> tables = concat_partitions(map_partitions(records, processes=8))
+>>> tables['RaceEditionResults.results_table']
+
+With Dask, partitions are parsed where the bag's partitions live:
+
+>>> bag = dask.bag.from_sequence(records, npartitions=64)
+>>> tables = concat_partitions(map_partitions(bag).compute())
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import pandas as pd
+
+from .archive import parsed_fields, resolve_endpoint
+
+
+def parse_record(url, params, body):
+	"""
+	Parse one raw response with the endpoint class for its URL and parameters.
+
+	Parameters
+	----------
+	url : str
+		Page URL without query string, e.g. 'https://firstcycling.com/race.php'.
+	params : dict
+		Query parameters of the request.
+	body : bytes
+		Raw response.
+
+	Returns
+	-------
+	Endpoint
+	"""
+	return resolve_endpoint(url, params).from_bytes(body)
+
+
+def endpoint_tables(endpoint):
+	"""
+	Collect the parsed fields of an endpoint as DataFrames.
+
+	Parameters
+	----------
+	endpoint : Endpoint
+
+	Returns
+	-------
+	dict {str : pd.DataFrame}
+		DataFrame fields, the DataFrames in dict fields (e.g. 'standings.gc') and dicts of values (e.g.
+		'header_details') as a single row with nested dicts flattened, keyed by field name. Other fields are left out.
+	"""
+	tables = {}
+	for name, value in parsed_fields(endpoint).items():
+		if isinstance(value, pd.DataFrame):
+			tables[name] = value
+		elif isinstance(value, dict) and value and all(isinstance(v, pd.DataFrame) for v in value.values()):
+			tables.update({f'{name}.{key}': table for key, table in value.items()})
+		elif isinstance(value, dict) and value and not any(isinstance(v, pd.DataFrame) for v in value.values()):
+			tables[name] = pd.json_normalize(value) # Nested dicts become columns, e.g. links.Website
+	return tables
+
+
+def parse_partition(records):
+	"""
+	Parse a partition of records into one DataFrame per endpoint class and field.
+
+	Parameters
+	----------
+	records : iterable[tuple (str, dict, bytes)]
+		URL, parameters and body of each response.
+
+	Returns
+	-------
+	dict {str : pd.DataFrame}
+		Tables keyed by endpoint class and field, e.g. 'RiderYearResults.results_df', each with Source_URL and
+		Source_Params columns. Records which failed to parse are in 'errors', with their Error.
+	"""
+	parts, errors = {}, []
+	for url, params, body in records:
+		source = {'Source_URL': url, 'Source_Params': json.dumps(params, sort_keys=True, default=str)}
+		try:
+			endpoint = parse_record(url, params, body)
+		except Exception as e:
+			errors.append({**source, 'Error': repr(e)})
+			continue
+		for name, table in endpoint_tables(endpoint).items():
+			if table is not None and len(table):
+				parts.setdefault(f'{type(endpoint).__name__}.{name}', []).append(table.assign(**source))
+
+	tables = {name: pd.concat(tables, ignore_index=True) for name, tables in parts.items()}
+	if errors:
+		tables['errors'] = pd.DataFrame(errors)
+	return tables
+
+
+def _parse_partition_list(records):
+	""" Parse a Dask bag partition, returning it as a one-item list so the bag holds one dict per partition. """
+	return [parse_partition(records)]
+
+
+def _chunks(records, size):
+	records = iter(records)
+	while chunk := list(islice(records, size)):
+		yield chunk
+
+
+def map_partitions(records, partition_size=100, processes=None):
+	"""
+	Parse records partition by partition.
+
+	Parameters
+	----------
+	records : dask.bag.Bag or iterable[tuple (str, dict, bytes)]
+		URL, parameters and body of each response. A Dask bag, or any collection with a compatible map_partitions
+		method, is parsed lazily on its own partitions.
+	partition_size : int
+		Number of records in each partition of an iterable.
+	processes : int
+		If given, partitions of an iterable are parsed in this many worker processes. Otherwise in this process.
+
+	Returns
+	-------
+	dask.bag.Bag or iterator[dict {str : pd.DataFrame}]
+		Tables of each partition, as returned by parse_partition, in order. For a Dask bag, a bag with one such dict
+		per partition.
+	"""
+	if hasattr(records, 'map_partitions'):
+		return records.map_partitions(_parse_partition_list)
+	if processes is None:
+		return map(parse_partition, _chunks(records, partition_size))
+	return _map_in_processes(_chunks(records, partition_size), processes)
+
+
+def _map_in_processes(chunks, processes):
+	with ProcessPoolExecutor(max_workers=processes) as executor:
+		yield from executor.map(parse_partition, chunks)
+
+
+def concat_partitions(partitions):
+	"""
+	Combine the tables of several partitions.
+
+	Parameters
+	----------
+	partitions : iterable[dict {str : pd.DataFrame}]
+		Tables of each partition, e.g. from map_partitions.
+
+	Returns
+	-------
+	dict {str : pd.DataFrame}
+		Each table concatenated over all partitions.
+	"""
+	parts = {}
+	for tables in partitions:
+		for name, table in tables.items():
+			parts.setdefault(name, []).append(table)
+	return {name: pd.concat(tables, ignore_index=True) for name, tables in parts.items()}
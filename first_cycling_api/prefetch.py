@@ -0,0 +1,218 @@
+"""
+Prefetch
+=========
+
+Provides speculative fetching of the pages most likely to be requested next.
+
+Scripts tend to walk pages in order: page k of a ranking then page k + 1, stage n of a race then stage n + 1, and a
+rider's results year by year going back. A Prefetcher assigned to a client fetches the next page in the background
+as soon as a page is fetched, so it is ready by the time the caller has processed the current page. Pages already in
+the client's cache are not prefetched, and pages served from it start no prefetches. Prefetches go through the client's
+rate limiter, archive and cache like any other request, and through its scheduler at bulk priority.
+
+Examples
+--------
+>>> client = FirstCyclingAPI(prefetcher=Prefetcher())
+>>> for page in range(1, 6):
+...     Ranking(h=1, rank=1, y=2020, page=page, client=client) # Pages 2 to 5 are already fetched when requested
+>>> client.prefetcher.stats()
+{'issued': 5, 'hits': 4, 'wasted': 0, 'failed': 0, 'pending': 1, 'hit_rate': 0.8, 'waste_rate': 0.0}
+"""
+
+import contextvars
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from .instrumentation import increment
+from .scheduler import request_priority
+
+_rider_year_regex = re.compile(rb'name="(\d{4})" class="\d{4} year( valgt)?"')
+_stage_option_regex = re.compile(rb'<option value="(\d+)"[^>]*>Stage')
+
+
+def next_ranking_page(params, content):
+	""" Predict the next page of a ranking, if the current page links to it. """
+	page = int(params.get('page', 1))
+	if f'page={page + 1}"'.encode() not in content:
+		return []
+	return [{**params, 'page': page + 1}]
+
+
+def next_stage(params, content):
+	""" Predict the next stage of a race edition after a stage result, if the page's stage menu lists one. """
+	stage = str(params.get('e', ''))
+	if 'r' not in params or 'y' not in params or not stage.isdigit():
+		return []
+	if int(stage) + 1 not in {int(option) for option in _stage_option_regex.findall(content)}:
+		return []
+	return [{**params, 'e': f'{int(stage) + 1:0{len(stage)}}'}]
+
+
+def previous_rider_year(params, content):
+	""" Predict the rider's previous active year after a page of year results. """
+	if set(params) - {'r', 'y'}:
+		return []
+	years = [(int(year), bool(selected)) for year, selected in _rider_year_regex.findall(content)]
+	current = int(params['y']) if 'y' in params else next((year for year, selected in years if selected), None)
+	earlier = [year for year, _ in years if current is not None and year < current]
+	return [{**params, 'y': max(earlier)}] if earlier else []
+
+
+DEFAULT_RULES = {
+	'ranking.php': next_ranking_page,
+	'race.php': next_stage,
+	'rider.php': previous_rider_year,
+}
+""" Prediction rule for each page, called as ``rule(params, content)`` and returning the parameters of pages to prefetch. """
+
+
+def _prefetch(fetch, url, params):
+	""" Fetch a page at bulk priority, so prefetches never delay requests made by the caller. """
+	with request_priority('bulk'):
+		return fetch(url, params)
+
+
+class Prefetcher:
+	"""
+	Background fetcher of the pages a client is likely to request next.
+
+	Parameters
+	----------
+	max_workers : int
+		Maximum number of prefetches in flight at once.
+	max_pending : int
+		Maximum number of prefetched responses held until they are requested. When full, the oldest is discarded.
+	rules : dict {str : callable}
+		Prediction rule for each page name, e.g. 'ranking.php'. Defaults to DEFAULT_RULES.
+
+	Attributes
+	----------
+	issued, hits, wasted, failed : int
+		Number of prefetches started, served to the caller, discarded or cancelled unused, and failed.
+	"""
+
+	def __init__(self, max_workers=2, max_pending=16, rules=None):
+		self.max_pending = max_pending
+		self.rules = DEFAULT_RULES if rules is None else rules
+		self.issued = self.hits = self.wasted = self.failed = 0
+		self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+		self._pending = OrderedDict()
+		self._lock = threading.Lock()
+
+	@staticmethod
+	def _key(url, params):
+		return url, json.dumps({k: str(v) for k, v in params.items()}, sort_keys=True)
+
+	def take(self, url, params, scheduler=None):
+		"""
+		Claim a prefetched response, waiting for it if it is still being fetched.
+
+		A prefetch which has not started yet is cancelled, so the caller fetches the page itself at its own priority.
+		One which is waiting in scheduler is promoted to the caller's priority instead of making it wait behind
+		bulk requests.
+
+		Parameters
+		----------
+		url : str
+			Page URL without query string.
+		params : dict
+			Query parameters of the request.
+		scheduler : scheduler.RequestScheduler
+			If given, the scheduler prefetches wait in.
+
+		Returns
+		-------
+		bytes
+			Response body, or None if the page was not prefetched, its prefetch was cancelled or it failed.
+		"""
+		with self._lock:
+			future = self._pending.pop(self._key(url, params), None)
+		if future is None:
+			return None
+		if future.cancel():
+			with self._lock:
+				self.wasted += 1
+			increment('prefetch_wasted')
+			return None
+		if scheduler is not None:
+			# The prefetch may not be queued yet, or may be in flight already, so retry until it is promoted or done
+			while not future.done() and not scheduler.promote(url, params):
+				wait([future], timeout=0.01)
+		try:
+			content = future.result()
+		except Exception:
+			with self._lock:
+				self.failed += 1
+			increment('prefetch_failed')
+			return None
+		with self._lock:
+			self.hits += 1
+		increment('prefetch_hits')
+		return content
+
+	def schedule(self, fetch, url, params, content, cache=None):
+		"""
+		Start prefetching the pages predicted to follow a response.
+
+		Pages already in cache are not prefetched, so they use no requests or rate limit tokens.
+
+		Parameters
+		----------
+		fetch : callable
+			Called as ``fetch(url, params)`` in a background thread to fetch a page.
+		url : str
+			URL of the page just served.
+		params : dict
+			Query parameters of the page just served.
+		content : bytes
+			Body of the page just served.
+		cache : cache.ResponseCache
+			If given, the client's response cache.
+		"""
+		rule = self.rules.get(url.rsplit('/', maxsplit=1)[-1])
+		if rule is None:
+			return
+		for next_params in rule(params, content):
+			if cache is not None and (url, next_params) in cache:
+				continue
+			key = self._key(url, next_params)
+			with self._lock:
+				if key in self._pending:
+					continue
+				while len(self._pending) >= self.max_pending:
+					_, discarded = self._pending.popitem(last=False)
+					discarded.cancel()
+					self.wasted += 1
+					increment('prefetch_wasted')
+				# Run in a copy of the caller's context so its instrumentation and client settings apply
+				self._pending[key] = self._executor.submit(contextvars.copy_context().run, _prefetch, fetch, url, next_params)
+				self.issued += 1
+			increment('prefetch_issued')
+
+	def stats(self):
+		"""
+		Return prefetch counts and rates.
+
+		Returns
+		-------
+		dict
+			Counts of prefetches issued, hits, wasted, failed and pending, with hit_rate and waste_rate as fractions
+			of prefetches issued.
+		"""
+		with self._lock:
+			issued = self.issued
+			return {'issued': issued, 'hits': self.hits, 'wasted': self.wasted, 'failed': self.failed, 'pending': len(self._pending),
+				'hit_rate': self.hits / issued if issued else 0.0, 'waste_rate': self.wasted / issued if issued else 0.0}
+
+	def close(self):
+		""" Cancel outstanding prefetches, counting unclaimed responses as wasted, and stop the worker threads. """
+		with self._lock:
+			self.wasted += len(self._pending)
+			increment('prefetch_wasted', len(self._pending))
+			for future in self._pending.values():
+				future.cancel()
+			self._pending.clear()
+		self._executor.shutdown(wait=False)
@@ -20,4 +20,5 @@ Name: 0, dtype: object
 """
 
 
-from .race import Race, RaceEdition
\ No newline at end of file
+from .race import Race, RaceEdition, load_race_statistics
+from .live import LiveResults, LiveUpdate
\ No newline at end of file
@@ -1,5 +1,13 @@
 from ..endpoints import ParsedEndpoint
-from ..parser import parse_table
+from ..parser import parse_table, parse_date, get_img_name, img_to_profile, race_link_to_stage_num
+from ..constants import profile_icon_map
+
+import pandas as pd
+import datetime
+import re
+
+stage_date_regex = re.compile(r'^(\d{2}\.\d{2}(\.\d{4})?|\d{4}-\d{2}-\d{2})$')
+stage_distance_regex = re.compile(r'^(\d+(?:[.,]\d+)?)\s*(?:km)?$', re.IGNORECASE)
 
 
 class RaceEndpoint(ParsedEndpoint):
@@ -14,6 +22,8 @@ class RaceEndpoint(ParsedEndpoint):
 		A lsit of the years in which editions of the race took place.
 	"""
 
+	_regions = [('h1', None), ('p', {'class': 'left'}), ('select', {'name': 'y'})]
+
 	def _parse_soup(self):
 		self._get_header_details()
 		self._get_editions()
@@ -21,7 +31,8 @@ class RaceEndpoint(ParsedEndpoint):
 	def _get_header_details(self):
 		self.header_details = {}
 		self.header_details['name'] = self.soup.h1.text.rsplit(' - ', maxsplit=1)[0] # Get race name, excluding year
-		self.header_details['links'] = {a.img['src'].rsplit('/', maxsplit=1)[1][:-7]: a['href'] for a in self.soup.h1.parent.find_all('a')}
+		links = self.soup.h1.find_next_sibling('p', {'class': 'left'})
+		self.header_details['links'] = {a.img['src'].rsplit('/', maxsplit=1)[1][:-7]: a['href'] for a in links.find_all('a')} if links else {}
 		if 'www' in self.header_details['links']:
 			self.header_details['links']['website'] = self.header_details['links'].pop('www')
 
@@ -39,6 +50,8 @@ class RaceVictoryTable(RaceEndpoint):
 		Victory table for race.
 	"""
 
+	_regions = [('table', {'class': 'tablesorter'})]
+
 	def _parse_soup(self):
 		super()._parse_soup()
 		self._get_victory_table()
@@ -59,6 +72,8 @@ class RaceStageVictories(RaceEndpoint):
 		Stage victory table for race.
 	"""
 
+	_regions = [('table', {'class': 'tablesorter'})]
+
 	def _parse_soup(self):
 		super()._parse_soup()
 		self._get_stage_victory_table()
@@ -68,6 +83,72 @@ class RaceStageVictories(RaceEndpoint):
 		self.table = parse_table(victory_table)
 
 
+class RaceOverview(RaceEndpoint):
+	"""
+	Race overview response. Extends RaceEndpoint.
+
+	Attributes
+	----------
+	table : pd.DataFrame
+		Table of podium finishers in each edition of the race for the classification.
+	"""
+
+	_regions = [('table', {'class': 'tablesorter'})]
+
+	def _parse_soup(self):
+		super()._parse_soup()
+		self._get_overview_table()
+
+	def _get_overview_table(self):
+		overview_table = self.soup.find('table', {'class': 'tablesorter'})
+		self.table = parse_table(overview_table) if overview_table else None
+
+
+class RaceYearByYear(RaceEndpoint):
+	"""
+	Race year-by-year statistics response. Extends RaceEndpoint.
+
+	Attributes
+	----------
+	table : pd.DataFrame
+		Table of statistics for each edition of the race.
+	"""
+
+	_regions = [('table', {'class': 'tablesorter'})]
+
+	def _parse_soup(self):
+		super()._parse_soup()
+		self._get_year_by_year_table()
+
+	def _get_year_by_year_table(self):
+		year_by_year_table = self.soup.find('table', {'class': 'tablesorter'})
+		self.table = parse_table(year_by_year_table) if year_by_year_table else None
+
+
+class RaceYoungestOldestWinners(RaceEndpoint):
+	"""
+	Race youngest and oldest winners response. Extends RaceEndpoint.
+
+	Attributes
+	----------
+	youngest_table : pd.DataFrame
+		Table of the youngest winners of the race.
+	oldest_table : pd.DataFrame
+		Table of the oldest winners of the race.
+	"""
+
+	_regions = [('table', {'class': 'tablesorter'})]
+
+	def _parse_soup(self):
+		super()._parse_soup()
+		self._get_youngest_oldest_tables()
+
+	def _get_youngest_oldest_tables(self):
+		tables = self.soup.find_all('table', {'class': 'tablesorter'})
+		self.youngest_table = parse_table(tables[0]) if len(tables) > 0 else None
+		self.oldest_table = parse_table(tables[1]) if len(tables) > 1 else None
+
+
 class RaceEditionResults(RaceEndpoint):
 	"""
 	Race edition results response. Extends RaceEndpoint.
@@ -79,6 +160,8 @@ class RaceEditionResults(RaceEndpoint):
 	standings : dict {str : pd.DataFrame}
 		For stage races, maps classification names to a DataFrame with the appropriate standings after the stage.
 	"""
+
+	_regions = [('table', {'class': 'sortTabell'}), ('table', {'class': 'sortTabell2'}), ('div', {'class': 'tab-content'})]
 	
 	def _parse_soup(self):
 		super()._parse_soup()
@@ -97,3 +180,72 @@ class RaceEditionResults(RaceEndpoint):
 
 	def _get_sidebar_information(self): # TODO
 		return
+
+
+class RaceStageProfiles(RaceEndpoint):
+	"""
+	Race edition stage profiles response. Extends RaceEndpoint.
+
+	Attributes
+	----------
+	year : int
+		Year of the race edition.
+	stages_table : pd.DataFrame
+		Table with one row per stage and columns Stage, Date, Distance, Profile, Start and Finish.
+		Stage is 0 for a prologue and Profile holds constants.Profile members.
+	"""
+
+	_regions = [('table', None)]
+
+	def _parse_soup(self):
+		super()._parse_soup()
+		self._get_year()
+		self._get_stages_table()
+
+	def _get_year(self):
+		span = self.soup.h1.span
+		self.year = int(span.text.strip(' -')) if span and span.text.strip(' -').isdigit() else None
+
+	def _get_stages_table(self):
+		table = self._find_stages_table()
+		rows = [tr for tr in table.find_all('tr') if tr.th is None] if table else []
+		self.stages_table = pd.DataFrame([self._parse_stage_row(tr) for tr in rows], columns=['Stage', 'Date', 'Distance', 'Profile', 'Start', 'Finish'])
+
+	def _find_stages_table(self):
+		for table in self.soup.find_all('table'):
+			if any(get_img_name(img) in profile_icon_map for img in table.find_all('img')):
+				return table
+
+	def _parse_stage_row(self, tr):
+		tds = tr.find_all('td')
+
+		stage_link = tr.find('a', href=lambda href: href and 'e=' in href)
+		if stage_link:
+			stage = race_link_to_stage_num(stage_link)
+		else:
+			stage_text = tds[0].text.strip()
+			stage = 0 if stage_text.lower().startswith('p') else int(stage_text)
+
+		date = distance = profile = None
+		places = []
+		for td in tds[1:]:
+			text = td.text.strip()
+			if td.img and get_img_name(td.img) in profile_icon_map:
+				profile = img_to_profile(td.img)
+			elif date is None and stage_date_regex.match(text):
+				date = self._parse_stage_date(text)
+			elif distance is None and stage_distance_regex.match(text):
+				distance = float(stage_distance_regex.match(text).group(1).replace(',', '.'))
+			elif ' - ' in text:
+				places.extend(place.strip() for place in text.split(' - ', 1))
+			elif text:
+				places.append(text)
+
+		start, finish = (places + [None, None])[:2]
+		return stage, date, distance, profile, start, finish
+
+	def _parse_stage_date(self, text):
+		if '-' in text: # ISO format, e.g. 2023-04-03
+			return parse_date(text)
+		day, month = (int(x) for x in text.split('.')[:2])
+		return datetime.date(self.year, month, day) if self.year else None
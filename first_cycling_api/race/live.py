@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import threading
+import time
+from typing import NamedTuple
+
+import pandas as pd
+
+from .endpoints import RaceEditionResults
+from ..api import get_client
+
+
+class LiveUpdate(NamedTuple):
+	"""
+	Rows of a results table which were inserted or changed since the previous poll.
+
+	Attributes
+	----------
+	table : str
+		'results' for the stage or race results, otherwise the name of the standings, e.g. 'gc'.
+	rows : pd.DataFrame
+		Inserted and changed rows indexed by Rider_ID, with a Change column holding 'inserted' or 'changed'.
+	fetched_at : float
+		Unix time the page was fetched.
+	"""
+	table: str
+	rows: pd.DataFrame
+	fetched_at: float
+
+
+def _keyed(table):
+	""" Index a results table by Rider_ID, or by rider name if the table has no IDs. Return None if neither is available. """
+	if table is None:
+		return None
+	key = 'Rider_ID' if 'Rider_ID' in table else 'Rider' if 'Rider' in table else None
+	if key is None:
+		return None
+	return table[table[key].notna()].drop_duplicates(key).set_index(key)
+
+
+def diff_rows(previous, current):
+	"""
+	Find the rows of a keyed table which were inserted or changed.
+
+	Parameters
+	----------
+	previous, current : pd.DataFrame
+		Tables indexed by rider. previous may be None, in which case every row of current is inserted.
+
+	Returns
+	-------
+	pd.DataFrame
+		Inserted and changed rows of current, with a Change column holding 'inserted' or 'changed'.
+	"""
+	if previous is None:
+		return current.assign(Change='inserted')
+	inserted = current[~current.index.isin(previous.index)]
+	common = current[current.index.isin(previous.index)]
+	before = previous.loc[common.index].reindex(columns=common.columns)
+	same = (common == before) | (common.isna() & before.isna())
+	changed = common[~same.all(axis=1).to_numpy()]
+	return pd.concat([inserted.assign(Change='inserted'), changed.assign(Change='changed')])
+
+
+class LiveResults:
+	"""
+	Poller of a race edition's results page which reports only the rows that change.
+
+	Each poll fetches the page and compares a hash of the response with the previous one. An unchanged page is not
+	parsed. Otherwise the results table and every standings table are compared with their previous versions, keyed on
+	Rider_ID, and only inserted or changed rows are emitted. Polls bypass the client's cache and prefetcher.
+
+	Parameters
+	----------
+	race_id : int
+		The firstcycling.com ID for the race.
+	year : int
+		The year of the race edition.
+	stage_num : int
+		Stage to poll. If None, polls the race results.
+	classification_num : int
+		Classification to poll. See utilities.Classifications for possible inputs.
+	interval : float
+		Seconds between the start of consecutive polls.
+	client : FirstCyclingAPI
+		Client to fetch pages with. If None, uses the default client.
+
+	Attributes
+	----------
+	polls : int
+		Number of polls made.
+	unchanged : int
+		Number of polls whose response was identical to the previous one and so was not parsed.
+
+	Examples
+	--------
+	>>> live = LiveResults(race_id=17, year=2023, stage_num=21, interval=15)
+	>>> live.run(print, max_polls=240)
+
+	Or from asyncio code:
+
+	>>> async for update in LiveResults(race_id=17, year=2023, stage_num=21):
+	...     print(update.table, update.rows)
+	"""
+
+	def __init__(self, race_id, year, stage_num=None, classification_num=None, interval=30, client=None):
+		self.race_id = race_id
+		self.year = year
+		self.stage_num = stage_num
+		self.classification_num = classification_num
+		self.interval = interval
+		self.client = client
+		self.polls = 0
+		self.unchanged = 0
+		self._hash = None
+		self._tables = {}
+		self._stopped = threading.Event()
+
+	def _fetch(self):
+		client = get_client(self.client)
+		params = client._fix_kwargs(r=self.race_id, y=self.year, l=self.classification_num,
+			e=f'{self.stage_num:02}' if isinstance(self.stage_num, int) else None)
+		with client.instrumented():
+			return client._fetch(client['race.php'].url(), params)
+
+	def poll(self):
+		"""
+		Fetch the page once and report changes since the previous poll.
+
+		Returns
+		-------
+		list[LiveUpdate]
+			One update for each table with inserted or changed rows. Empty if nothing changed.
+		"""
+		response = self._fetch()
+		fetched_at = time.time()
+		self.polls += 1
+
+		digest = hashlib.blake2b(response, digest_size=16).digest()
+		if digest == self._hash:
+			self.unchanged += 1
+			return []
+		self._hash = digest
+
+		endpoint = RaceEditionResults(response)
+		tables = {'results': endpoint.results_table, **endpoint.standings}
+		updates = []
+		for name, table in tables.items():
+			current = _keyed(table)
+			if current is None:
+				continue
+			rows = diff_rows(self._tables.get(name), current)
+			self._tables[name] = current
+			if len(rows):
+				updates.append(LiveUpdate(name, rows, fetched_at))
+		return updates
+
+	def stop(self):
+		""" Stop run or async iteration after the current poll. """
+		self._stopped.set()
+
+	def run(self, callback, max_polls=None):
+		"""
+		Poll until stopped, calling callback for each update.
+
+		Parameters
+		----------
+		callback : callable
+			Called as ``callback(update)`` with each LiveUpdate.
+		max_polls : int
+			If given, stop after this many polls.
+		"""
+		self._stopped.clear()
+		while not self._stopped.is_set() and (max_polls is None or self.polls < max_polls):
+			started = time.monotonic()
+			for update in self.poll():
+				callback(update)
+			if max_polls is not None and self.polls >= max_polls:
+				break
+			self._stopped.wait(max(0, self.interval - (time.monotonic() - started)))
+
+	async def updates(self, max_polls=None):
+		"""
+		Poll until stopped, yielding each update. Fetching and parsing run in a worker thread.
+
+		Parameters
+		----------
+		max_polls : int
+			If given, stop after this many polls.
+
+		Yields
+		------
+		LiveUpdate
+		"""
+		self._stopped.clear()
+		while not self._stopped.is_set() and (max_polls is None or self.polls < max_polls):
+			started = time.monotonic()
+			for update in await asyncio.to_thread(self.poll):
+				yield update
+			if max_polls is not None and self.polls >= max_polls:
+				break
+			await asyncio.sleep(max(0, self.interval - (time.monotonic() - started)))
+
+	def __aiter__(self):
+		return self.updates()
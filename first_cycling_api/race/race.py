@@ -1,6 +1,6 @@
 from ..objects import FirstCyclingObject
-from .endpoints import RaceEndpoint, RaceVictoryTable, RaceStageVictories, RaceEditionResults
-from ..api import fc
+from .endpoints import RaceEndpoint, RaceOverview, RaceYearByYear, RaceYoungestOldestWinners, RaceVictoryTable, RaceStageVictories, RaceEditionResults, RaceStageProfiles
+from ..batch import map_concurrently, DEFAULT_MAX_WORKERS
 from ..constants import Classification
 
 class Race(FirstCyclingObject):
@@ -11,12 +11,14 @@ class Race(FirstCyclingObject):
 	----------
 	ID : int
 		The firstcycling.com ID for the race from the URL of the race page.
+	client : FirstCyclingAPI
+		Client to fetch pages with. If None, uses the client set with api.use_client, or else api.fc.
 	"""
 
 	_default_endpoint = RaceEndpoint
 
 	def _get_response(self, **kwargs):
-		return fc.get_race_endpoint(self.ID, **kwargs)
+		return self._get_client().get_race_endpoint(self.ID, **kwargs)
 
 	def edition(self, year):
 		"""
@@ -31,7 +33,7 @@ class Race(FirstCyclingObject):
 		-------
 		RaceEdition
 		"""
-		return RaceEdition(self.ID, year)
+		return RaceEdition(self.ID, year, client=self.client)
 
 	def overview(self, classification_num=None):
 		"""
@@ -45,9 +47,9 @@ class Race(FirstCyclingObject):
 
 		Returns
 		-------
-		RaceEndpoint
+		RaceOverview
 		"""
-		return self._get_endpoint(k=classification_num)
+		return self._get_endpoint(endpoint=RaceOverview, k=classification_num)
 
 	def victory_table(self):
 		"""
@@ -71,19 +73,19 @@ class Race(FirstCyclingObject):
 
 		Returns
 		-------
-		RaceEndpoint
+		RaceYearByYear
 		"""
-		return self._get_endpoint(k='X', j=classification_num)	
+		return self._get_endpoint(endpoint=RaceYearByYear, k='X', j=classification_num)
 	
 	def youngest_oldest_winners(self):
 		"""
-		Get race all-time victory table.
+		Get race youngest and oldest winners.
 
 		Returns
 		-------
 		RaceYoungestOldestWinners
 		"""
-		return self._get_endpoint(k='Y')
+		return self._get_endpoint(endpoint=RaceYoungestOldestWinners, k='Y')
 	
 	def stage_victories(self):
 		"""
@@ -96,6 +98,50 @@ class Race(FirstCyclingObject):
 		return self._get_endpoint(endpoint=RaceStageVictories, k='Z')
 
 
+def load_race_statistics(race_ids, classification_num=None, max_workers=DEFAULT_MAX_WORKERS, client=None):
+	"""
+	Load overview, year-by-year and youngest/oldest winners statistics for many races concurrently.
+
+	Parameters
+	----------
+	race_ids : list[int]
+		The firstcycling.com IDs of the races.
+	classification_num : int
+		Classification for the overview and year-by-year statistics.
+		See utilities.Classifications for possible inputs.
+	max_workers : int
+		Maximum number of pages to request at once.
+	client : FirstCyclingAPI
+		Client to fetch pages with. If None, uses the default client.
+
+	Returns
+	-------
+	dict {str : pd.DataFrame}
+		Maps 'overview', 'year_by_year', 'youngest_winners' and 'oldest_winners' to a table combining all races, with a Race_ID column.
+	"""
+	import pandas as pd
+
+	pages = {
+		'overview': lambda race: race.overview(classification_num=classification_num),
+		'year_by_year': lambda race: race.year_by_year(classification_num=classification_num),
+		'youngest_oldest_winners': lambda race: race.youngest_oldest_winners(),
+	}
+	tasks = [(race_id, page) for race_id in race_ids for page in pages]
+	endpoints = map_concurrently(lambda task: pages[task[1]](Race(task[0], client=client)), tasks, max_workers=max_workers, return_exceptions=True)
+
+	tables = {'overview': [], 'year_by_year': [], 'youngest_winners': [], 'oldest_winners': []}
+	for (race_id, page), endpoint in zip(tasks, endpoints):
+		if isinstance(endpoint, Exception):
+			print(f"Warning: could not load {page} for race {race_id}: {endpoint!r}")
+			continue
+		named_tables = {'youngest_winners': endpoint.youngest_table, 'oldest_winners': endpoint.oldest_table} if page == 'youngest_oldest_winners' else {page: endpoint.table}
+		for name, table in named_tables.items():
+			if table is not None:
+				tables[name].append(table.assign(Race_ID=race_id))
+
+	return {name: pd.concat(frames, ignore_index=True) if frames else None for name, frames in tables.items()}
+
+
 class RaceEdition(FirstCyclingObject):
 	"""
 	Wrapper to access endpoints associated with specific editions of races.
@@ -106,19 +152,24 @@ class RaceEdition(FirstCyclingObject):
 		The firstcycling.com ID for the race from the URL of the race page.
 	year : int
 		The year of the race edition.
+	client : FirstCyclingAPI
+		Client to fetch pages with. If None, uses the client set with api.use_client, or else api.fc.
 	"""
 
 	_default_endpoint = RaceEndpoint
 	
-	def __init__(self, race_id, year):
-		super().__init__(race_id)
+	def __init__(self, race_id, year, client=None):
+		super().__init__(race_id, client=client)
 		self.year = year
 
 	def __repr__(self):
 		return f"{self.__class__.__name__}({self.year} {self.ID})"
 
+	def _get_init_args(self):
+		return (self.ID, self.year)
+
 	def _get_response(self, **kwargs):
-		return fc.get_race_endpoint(self.ID, y=self.year, **kwargs)
+		return self._get_client().get_race_endpoint(self.ID, y=self.year, **kwargs)
 
 	def results(self, classification_num=None, stage_num=None):
 		"""
@@ -149,9 +200,50 @@ class RaceEdition(FirstCyclingObject):
 
 		Returns
 		-------
-		RaceEndpoint
+		RaceStageProfiles
+		"""
+		return self._get_endpoint(endpoint=RaceStageProfiles, e='all')
+
+	def live(self, stage_num=None, classification_num=None, interval=30):
+		"""
+		Get a poller reporting changes to the race edition results while the race is on.
+
+		Parameters
+		----------
+		stage_num : int
+			Stage to poll. If None, polls the race results.
+		classification_num : int
+			Classification to poll. See utilities.Classifications for possible inputs.
+		interval : float
+			Seconds between polls.
+
+		Returns
+		-------
+		live.LiveResults
+		"""
+		from .live import LiveResults
+		return LiveResults(self.ID, self.year, stage_num=stage_num, classification_num=classification_num, interval=interval, client=self.client)
+
+	def stage_results(self, stage_nums=None, max_workers=DEFAULT_MAX_WORKERS):
+		"""
+		Get race edition results for several stages concurrently.
+
+		Parameters
+		----------
+		stage_nums : list[int]
+			Stage numbers for which to collect results.
+			If None, loads every stage listed in the stage profiles.
+		max_workers : int
+			Maximum number of stage pages to request at once.
+
+		Returns
+		-------
+		dict {int : RaceEditionResults}
 		"""
-		return self._get_endpoint(e='all')
+		if stage_nums is None:
+			stage_nums = self.stage_profiles().stages_table['Stage'].tolist()
+		results = map_concurrently(lambda stage_num: self.results(stage_num=stage_num), stage_nums, max_workers=max_workers)
+		return dict(zip(stage_nums, results))
 
 	def startlist(self):
 		"""
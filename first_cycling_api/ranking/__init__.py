@@ -20,4 +20,6 @@ Name: 0, dtype: object
 
 """
 
-from .ranking import Ranking
\ No newline at end of file
+from .ranking import Ranking
+from .history import RankingHistory
+from .points import PointsRanking
\ No newline at end of file
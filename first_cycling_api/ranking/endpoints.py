@@ -10,6 +10,9 @@ class RankingEndpoint(ParsedEndpoint):
 	table : pd.DataFrame
 		Rankings table.
 	"""
+
+	_regions = [('table', {'class': 'tablesorter'})]
+
 	def _parse_soup(self):
 		self._get_rankings_table()
 
@@ -0,0 +1,227 @@
+import datetime
+
+import pandas as pd
+
+from .ranking import Ranking
+from ..batch import map_concurrently, DEFAULT_MAX_WORKERS
+
+_columns = ['Pos', 'Points']
+
+
+def weeks_between(start, end):
+	"""
+	List weeks from start to end inclusive.
+
+	Parameters
+	----------
+	start, end : str
+		Weeks formatted as 'yyyy-w', e.g. '2021-7'.
+
+	Returns
+	-------
+	list[str]
+	"""
+	year, week = map(int, start.split('-'))
+	end_year, end_week = map(int, end.split('-'))
+	weeks = []
+	while (year, week) <= (end_year, end_week):
+		weeks.append(f'{year}-{week}')
+		week += 1
+		if week > datetime.date(year, 12, 28).isocalendar()[1]: # Number of ISO weeks in year
+			year, week = year + 1, 1
+	return weeks
+
+
+def _week_key(week):
+	year, number = map(int, week.split('-'))
+	return year, number
+
+
+class RankingHistory:
+	"""
+	Weekly history of a UCI ranking.
+
+	Each week is stored as the changes from the previous week, with a full snapshot every keyframe_interval weeks,
+	so a multi-year history takes little memory and any week can be rebuilt from a handful of deltas.
+
+	Parameters
+	----------
+	start, end : str
+		First and last weeks of the history, formatted as 'yyyy-w', e.g. '2021-1'.
+	pages : int
+		Number of ranking pages to load each week.
+	max_workers : int
+		Maximum number of ranking pages to request at once.
+	keyframe_interval : int
+		Number of weeks between full snapshots.
+	**kwargs
+		Further parameters for Ranking, e.g. h=1, rank=1.
+
+	Attributes
+	----------
+	weeks : list[str]
+		Weeks in the history, in order.
+	missing_weeks : list[str]
+		Weeks loaded for which the site returned no ranking table, so they are not in the history.
+	riders : pd.Series
+		Maps Rider_ID to rider name.
+
+	Examples
+	--------
+	>>> history = RankingHistory('2021-1', '2021-52', pages=2, h=1, rank=1)
+	>>> history.snapshot('2021-30').head()
+	>>> history.to_frame().query('Rider_ID == 18655')
+	"""
+
+	def __init__(self, start=None, end=None, pages=1, max_workers=DEFAULT_MAX_WORKERS, keyframe_interval=13, **kwargs):
+		self.keyframe_interval = keyframe_interval
+		self.weeks = []
+		self.missing_weeks = []
+		self.riders = pd.Series(dtype=object, name='Rider')
+		self._keyframes = {}
+		self._deltas = {}
+		self._last = None
+
+		if start is not None:
+			self.load(weeks_between(start, end or start), pages=pages, max_workers=max_workers, **kwargs)
+
+	def load(self, weeks, pages=1, max_workers=DEFAULT_MAX_WORKERS, **kwargs):
+		"""
+		Fetch ranking pages for weeks concurrently and add them to the history.
+
+		Weeks are added in chronological order. Weeks without any ranking table are added to missing_weeks.
+
+		Parameters
+		----------
+		weeks : list[str]
+			Weeks formatted as 'yyyy-w', following the last week already in the history.
+		pages : int
+			Number of ranking pages to load each week.
+		max_workers : int
+			Maximum number of ranking pages to request at once.
+		**kwargs
+			Further parameters for Ranking, e.g. h=1, rank=1.
+
+		Raises
+		------
+		ValueError
+			If a week is repeated or does not follow the last week already in the history.
+		"""
+		weeks = sorted(weeks, key=_week_key)
+		for week in weeks:
+			self._check_next(week)
+		if len(set(weeks)) < len(weeks):
+			raise ValueError(f'Weeks must not repeat, got {weeks}.')
+
+		chunk_size = max(1, max_workers // pages) * 4 # Bound the number of full tables held at once
+		for i in range(0, len(weeks), chunk_size):
+			chunk = weeks[i:i + chunk_size]
+			tasks = [(week, page) for week in chunk for page in range(1, pages + 1)]
+			tables = map_concurrently(lambda task: Ranking(y=task[0], page=task[1], **kwargs).table, tasks, max_workers=max_workers)
+			for j, week in enumerate(chunk):
+				week_tables = [t for t in tables[j * pages:(j + 1) * pages] if t is not None]
+				if week_tables:
+					self.add_week(week, pd.concat(week_tables, ignore_index=True))
+				else:
+					self.missing_weeks.append(week)
+
+	def _check_next(self, week):
+		""" Raise ValueError unless week comes after the last week in the history. """
+		if self.weeks and _week_key(week) <= _week_key(self.weeks[-1]):
+			raise ValueError(f'Week {week} does not follow the last week in the history, {self.weeks[-1]}.')
+
+	def add_week(self, week, table):
+		"""
+		Add a week's ranking to the end of the history.
+
+		Parameters
+		----------
+		week : str
+			Week formatted as 'yyyy-w'.
+		table : pd.DataFrame
+			Ranking table with Rider_ID, Pos and Points columns, e.g. Ranking(...).table.
+
+		Raises
+		------
+		ValueError
+			If week does not follow the last week in the history.
+		"""
+		self._check_next(week)
+		snapshot = table[['Rider_ID', *_columns]].copy()
+		snapshot['Pos'] = pd.to_numeric(snapshot['Pos'], errors='coerce').astype('Int32')
+		snapshot['Points'] = pd.to_numeric(snapshot['Points'], errors='coerce').astype('float32')
+		snapshot = snapshot.drop_duplicates('Rider_ID').set_index('Rider_ID')
+
+		if 'Rider' in table:
+			names = table.drop_duplicates('Rider_ID').set_index('Rider_ID')['Rider']
+			self.riders = pd.concat([self.riders, names[~names.index.isin(self.riders.index)]])
+
+		if len(self.weeks) % self.keyframe_interval == 0:
+			self._keyframes[week] = snapshot
+		else:
+			previous = self._last
+			common = previous.reindex(snapshot.index)
+			changed = ~(common['Pos'].eq(snapshot['Pos']).fillna(False) & common['Points'].eq(snapshot['Points']).fillna(False))
+			removed = previous.index.difference(snapshot.index)
+			self._deltas[week] = (snapshot[changed.to_numpy()], removed)
+
+		self.weeks.append(week)
+		self._last = snapshot
+
+	def snapshot(self, week):
+		"""
+		Rebuild the ranking for a week.
+
+		Parameters
+		----------
+		week : str
+			Week formatted as 'yyyy-w'.
+
+		Returns
+		-------
+		pd.DataFrame
+			Table with Rider_ID, Pos and Points columns, sorted by position.
+		"""
+		i = self.weeks.index(week)
+		_, snapshot = list(self._iter_snapshots(i - i % self.keyframe_interval, i))[-1]
+		return snapshot.sort_values('Pos').reset_index()
+
+	def to_frame(self, weeks=None):
+		"""
+		Get the history in long format.
+
+		Parameters
+		----------
+		weeks : list[str]
+			Weeks to include. If None, includes every week.
+
+		Returns
+		-------
+		pd.DataFrame
+			Table with week, Rider_ID, Pos and Points columns.
+		"""
+		wanted = set(self.weeks if weeks is None else weeks)
+		positions = [i for i, week in enumerate(self.weeks) if week in wanted]
+		frames = []
+		if positions: # Roll forward once from the keyframe before the first wanted week
+			start = positions[0] - positions[0] % self.keyframe_interval
+			frames = [snapshot.reset_index().assign(week=w) for w, snapshot in self._iter_snapshots(start, positions[-1]) if w in wanted]
+		if not frames:
+			return pd.DataFrame(columns=['week', 'Rider_ID', *_columns])
+		return pd.concat(frames, ignore_index=True)[['week', 'Rider_ID', *_columns]]
+
+	def _iter_snapshots(self, start, stop):
+		""" Yield (week, snapshot) for positions start to stop inclusive, where start is a keyframe. """
+		snapshot = None
+		for w in self.weeks[start:stop + 1]:
+			if w in self._keyframes:
+				snapshot = self._keyframes[w]
+			else:
+				changed, removed = self._deltas[w]
+				snapshot = pd.concat([snapshot.drop(changed.index.union(removed), errors='ignore'), changed])
+			yield w, snapshot
+
+	def memory_usage(self):
+		""" Return the number of bytes used to store the history. """
+		frames = list(self._keyframes.values()) + [changed for changed, _ in self._deltas.values()]
+		return sum(int(df.memory_usage(index=True).sum()) for df in frames) + sum(removed.nbytes for _, removed in self._deltas.values())
@@ -0,0 +1,226 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+_epoch = datetime.date(1970, 1, 1)
+
+
+def to_day(date):
+	"""
+	Convert a date to a number of days since 1970-01-01.
+
+	Parameters
+	----------
+	date : datetime.date, str
+		Date, or string formatted as 'yyyy-mm-dd' or as 'yyyy-w' for the last day (Sunday) of an ISO week, e.g. '2021-7'.
+
+	Returns
+	-------
+	int
+	"""
+	if isinstance(date, str):
+		if date.count('-') == 1:
+			year, week = map(int, date.split('-'))
+			date = datetime.date.fromisocalendar(year, week, 7)
+		else:
+			date = datetime.date.fromisoformat(date)
+	if isinstance(date, datetime.datetime):
+		date = date.date()
+	return (date - _epoch).days
+
+
+def _rider_results_days(year, dates):
+	""" Convert 'dd.mm' dates from a rider's year results to days since 1970-01-01. """
+	days = []
+	for date in dates:
+		if isinstance(date, float) and not np.isnan(date): # Read as a number, e.g. 4.1 for '4.10'
+			date = f'{date:.2f}'
+		try:
+			day, month = map(int, str(date).split('.')[:2])
+			days.append(to_day(datetime.date(year, month, day)))
+		except ValueError:
+			days.append(-1)
+	return np.array(days, dtype=np.int64)
+
+
+class PointsRanking:
+	"""
+	UCI points standings computed locally from parsed results.
+
+	Points are kept in flat arrays sorted by date, so the standings on any date are a slice of the rolling window
+	and one weighted bincount over it, without requesting any ranking pages.
+
+	Parameters
+	----------
+	weeks : int
+		Length of the rolling window in weeks. Results within this many weeks up to the cutoff date count.
+	riders : pd.DataFrame
+		Optional rider details indexed by Rider_ID, with any of Rider, Nation and Birth_Year columns.
+		Birth years are needed for under-23 standings.
+
+	Examples
+	--------
+	>>> ranking = PointsRanking()
+	>>> ranking.add_results(RaceEdition(race_id=9, year=2023).results(), date='2023-04-16', race=(9, 2023))
+	>>> ranking.add_rider_results(18655, 2023, Rider(18655).year_results(2023))
+	>>> ranking.standings('2023-20', nation='SLO').head()
+	"""
+
+	def __init__(self, weeks=52, riders=None):
+		self.weeks = weeks
+		self.riders = pd.DataFrame(columns=['Rider', 'Nation', 'Birth_Year'], index=pd.Index([], name='Rider_ID'))
+		self._pending = []
+		self._batch = 0
+		self._entries = pd.DataFrame({'Race': pd.Series(dtype=object), 'Day': pd.Series(dtype=np.int64),
+			'Rider_ID': pd.Series(dtype=np.int64), 'Points': pd.Series(dtype=float), 'Batch': pd.Series(dtype=np.int64)})
+		self._arrays = None
+		if riders is not None:
+			self.update_riders(riders)
+
+	def update_riders(self, riders):
+		"""
+		Add or update rider details.
+
+		Parameters
+		----------
+		riders : pd.DataFrame
+			Rider details indexed by Rider_ID, with any of Rider, Nation and Birth_Year columns.
+		"""
+		riders = riders[[col for col in self.riders.columns if col in riders]]
+		new = riders.index.difference(self.riders.index)
+		self.riders = pd.concat([self.riders, pd.DataFrame(index=new, columns=self.riders.columns)])
+		self.riders.update(riders)
+		self.riders.index.name = 'Rider_ID'
+		self._arrays = None
+
+	def _add(self, races, days, rider_ids, points):
+		""" Add a batch of points, with one race key, day, rider ID and points value per entry. """
+		self._batch += 1
+		keys = np.empty(len(races), dtype=object) # Filled element-wise so tuple keys are not unpacked
+		keys[:] = races
+		keep = ~np.isnan(points) & (points != 0) & (days >= 0)
+		self._pending.append(pd.DataFrame({'Race': keys[keep], 'Day': days[keep], 'Rider_ID': rider_ids[keep], 'Points': points[keep], 'Batch': self._batch}))
+
+		# Races left without any points still replace their previous entries, through a marker row dropped on consolidation
+		kept = set(pd.unique(keys[keep]))
+		replaced = [key for key in pd.unique(keys) if key not in kept]
+		if replaced:
+			markers = np.empty(len(replaced), dtype=object)
+			markers[:] = replaced
+			self._pending.append(pd.DataFrame({'Race': markers, 'Day': 0, 'Rider_ID': 0, 'Points': np.nan, 'Batch': self._batch}))
+		self._arrays = None
+
+	def add_results(self, results, date, race):
+		"""
+		Add the UCI points of a race or stage result.
+
+		Adding results again for the same race replaces its previous results.
+
+		Parameters
+		----------
+		results : RaceEditionResults or pd.DataFrame
+			Results with Rider_ID and UCI columns, e.g. RaceEdition(...).results().
+			Rider and Rider_Country columns, if present, fill in rider names and nations.
+		date : datetime.date or str
+			Date the points were awarded, e.g. '2023-04-16'.
+		race : hashable
+			Key identifying the result, e.g. (race_id, year, stage_num, classification_num).
+		"""
+		table = getattr(results, 'results_table', results)
+		if table is None or 'Rider_ID' not in table or 'UCI' not in table:
+			return
+		table = table[pd.to_numeric(table['Rider_ID'], errors='coerce').notna()]
+		details = table.drop_duplicates('Rider_ID').rename(columns={'Rider_Country': 'Nation'})
+		self.update_riders(details.set_index(details['Rider_ID'].astype(np.int64)))
+
+		days = np.full(len(table), to_day(date), dtype=np.int64)
+		points = pd.to_numeric(table['UCI'], errors='coerce').to_numpy(dtype=float)
+		self._add([race] * len(table), days, table['Rider_ID'].to_numpy(dtype=np.int64), points)
+
+	def add_rider_results(self, rider_id, year, results):
+		"""
+		Add the UCI points from a rider's year results.
+
+		Each row is keyed by its Race_ID, year and race label, so adding the same year again replaces it.
+		Do not also add the same races with add_results, as the two cannot be matched.
+
+		Parameters
+		----------
+		rider_id : int
+			Rider ID.
+		year : int
+			Year of the results.
+		results : RiderYearResults or pd.DataFrame
+			Year results with Date, Race and UCI columns, e.g. Rider(...).year_results(year).
+		"""
+		table = getattr(results, 'results_df', results)
+		if table is None or table.empty or 'UCI' not in table:
+			return
+		races = list(zip(table['Race_ID'] if 'Race_ID' in table else [None] * len(table), [year] * len(table), table['Race']))
+		points = pd.to_numeric(table['UCI'], errors='coerce').to_numpy(dtype=float)
+		self._add(races, _rider_results_days(year, table['Date']), np.full(len(table), rider_id, dtype=np.int64), points)
+
+	def _consolidate(self):
+		""" Merge added results, keeping only the latest results added for each race, and build the sorted arrays. """
+		if self._arrays is not None:
+			return self._arrays
+
+		if self._pending:
+			entries = pd.concat([self._entries, *self._pending], ignore_index=True)
+			latest = entries.groupby('Race', sort=False)['Batch'].transform('max')
+			entries = entries[(entries['Batch'] == latest) & entries['Points'].notna()]
+			self._entries = entries.sort_values('Day', kind='stable').reset_index(drop=True)
+			self._pending = []
+
+		rider_codes, rider_ids = pd.factorize(self._entries['Rider_ID'])
+		details = self.riders.reindex(rider_ids)
+		self._arrays = {
+			'day': self._entries['Day'].to_numpy(dtype=np.int64),
+			'rider': rider_codes,
+			'points': self._entries['Points'].to_numpy(dtype=float),
+			'rider_ids': rider_ids.to_numpy(dtype=np.int64),
+			'nation': details['Nation'].to_numpy(dtype=object),
+			'birth_year': pd.to_numeric(details['Birth_Year'], errors='coerce').to_numpy(dtype=float),
+		}
+		return self._arrays
+
+	def standings(self, date=None, nation=None, u23=False):
+		"""
+		Compute the standings on a date.
+
+		Parameters
+		----------
+		date : datetime.date or str
+			Cutoff date, formatted as 'yyyy-mm-dd' or 'yyyy-w' for the end of an ISO week. Defaults to today.
+		nation : str
+			Three-letter country code to filter riders to, e.g. 'BEL'.
+		u23 : bool
+			If True, only include riders under 23 in the year of the cutoff date. Riders without a known birth year are excluded.
+
+		Returns
+		-------
+		pd.DataFrame
+			Table with Pos, Rider_ID, Rider, Nation and Points columns, sorted by points.
+		"""
+		arrays = self._consolidate()
+		day = to_day(date or datetime.date.today())
+		start, stop = np.searchsorted(arrays['day'], [day - 7 * self.weeks, day], side='right')
+
+		totals = np.bincount(arrays['rider'][start:stop], weights=arrays['points'][start:stop], minlength=len(arrays['rider_ids']))
+		mask = totals > 0
+		if nation is not None:
+			mask &= arrays['nation'] == nation
+		if u23:
+			year = (_epoch + datetime.timedelta(days=day)).year
+			mask &= year - arrays['birth_year'] <= 22 # Comparisons with NaN are False
+
+		order = np.flatnonzero(mask)[np.argsort(-totals[mask], kind='stable')]
+		rider_ids = arrays['rider_ids'][order]
+		return pd.DataFrame({
+			'Pos': pd.Series(totals[order]).rank(method='min', ascending=False).astype(int),
+			'Rider_ID': rider_ids,
+			'Rider': self.riders['Rider'].reindex(rider_ids).to_numpy(),
+			'Nation': arrays['nation'][order],
+			'Points': totals[order],
+		})
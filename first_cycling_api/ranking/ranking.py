@@ -1,5 +1,5 @@
 from .endpoints import RankingEndpoint
-from ..api import fc
+from ..api import get_client
 
 class Ranking:
 	"""
@@ -10,12 +10,14 @@ class Ranking:
 	>>> Ranking(h=1, rank=1, y=2020, page=2)
 	<first_cycling_api.ranking.endpoints.RankingEndpoint at 0x295caddccd0>
 	"""
-	def __new__(cls, **kwargs):
+	def __new__(cls, client=None, **kwargs):
 		"""
 		Obtain a ranking endpoint.
 
 		Parameters
 		----------
+		client : FirstCyclingAPI
+			Client to fetch the page with. If None, uses the client set with api.use_client, or else api.fc.
 		rank : int or str
 			For UCI Ranking, {1: 'World', 2: 'One-day race', 3: 'Stage race', 4: 'Africa Tour', 5: 'America Tour', 6: 'Europe Tour', 7: 'Asia Tour', 8: 'Oceania Tour', 99: 'Women'}.
 			For FirstCycling Ranking, {'el': Men Elite, 'jr': Men Junior, 'wel': Women Elite, 'wjr': Women Junior}.
@@ -49,4 +51,6 @@ class Ranking:
 		-------
 		RankingEndpoint
 		"""
-		return RankingEndpoint(fc.get_ranking_endpoint(**kwargs))
\ No newline at end of file
+		client = get_client(client)
+		with client.instrumented():
+			return RankingEndpoint(client.get_ranking_endpoint(**kwargs))
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+Rate Limits
+===========
+
+Provides rate limiters to control how often firstcycling.com is requested.
+
+Examples
+--------
+>>> from first_cycling_api.api import fc
+>>> fc.rate_limiter = RateLimiter(rate=2) # At most 2 requests per second from this process
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+	"""
+	Token bucket rate limiter shared by the threads of a process.
+
+	Parameters
+	----------
+	rate : float
+		Number of requests allowed per period.
+	period : float
+		Length of the period in seconds.
+	burst : int
+		Maximum number of requests which may be made at once after a quiet spell. Defaults to rate.
+	"""
+
+	def __init__(self, rate, period=1.0, burst=None):
+		self.rate = rate
+		self.period = period
+		self.burst = burst if burst is not None else max(1, int(rate))
+		self._tokens = self.burst
+		self._updated = time.monotonic()
+		self._lock = threading.Lock()
+
+	def acquire(self):
+		""" Block until a request may be made. """
+		while True:
+			with self._lock:
+				now = time.monotonic()
+				self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate / self.period)
+				self._updated = now
+				if self._tokens >= 1:
+					self._tokens -= 1
+					return
+				wait = (1 - self._tokens) * self.period / self.rate
+			time.sleep(wait)
+
+
+class RedisRateLimiter:
+	"""
+	Fixed window rate limiter shared by every process using the same Redis server.
+
+	Parameters
+	----------
+	redis : str or redis.Redis
+		Redis URL, e.g. 'redis://localhost:6379/0', or a Redis-compatible client.
+	rate : int
+		Number of requests allowed per period across all processes.
+	period : float
+		Length of the period in seconds.
+	name : str
+		Prefix for the Redis keys used by the limiter.
+	"""
+
+	def __init__(self, redis, rate, period=1.0, name='first_cycling_api:ratelimit'):
+		self.url, self._client = (redis, None) if isinstance(redis, str) else (None, redis)
+		self.rate = rate
+		self.period = period
+		self.name = name
+
+	@property
+	def client(self):
+		if self._client is None:
+			import redis
+			self._client = redis.Redis.from_url(self.url)
+		return self._client
+
+	def __getstate__(self):
+		if self.url is None:
+			raise TypeError('RedisRateLimiter can only be sent to other processes when created from a Redis URL.')
+		return {**vars(self), '_client': None}
+
+	def acquire(self):
+		""" Block until a request may be made. """
+		while True:
+			now = time.time()
+			window = int(now // self.period)
+			key = f'{self.name}:{window}'
+			count = self.client.incr(key)
+			if count == 1:
+				self.client.expire(key, int(self.period) + 1)
+			if count <= self.rate:
+				return
+			time.sleep((window + 1) * self.period - now)
@@ -19,6 +19,8 @@ class RiderEndpoint(ParsedEndpoint):
 		Details from right sidebar, including nation, date of birth, height, and more.
 	"""
 
+	_regions = [('p', None)]
+
 	def _parse_soup(self):
 		self._get_years_active()
 		self._get_header_details()
@@ -42,6 +44,82 @@ class RiderEndpoint(ParsedEndpoint):
 		self.sidebar_details = {}
 
 
+class _RiderMainTable(ParsedEndpoint):
+	""" Parsing of the main table of a rider page, shared by RiderPageTable and RiderTableEndpoint. """
+
+	def _get_main_table(self):
+		# The table with the most rows, ignoring the year details table
+		tables = [table for table in self.soup.find_all('table', {'class': 'tablesorter'}) if 'notOddEven' not in table['class']]
+		self.table = parse_table(max(tables, key=lambda table: len(table.find_all('tr')))) if tables else None
+
+
+class RiderPageTable(_RiderMainTable):
+	"""
+	Main table of a rider page, without the header details shared by all rider pages.
+
+	Attributes
+	----------
+	table : pd.DataFrame
+		Main table of the page, e.g. the rider's victories or teams.
+	"""
+
+	_regions = [('table', {'class': 'tablesorter'})]
+
+	def _parse_soup(self):
+		self._get_main_table()
+
+
+class RiderTableEndpoint(RiderEndpoint, _RiderMainTable):
+	"""
+	Rider page response with its main table. Extends RiderEndpoint.
+
+	Attributes
+	----------
+	table : pd.DataFrame
+		Main table of the page, e.g. the rider's victories or teams.
+	"""
+
+	_regions = [('table', {'class': 'tablesorter'})]
+
+	def _parse_soup(self):
+		super()._parse_soup()
+		self._get_main_table()
+
+
+class RiderProfileBundle:
+	"""
+	Several rider pages loaded together.
+
+	Attributes
+	----------
+	years_active : list[int]
+		List of years in which rider was active.
+	header_details : dict
+		Details from page header, including rider name and external links.
+	sidebar_details : dict
+		Details from right sidebar, including nation, date of birth, height, and more.
+	tables : dict {str : pd.DataFrame}
+		Maps page names, e.g. 'victories', to the main table of the page.
+	"""
+
+	def __init__(self, responses):
+		"""
+		Parameters
+		----------
+		responses : dict {str : bytes}
+			Maps page names to raw responses from firstcycling.com. Must not be empty.
+		"""
+		if not responses:
+			raise ValueError('RiderProfileBundle needs the response of at least one page.')
+		names = list(responses)
+		first = RiderTableEndpoint(responses[names[0]]) # Parse shared header details once
+		self.years_active = first.years_active
+		self.header_details = first.header_details
+		self.sidebar_details = first.sidebar_details
+		self.tables = {names[0]: first.table}
+		self.tables.update({name: RiderPageTable(responses[name]).table for name in names[1:]})
+
+
 class RiderYearResults(RiderEndpoint):
 	"""
 	Rider's results in a certain year. Extends RiderEndpoint.
@@ -54,6 +132,8 @@ class RiderYearResults(RiderEndpoint):
 		Table of rider's results from the year.
 	"""
 
+	_regions = [('table', {'class': 'tablesorter'})]
+
 	def _parse_soup(self):
 		super()._parse_soup()
 		self._get_year_details()
@@ -1,6 +1,19 @@
 from ..objects import FirstCyclingObject
-from .endpoints import RiderEndpoint, RiderYearResults
-from ..api import fc
+from .endpoints import RiderEndpoint, RiderYearResults, RiderProfileBundle
+from ..batch import map_concurrently, DEFAULT_MAX_WORKERS
+
+# Parameters for each page in Rider.profile_bundle, matching the corresponding Rider methods
+_profile_pages = {
+	'best_results': {'high': 1},
+	'victories': {'high': 1, 'k': 1},
+	'grand_tour_results': {'high': 1, 'k': 2},
+	'monument_results': {'high': 1, 'k': 3},
+	'team_and_ranking': {'stats': 1},
+	'race_history': {'stats': 1, 'k': 1},
+	'one_day_races': {'stats': 1, 'k': 2},
+	'stage_races': {'stats': 1, 'k': 3},
+	'teams': {'teams': 1},
+}
 
 class Rider(FirstCyclingObject):
 	"""
@@ -10,11 +23,13 @@ class Rider(FirstCyclingObject):
 	----------
 	ID : int
 		The firstycling.com ID for the rider from the URL of their profile page.
+	client : FirstCyclingAPI
+		Client to fetch pages with. If None, uses the client set with api.use_client, or else api.fc.
 	"""
 	_default_endpoint = RiderEndpoint
 
 	def _get_response(self, **kwargs):
-		return fc.get_rider_endpoint(self.ID, **kwargs)
+		return self._get_client().get_rider_endpoint(self.ID, **kwargs)
 
 	def year_results(self, year=None):
 		"""
@@ -133,4 +148,35 @@ class Rider(FirstCyclingObject):
 		-------
 		RiderEndpoint
 		"""
-		return self._get_endpoint(teams=1)
\ No newline at end of file
+		return self._get_endpoint(teams=1)
+
+	def profile_bundle(self, pages=None, max_workers=DEFAULT_MAX_WORKERS):
+		"""
+		Get several of the rider's pages at once, requesting them concurrently.
+
+		Parameters
+		----------
+		pages : list[str]
+			Names of the Rider methods whose pages to load, e.g. ['victories', 'teams'].
+			If None, loads best_results, victories, grand_tour_results, monument_results, team_and_ranking,
+			race_history, one_day_races, stage_races and teams.
+		max_workers : int
+			Maximum number of pages to request at once.
+
+		Returns
+		-------
+		RiderProfileBundle
+
+		Raises
+		------
+		ValueError
+			If pages is empty or names a page which cannot be bundled.
+		"""
+		pages = list(_profile_pages) if pages is None else list(pages)
+		if not pages:
+			raise ValueError('pages must name at least one page.')
+		unknown = [page for page in pages if page not in _profile_pages]
+		if unknown:
+			raise ValueError(f'Cannot bundle {unknown}, pages must be among {list(_profile_pages)}.')
+		responses = map_concurrently(lambda page: self._get_response(**_profile_pages[page]), pages, max_workers=max_workers)
+		return RiderProfileBundle(dict(zip(pages, responses)))
\ No newline at end of file
@@ -0,0 +1,277 @@
+"""
+Scheduler
+=========
+
+Provides a request scheduler which lets interactive lookups overtake bulk crawls sharing the same rate limit.
+
+Requests wait in the scheduler until it is their turn, then take a token from the scheduler's rate limiter and are
+sent. The next request is chosen by priority class first. Within a class, requests with a deadline go first, earliest
+deadline first, and the others take turns between callers. A caller is the client making the request unless
+set with request_priority, so one crawl with many workers cannot crowd out another. Requests still
+waiting when their deadline passes fail with DeadlineExceeded instead of being sent.
+
+Bulk requests get all capacity not used by interactive ones. An interactive request waits for at most one
+request already taking a rate limit token. A waiting request can be promoted to a higher class, e.g. when a caller
+needs a page which is still queued as a bulk prefetch.
+
+Examples
+--------
+Share one rate limit between a backfill crawl and interactive lookups:
+
+>>> scheduler = RequestScheduler(rate_limiter=RateLimiter(rate=2))
+>>> bulk = FirstCyclingAPI(scheduler=scheduler)
+>>> interactive = FirstCyclingAPI(scheduler=scheduler, cache=ResponseCache())
+>>> def backfill():
+...     with request_priority('bulk'):
+...         CrawlJob('crawl.db').run(workers=8, client=bulk)
+>>> threading.Thread(target=backfill).start()
+>>> with request_priority('interactive', timeout=5):
+...     Rider(18655, client=interactive).year_results(2020) # Sent as soon as a token is available
+"""
+
+import contextlib
+import contextvars
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+from .instrumentation import timer, increment
+
+PRIORITIES = {'interactive': 0, 'normal': 1, 'bulk': 2}
+""" Priority classes, from most to least urgent. """
+
+_request_priority = contextvars.ContextVar('first_cycling_api_request_priority', default=('normal', None, None))
+
+
+class DeadlineExceeded(TimeoutError):
+	""" Raised when a request is still waiting in the scheduler when its deadline passes. """
+
+
+@contextlib.contextmanager
+def request_priority(priority, caller=None, timeout=None, deadline=None):
+	"""
+	Set the priority of requests made in this context.
+
+	The context is inherited by batch.map_concurrently worker threads and prefetches.
+
+	Parameters
+	----------
+	priority : str
+		One of PRIORITIES, e.g. 'interactive' or 'bulk'.
+	caller : hashable
+		Identity of the caller requests are queued under, for fair queuing. Defaults to the client making the request.
+	timeout : float
+		Seconds from entering the context after which waiting requests fail with DeadlineExceeded.
+	deadline : float
+		time.monotonic() value after which waiting requests fail with DeadlineExceeded. Overrides timeout.
+	"""
+	if priority not in PRIORITIES:
+		raise ValueError(f'priority must be one of {list(PRIORITIES)}, not {priority!r}')
+	if deadline is None and timeout is not None:
+		deadline = time.monotonic() + timeout
+	token = _request_priority.set((priority, caller, deadline))
+	try:
+		yield
+	finally:
+		_request_priority.reset(token)
+
+
+class _Ticket:
+	__slots__ = ('priority', 'caller', 'deadline', 'seq', 'key')
+
+	def __init__(self, priority, caller, deadline, seq, key):
+		self.priority = priority
+		self.caller = caller
+		self.deadline = deadline
+		self.seq = seq
+		self.key = key
+
+
+def _request_key(url, params):
+	return url, json.dumps({k: str(v) for k, v in params.items()}, sort_keys=True)
+
+
+class RequestScheduler:
+	"""
+	Thread-safe scheduler of requests by priority class, caller and deadline, which can be shared by several clients.
+
+	Parameters
+	----------
+	rate_limiter : ratelimit.RateLimiter or ratelimit.RedisRateLimiter
+		If given, a token is taken from it for each request when it is dispatched. Give the rate limiter to the
+		scheduler rather than to the clients, or requests will queue on it without priority.
+	max_in_flight : int
+		If given, the maximum number of requests sent and not yet answered at once.
+
+	Attributes
+	----------
+	dispatched : dict {str : int}
+		Number of requests dispatched in each priority class.
+	"""
+
+	def __init__(self, rate_limiter=None, max_in_flight=None):
+		self.rate_limiter = rate_limiter
+		self.max_in_flight = max_in_flight
+		self.dispatched = {priority: 0 for priority in PRIORITIES}
+		self._queues = {priority: OrderedDict() for priority in sorted(PRIORITIES, key=PRIORITIES.get)} # Caller -> deque of tickets
+		self._seq = itertools.count()
+		self._dispatching = False
+		self._in_flight = 0
+		self._cond = threading.Condition()
+
+	def pending(self):
+		""" Return the number of requests waiting in each priority class. """
+		with self._cond:
+			return {priority: sum(map(len, callers.values())) for priority, callers in self._queues.items()}
+
+	def _next(self):
+		""" Return the ticket to dispatch next, or None if none are waiting. """
+		for callers in self._queues.values():
+			if not callers:
+				continue
+			with_deadline = [ticket for tickets in callers.values() for ticket in tickets if ticket.deadline is not None]
+			if with_deadline:
+				return min(with_deadline, key=lambda ticket: (ticket.deadline, ticket.seq))
+			return next(iter(callers.values()))[0] # Callers rotate to the back when served
+		return None
+
+	def _remove(self, ticket):
+		callers = self._queues[ticket.priority]
+		tickets = callers[ticket.caller]
+		tickets.remove(ticket)
+		if tickets:
+			callers.move_to_end(ticket.caller)
+		else:
+			del callers[ticket.caller]
+
+	def _wait_turn(self, ticket):
+		""" Block until ticket is next to dispatch and a request may be sent, then remove it from the queue. """
+		with self._cond:
+			try:
+				while True:
+					if ticket.deadline is not None and time.monotonic() >= ticket.deadline:
+						increment('deadline_exceeded')
+						raise DeadlineExceeded(f'Request waited in the scheduler past its deadline ({ticket.priority} priority)')
+					if not self._dispatching and (self.max_in_flight is None or self._in_flight < self.max_in_flight) and self._next() is ticket:
+						self._remove(ticket)
+						self._dispatching = True
+						return
+					self._cond.wait(None if ticket.deadline is None else ticket.deadline - time.monotonic())
+			except BaseException:
+				self._remove(ticket)
+				self._cond.notify_all()
+				raise
+
+	def promote(self, url, params, priority=None):
+		"""
+		Raise waiting requests for a page to a priority class, e.g. when a caller needs a page being prefetched.
+
+		Parameters
+		----------
+		url : str
+			Page URL without query string.
+		params : dict
+			Query parameters of the request.
+		priority : str
+			One of PRIORITIES. Defaults to the priority set for the current context with request_priority.
+
+		Returns
+		-------
+		bool
+			True if a request for the page is waiting, at this priority or higher once promoted.
+		"""
+		priority = priority if priority is not None else _request_priority.get()[0]
+		key = _request_key(url, params)
+		found = False
+		with self._cond:
+			for tickets in [tickets for callers in self._queues.values() for tickets in callers.values()]:
+				for ticket in [ticket for ticket in tickets if ticket.key == key]:
+					found = True
+					if PRIORITIES[ticket.priority] > PRIORITIES[priority]:
+						self._remove(ticket)
+						ticket.priority = priority
+						self._queues[priority].setdefault(ticket.caller, deque()).append(ticket)
+						increment('promoted')
+			if found:
+				self._cond.notify_all()
+		return found
+
+	@contextlib.contextmanager
+	def dispatch(self, url, params, caller=None):
+		"""
+		Wait for a request's turn, then hold its place among the requests in flight until the context exits.
+
+		Use it instead of run when the response is read after the request returns, e.g. a streamed body.
+
+		Parameters
+		----------
+		url : str
+			Page URL without query string.
+		params : dict
+			Query parameters of the request.
+		caller : hashable
+			Identity of the caller, used unless one is set with request_priority.
+
+		Raises
+		------
+		DeadlineExceeded
+			If the deadline set with request_priority passes before the request is sent.
+		"""
+		priority, context_caller, deadline = _request_priority.get()
+		caller = context_caller if context_caller is not None else caller
+		ticket = _Ticket(priority, caller, deadline, next(self._seq), _request_key(url, params))
+		with self._cond:
+			self._queues[priority].setdefault(caller, deque()).append(ticket)
+
+		with timer('queue'):
+			self._wait_turn(ticket)
+			try:
+				if self.rate_limiter is not None: # Only the dispatching request waits here, so tokens go out in priority order
+					self.rate_limiter.acquire()
+			except BaseException:
+				with self._cond:
+					self._dispatching = False
+					self._cond.notify_all()
+				raise
+
+		with self._cond:
+			self._dispatching = False
+			self._in_flight += 1
+			self.dispatched[ticket.priority] += 1 # Promoted tickets count in the class they were sent from
+			self._cond.notify_all()
+		try:
+			yield
+		finally:
+			with self._cond:
+				self._in_flight -= 1
+				self._cond.notify_all()
+
+	def run(self, fetch, url, params, caller=None):
+		"""
+		Wait for the request's turn, then send it.
+
+		Parameters
+		----------
+		fetch : callable
+			Called as ``fetch(url, params)`` to send the request.
+		url : str
+			Page URL without query string.
+		params : dict
+			Query parameters of the request.
+		caller : hashable
+			Identity of the caller, used unless one is set with request_priority.
+
+		Returns
+		-------
+		object
+			Return value of fetch.
+
+		Raises
+		------
+		DeadlineExceeded
+			If the deadline set with request_priority passes before the request is sent.
+		"""
+		with self.dispatch(url, params, caller=caller):
+			return fetch(url, params)
@@ -0,0 +1,356 @@
+"""
+Search
+=========
+
+Provides a local index of rider, race and team names for resolving names to firstcycling.com IDs without any requests.
+
+Every table parsed with parse_table pairs names with IDs, e.g. Rider with Rider_ID. A NameIndex collects these pairs
+from the pages a client loads, or from tables passed to it directly, and matches names regardless of accents, case,
+punctuation and word order. Queries can be prefixes, e.g. 'pogac', or misspelled, e.g. 'Pogacar Tadei'.
+
+Examples
+--------
+Index every page a client loads, and keep the index on disk between sessions:
+
+>>> index = NameIndex('names.db')
+>>> client = FirstCyclingAPI(name_index=index)
+>>> RaceEdition(race_id=9, year=2019, client=client).results()
+>>> index.save()
+>>> index.resolve(['Mathieu van der Poel', 'Jakob Fuglsang'])
+{'Mathieu van der Poel': 16672, 'Jakob Fuglsang': 264}
+>>> index.search('fuglsan')
+"""
+
+import bisect
+import contextlib
+import contextvars
+import heapq
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from contextlib import closing
+
+KINDS = ('rider', 'race', 'team')
+""" Kinds of names held in an index. """
+
+_NAME_COLUMNS = {
+	'Rider': 'rider', 'Winner': 'rider', 'Second': 'rider', 'Third': 'rider',
+	'Race': 'race',
+	'Team': 'team',
+}
+
+_TRANSLITERATIONS = str.maketrans({'ø': 'o', 'æ': 'ae', 'œ': 'oe', 'ß': 'ss', 'đ': 'd', 'ð': 'd', 'ł': 'l', 'þ': 'th', 'ı': 'i'})
+_non_word_regex = re.compile(r'[\W_]+')
+_indexes = contextvars.ContextVar('first_cycling_api_name_indexes', default=())
+
+
+def normalize(name):
+	"""
+	Normalize a name for matching: strip accents, case and punctuation.
+
+	Parameters
+	----------
+	name : str
+
+	Returns
+	-------
+	str
+		Lowercase ASCII words separated by single spaces, e.g. 'pogacar tadej' for 'POGAČAR Tadej'.
+	"""
+	name = unicodedata.normalize('NFKD', str(name).casefold().translate(_TRANSLITERATIONS))
+	name = ''.join(char for char in name if not unicodedata.combining(char))
+	return _non_word_regex.sub(' ', name).strip()
+
+
+def _signature(normalized):
+	""" Words of a normalized name in sorted order, so names match regardless of word order. """
+	return ' '.join(sorted(normalized.split()))
+
+
+def _trigrams(normalized):
+	""" Trigrams of each word of a normalized name, padded with spaces so short words and word boundaries count. """
+	return {f' {word} '[i:i + 3] for word in normalized.split() for i in range(len(word))}
+
+
+def _to_id(value):
+	""" Convert an ID read from a table to int, or None if missing. """
+	try:
+		return int(value)
+	except (TypeError, ValueError):
+		return None
+
+
+class NameIndex:
+	"""
+	Thread-safe index of rider, race and team names by ID, with accent-insensitive exact, prefix and fuzzy matching.
+
+	Exact matches are found with one dictionary lookup. Prefix matches use a sorted list of words, and fuzzy matches
+	rank names by the Jaccard similarity of their word trigrams, found through an inverted index.
+
+	Parameters
+	----------
+	path : str
+		Path of an SQLite database to load names from and save them to. The database is created if it does not exist.
+		If None, the index is only held in memory.
+
+	Examples
+	--------
+	>>> index = NameIndex()
+	>>> index.add_table(RaceEdition(race_id=9, year=2019).results().results_table)
+	>>> index.search('van der poel', kind='rider')
+	"""
+
+	def __init__(self, path=None):
+		self.path = path
+		self._names = {}
+		self._exact = {}
+		self._grams = {}
+		self._gram_counts = {}
+		self._words = []
+		self._words_sorted = True
+		self._dirty = set()
+		self._lock = threading.RLock()
+		if path is not None:
+			with closing(sqlite3.connect(path)) as conn, conn:
+				conn.execute('CREATE TABLE IF NOT EXISTS names (kind TEXT NOT NULL, id INTEGER NOT NULL, name TEXT NOT NULL, PRIMARY KEY (kind, id))')
+				for kind, id_, name in conn.execute('SELECT kind, id, name FROM names'):
+					self._insert((kind, id_), name)
+
+	def __len__(self):
+		return len(self._names)
+
+	def __contains__(self, key):
+		return key in self._names
+
+	def name(self, kind, id_):
+		""" Return the name indexed for an ID, or None if it is not in the index. """
+		return self._names.get((kind, id_))
+
+	def _sorted_words(self):
+		""" (word, key) pairs for every word of every name, sorted. Words are appended unsorted and sorted when next needed. """
+		if not self._words_sorted:
+			self._words.sort()
+			self._words_sorted = True
+		return self._words
+
+	def _insert(self, key, name):
+		normalized = normalize(name)
+		self._names[key] = name
+		self._exact.setdefault((key[0], _signature(normalized)), set()).add(key)
+		grams = _trigrams(normalized)
+		self._gram_counts[key] = len(grams)
+		for gram in grams:
+			self._grams.setdefault(gram, set()).add(key)
+		self._words.extend((word, key) for word in set(normalized.split()))
+		self._words_sorted = False
+
+	def _remove(self, key):
+		normalized = normalize(self._names.pop(key))
+		self._exact[(key[0], _signature(normalized))].discard(key)
+		del self._gram_counts[key]
+		for gram in _trigrams(normalized):
+			self._grams[gram].discard(key)
+		words = self._sorted_words()
+		for word in set(normalized.split()):
+			del words[bisect.bisect_left(words, (word, key))]
+
+	def add(self, kind, id_, name):
+		"""
+		Add or rename an entry.
+
+		Parameters
+		----------
+		kind : str
+			One of KINDS.
+		id_ : int
+			firstcycling.com ID.
+		name : str
+			Name as shown on firstcycling.com.
+
+		Returns
+		-------
+		bool
+			True if the entry was added or renamed, False if it was already indexed with this name.
+		"""
+		if kind not in KINDS:
+			raise ValueError(f'kind must be one of {KINDS}, not {kind!r}')
+		key = (kind, int(id_))
+		name = str(name).strip()
+		with self._lock:
+			if self._names.get(key) == name:
+				return False
+			if key in self._names:
+				self._remove(key)
+			self._insert(key, name)
+			self._dirty.add(key)
+		return True
+
+	def add_table(self, table):
+		"""
+		Add every name and ID pair in a parsed table, e.g. Rider and Rider_ID, Race and Race_ID, Team and Team_ID.
+
+		Parameters
+		----------
+		table : pd.DataFrame
+			Table returned by parser.parse_table. None is ignored.
+
+		Returns
+		-------
+		int
+			Number of entries added or renamed.
+		"""
+		if table is None:
+			return 0
+		added = 0
+		for col, kind in _NAME_COLUMNS.items():
+			if col not in table or col + '_ID' not in table:
+				continue
+			for name, id_ in zip(table[col], table[col + '_ID']):
+				id_ = _to_id(id_)
+				if id_ is None or not isinstance(name, str) or not name.strip():
+					continue
+				if kind == 'race':
+					name = name.split(' | ')[0] # Drop the category, e.g. 'Slovenia RR | CN'
+				added += self.add(kind, id_, name)
+		return added
+
+	def save(self):
+		""" Write entries added or renamed since the index was loaded or last saved to its database. """
+		if self.path is None:
+			raise ValueError('NameIndex was created without a path')
+		with self._lock:
+			rows = [(kind, id_, self._names[(kind, id_)]) for kind, id_ in self._dirty]
+			self._dirty = set()
+		with closing(sqlite3.connect(self.path)) as conn, conn:
+			conn.executemany('INSERT OR REPLACE INTO names (kind, id, name) VALUES (?, ?, ?)', rows)
+
+	def _prefix_matches(self, word):
+		""" Keys of entries with a word starting with word. """
+		words = self._sorted_words()
+		start = bisect.bisect_left(words, (word,))
+		stop = bisect.bisect_left(words, (word + '\uffff',))
+		return {key for _, key in words[start:stop]}
+
+	def search(self, query, kind=None, limit=10, min_score=0.3):
+		"""
+		Find the entries best matching a name.
+
+		Exact matches (ignoring accents, case, punctuation and word order) rank first, then entries for which every word
+		of the query starts one of their words, then fuzzy matches, each ranked by trigram similarity.
+
+		Parameters
+		----------
+		query : str
+			Full, partial or misspelled name.
+		kind : str
+			One of KINDS to restrict the search to. If None, searches all kinds.
+		limit : int
+			Maximum number of matches returned.
+		min_score : float
+			Minimum trigram similarity, between 0 and 1, of fuzzy matches.
+
+		Returns
+		-------
+		pd.DataFrame
+			Table with Kind, ID, Name, Match ('exact', 'prefix' or 'fuzzy') and Score columns, best match first.
+		"""
+		import pandas as pd
+
+		with self._lock:
+			rows = [(key[0], key[1], self._names[key], match, score) for key, match, score in self._matches(query, kind, limit, min_score)]
+		return pd.DataFrame(rows, columns=['Kind', 'ID', 'Name', 'Match', 'Score'])
+
+	def _matches(self, query, kind, limit, min_score):
+		""" Best matches for query as (key, match, score) tuples. Must be called with the lock held. """
+		normalized = normalize(query)
+		words = normalized.split()
+		grams = _trigrams(normalized)
+		exact = set().union(*(self._exact.get((k, _signature(normalized)), ()) for k in ([kind] if kind else KINDS)))
+		prefix = set.intersection(*(self._prefix_matches(word) for word in words)) if words else set()
+		shared = Counter()
+		for gram in grams:
+			shared.update(self._grams.get(gram, ()))
+
+		matches = []
+		for key in exact | prefix | shared.keys():
+			if kind is not None and key[0] != kind:
+				continue
+			count = shared[key]
+			score = count / (len(grams) + self._gram_counts[key] - count) if grams else 0.0
+			rank = 0 if key in exact else 1 if key in prefix else 2
+			if rank < 2 or score >= min_score:
+				matches.append((rank, -score, key))
+		return [(key, ('exact', 'prefix', 'fuzzy')[rank], -score) for rank, score, key in heapq.nsmallest(limit, matches)]
+
+	def resolve(self, names, kind='rider', min_score=0.5):
+		"""
+		Resolve names to IDs, taking the best match for each.
+
+		Exact matches are looked up directly, so resolving thousands of known names takes milliseconds.
+
+		Parameters
+		----------
+		names : iterable[str]
+			Names to resolve.
+		kind : str
+			One of KINDS.
+		min_score : float
+			Minimum trigram similarity of a fuzzy or prefix match.
+
+		Returns
+		-------
+		dict {str : int}
+			ID for each name, or None if no entry matches well enough or several entries match exactly.
+		"""
+		resolved = {}
+		for name in names:
+			if name in resolved:
+				continue
+			with self._lock:
+				exact = self._exact.get((kind, _signature(normalize(name))), ())
+				if exact:
+					resolved[name] = next(iter(exact))[1] if len(exact) == 1 else None
+					continue
+				matches = [(score, key) for key, _, score in self._matches(name, kind, 5, min_score) if score >= min_score]
+			resolved[name] = max(matches)[1][1] if matches else None
+		return resolved
+
+	def collect(self):
+		"""
+		Return a context manager adding the tables parsed in its body to the index.
+
+		The context is inherited by batch.map_concurrently worker threads. A client with a name_index enters it around
+		every page it loads.
+		"""
+		return collect(self)
+
+
+@contextlib.contextmanager
+def collect(index):
+	"""
+	Add the name and ID pairs of every table parsed in this context to index.
+
+	Parameters
+	----------
+	index : NameIndex
+
+	Yields
+	------
+	NameIndex
+	"""
+	if index in _indexes.get(): # Already collecting into it, e.g. around nested calls of the same client
+		yield index
+		return
+	token = _indexes.set(_indexes.get() + (index,))
+	try:
+		yield index
+	finally:
+		_indexes.reset(token)
+
+
+def record_table(table):
+	""" Add a parsed table to the indexes collecting in this context. Called by parser.parse_table. """
+	for index in _indexes.get():
+		index.add_table(table)
@@ -0,0 +1,177 @@
+"""
+Streaming
+=========
+
+Provides incremental parsing of table rows while a page is still downloading.
+
+Endpoints wait for the whole response before parsing it. For long pages, such as ranking pages, startlists and victory
+tables, stream_rows instead feeds the response into lxml's pull parser chunk by chunk and yields each table row as
+soon as its closing tag arrives. Rows are discarded from the tree once yielded, so memory stays bounded however long
+the table is.
+
+Rows hold the text of each cell keyed by column header, with the same ID and country columns parse_table adds, e.g.
+Rider_ID and Rider_Country for a Rider column. Values are not converted to numbers.
+
+Examples
+--------
+>>> for row in stream_rows('ranking.php', table_class='tablesorter', h=1, rank=1, y=2020, page=1):
+...     print(row['Pos'], row['Rider'], row['Rider_ID'])
+
+Rows can also be parsed from any iterable of byte chunks, e.g. a file read in blocks:
+
+>>> with open('ranking.html', 'rb') as f:
+...     table = pd.DataFrame(iter_rows(iter(lambda: f.read(16384), b'')))
+"""
+
+import contextlib
+import contextvars
+
+from .api import get_client
+from .parser import get_url_parameters, rider_link_to_id, team_link_to_id, img_to_country_code, get_img_name
+
+DEFAULT_CHUNK_SIZE = 16384
+""" Bytes read from the response at a time. """
+
+
+def _cell_values(header, td):
+	""" Return the text of a cell under header, with the information hidden in its tags, as a dict. """
+	text = ' '.join(''.join(td.itertext()).split())
+	values = {header: text if text and text != '-' else None}
+	a, img = td.find('.//a'), td.find('.//img')
+	if header in ('Rider', 'Winner', 'Second', 'Third'):
+		values[header + '_ID'] = rider_link_to_id(a.attrib) if a is not None and 'r=' in a.get('href', '') else None
+		values[header + '_Country'] = img_to_country_code(img.attrib) if img is not None else None
+	elif header == 'Team':
+		values['Team_ID'] = team_link_to_id(a.attrib) if a is not None and 'l=' in a.get('href', '') else None
+		values['Team_Country'] = img_to_country_code(img.attrib) if img is not None else None
+	elif header == 'Race':
+		values['Race_ID'] = get_url_parameters(a.get('href')).get('r') if a is not None else None
+	elif header == 'Race_Country':
+		values['Race_Country'] = img_to_country_code(img.attrib) if img is not None else None
+	elif header == '':
+		del values['']
+		values['Icon'] = get_img_name(img.attrib) if img is not None else None
+	return values
+
+
+def _headers(tr):
+	""" Column names of a header row, naming the flag column before a second Race column Race_Country as parse_table does. """
+	headers = [' '.join(''.join(th.itertext()).split()) for th in tr.iterchildren('th', 'td') for _ in range(int(th.get('colspan', 1)))]
+	if headers.count('Race') > 1:
+		headers[headers.index('Race')] = 'Race_Country'
+	return headers
+
+
+def iter_rows(chunks, table_class=None, encoding='utf-8'):
+	"""
+	Parse table rows incrementally from chunks of an HTML page.
+
+	Parameters
+	----------
+	chunks : iterable[bytes]
+		The page in chunks, in order.
+	table_class : str or tuple[str]
+		If given, only rows of tables with this class, or with any of these classes, are yielded, e.g. 'sortTabell'.
+		Otherwise rows of every table are.
+	encoding : str
+		Encoding of the page.
+
+	Yields
+	------
+	dict
+		Values of a row keyed by column header, with the ID and country columns parse_table adds.
+		Rows of tables without a header row are keyed by column number.
+	"""
+	from lxml import etree
+
+	parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+	classes = {table_class} if isinstance(table_class, str) else set(table_class or ())
+	table_depth = 0 # Depth of nested tables inside the table being streamed
+	headers = None
+
+	def handle(events):
+		nonlocal table_depth, headers
+		for event, element in events:
+			tag = element.tag
+			if tag == 'table':
+				if event == 'start':
+					if table_depth:
+						table_depth += 1
+					elif not classes or classes.intersection(element.get('class', '').split()):
+						table_depth, headers = 1, None
+				elif table_depth > 1:
+					table_depth -= 1 # Nested tables are kept as part of their cell
+				else:
+					table_depth = 0
+					element.clear(keep_tail=True)
+			elif tag == 'tr' and event == 'end' and table_depth == 1:
+				if element.find('th') is not None and headers is None:
+					headers = _headers(element)
+				else:
+					cells = list(element.iterchildren('td', 'th'))
+					if cells:
+						row = {}
+						for i, td in enumerate(cells):
+							row.update(_cell_values(headers[i] if headers and i < len(headers) else i, td))
+						yield row
+				element.clear(keep_tail=True)
+				while element.getprevious() is not None: # Drop the emptied rows before it too
+					del element.getparent()[0]
+			elif event == 'end' and not table_depth:
+				element.clear(keep_tail=True) # Nothing outside the streamed tables is kept
+
+	for chunk in chunks:
+		parser.feed(chunk)
+		yield from handle(parser.read_events())
+	parser.close()
+	yield from handle(parser.read_events())
+
+
+def stream_rows(resource, table_class=None, client=None, chunk_size=DEFAULT_CHUNK_SIZE, **params):
+	"""
+	Request a page and yield its table rows as they download.
+
+	The request goes through the client's cache, scheduler, rate limiter and archive like any other. Downloading and
+	parsing run in a copy of the caller's context taken at the first row, so the client's metrics and name index do not
+	record the caller's own code between rows.
+
+	Parameters
+	----------
+	resource : str
+		Page to request, e.g. 'ranking.php' or 'race.php'.
+	table_class : str or tuple[str]
+		If given, only rows of tables with this class, or any of these classes, are yielded, e.g. 'tablesorter' for
+		rankings or ('sortTabell', 'sortTabell2') for race results.
+	client : FirstCyclingAPI
+		Client to fetch the page with. If None, uses the default client.
+	chunk_size : int
+		Bytes read from the response at a time.
+	**params
+		Query parameters of the page, e.g. r=9, y=2019, k=8 for the 2019 Amstel Gold Race startlist.
+
+	Yields
+	------
+	dict
+		Values of a row keyed by column header. See iter_rows.
+	"""
+	client = get_client(client)
+	rows = iter_rows(client._stream(client[resource].url(), client._fix_kwargs(**params), chunk_size), table_class=table_class)
+	context = contextvars.copy_context()
+	stack = context.run(_enter_instrumented, client)
+	try:
+		while True:
+			try:
+				row = context.run(next, rows)
+			except StopIteration:
+				return
+			yield row # Outside the context, so nothing the caller does meanwhile is recorded by the client
+	finally:
+		context.run(rows.close)
+		context.run(stack.close)
+
+
+def _enter_instrumented(client):
+	""" Enter the client's instrumentation in the current context, returning the stack which exits it. """
+	stack = contextlib.ExitStack()
+	stack.enter_context(client.instrumented())
+	return stack
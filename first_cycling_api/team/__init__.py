@@ -0,0 +1,17 @@
+"""
+Teams
+=====
+
+Access team rosters and season results.
+
+Firstcycling.com team IDs refer to a team in a single season, e.g. the Team_ID column of results and ranking tables.
+
+Examples
+--------
+>>> team = Team(17536)
+>>> team.page().roster[['Rider', 'Rider_ID']].head()
+>>> results = team.expand_roster() # Year results of every rider on the roster, loaded concurrently
+
+"""
+
+from .team import Team
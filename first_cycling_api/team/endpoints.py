@@ -0,0 +1,74 @@
+from ..endpoints import ParsedEndpoint
+from ..parser import parse_table, get_url_parameters, rider_link_to_id
+
+import re
+
+year_regex = re.compile(r'\b(19|20)\d{2}\b')
+
+
+def _race_link_to_id(a):
+	# Race IDs are kept as strings, as parse_table does
+	return get_url_parameters(a['href'])['r']
+
+
+def _link_ids(table, page, link_to_id):
+	""" Return, for each data row of table, the ID read by link_to_id from the first link to page in the row, or None. """
+	ids = []
+	for tr in table.find_all('tr'):
+		if tr.th is not None:
+			continue
+		a = tr.find('a', href=lambda href: href and page in href and 'r' in get_url_parameters(href))
+		ids.append(link_to_id(a) if a else None)
+	return ids
+
+
+class TeamEndpoint(ParsedEndpoint):
+	"""
+	Team page response. Extends Endpoint.
+
+	Attributes
+	----------
+	header_details : dict
+		Details from page header, including the team name and season.
+	roster : pd.DataFrame
+		Riders on the team, with a Rider_ID column.
+	results_table : pd.DataFrame
+		Results of the team's riders in the season, with Rider_ID and Race_ID columns where the page links them.
+	"""
+
+	_regions = [('h1', None), ('table', None)]
+
+	def _parse_soup(self):
+		self._get_header_details()
+		self._get_tables()
+
+	def _get_header_details(self):
+		self.header_details = {}
+		name = self.soup.h1.text.strip() if self.soup.h1 else None
+		year = year_regex.search(name) if name else None
+		self.header_details['name'] = year_regex.sub('', name).strip(' -') if name else None
+		self.header_details['year'] = int(year.group()) if year else None
+
+	def _get_tables(self):
+		# Tell the roster from the results by what their rows link to
+		roster, results = None, None
+		for table in self.soup.find_all('table'):
+			race_links = len(table.find_all('a', href=lambda href: href and 'race.php' in href))
+			rider_links = len(table.find_all('a', href=lambda href: href and 'rider.php' in href))
+			if race_links and (results is None or race_links > results[1]):
+				results = (table, race_links)
+			elif not race_links and rider_links and (roster is None or rider_links > roster[1]):
+				roster = (table, rider_links)
+
+		self.roster = self._parse_linked_table(roster[0]) if roster else None
+		self.results_table = self._parse_linked_table(results[0]) if results else None
+
+	def _parse_linked_table(self, table):
+		df = parse_table(table)
+		if df is None:
+			return None
+		if 'Rider_ID' not in df:
+			df['Rider_ID'] = _link_ids(table, 'rider.php', rider_link_to_id)
+		if 'Race_ID' not in df and table.find('a', href=lambda href: href and 'race.php' in href):
+			df['Race_ID'] = _link_ids(table, 'race.php', _race_link_to_id)
+		return df
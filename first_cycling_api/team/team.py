@@ -0,0 +1,57 @@
+from ..objects import FirstCyclingObject
+from .endpoints import TeamEndpoint
+from ..rider import Rider
+from ..batch import map_concurrently, DEFAULT_MAX_WORKERS
+
+class Team(FirstCyclingObject):
+	"""
+	Wrapper to load information on teams.
+
+	Attributes
+	----------
+	ID : int
+		The firstcycling.com ID for the team season from the URL of the team page, e.g. the Team_ID column of results tables.
+	client : FirstCyclingAPI
+		Client to fetch pages with. If None, uses the client set with api.use_client, or else api.fc.
+	"""
+	_default_endpoint = TeamEndpoint
+
+	def _get_response(self, **kwargs):
+		return self._get_client().get_team_endpoint(self.ID, **kwargs)
+
+	def page(self):
+		"""
+		Get the team's roster and season results.
+
+		Returns
+		-------
+		TeamEndpoint
+		"""
+		return self._get_endpoint()
+
+	def expand_roster(self, year=None, max_workers=DEFAULT_MAX_WORKERS, team=None):
+		"""
+		Get the year results of every rider on the roster, requesting them concurrently.
+
+		Parameters
+		----------
+		year : int
+			Year for which to collect results. If None, uses the team's season.
+		max_workers : int
+			Maximum number of pages to request at once.
+		team : TeamEndpoint
+			Team page to take the roster from. If None, the page is loaded.
+
+		Returns
+		-------
+		dict {int : RiderYearResults or Exception}
+			Maps Rider_ID to the rider's year results, or to the error raised when loading them.
+		"""
+		team = self.page() if team is None else team
+		if team.roster is None:
+			return {}
+		year = team.header_details['year'] if year is None else year
+		rider_ids = [int(rider_id) for rider_id in team.roster['Rider_ID'].dropna().unique()]
+		results = map_concurrently(lambda rider_id: Rider(rider_id, client=self.client).year_results(year), rider_ids,
+			max_workers=max_workers, return_exceptions=True)
+		return dict(zip(rider_ids, results))
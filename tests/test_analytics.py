@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip('scipy')
+
+import numpy as np
+import pandas as pd
+
+from first_cycling_api.analytics import ResultsMatrix, parse_gap
+
+
+def test_parse_gap():
+	assert parse_gap('06:28:18') == 0
+	assert parse_gap('+ 00') == 0
+	assert parse_gap('+ 01:12') == 72
+	assert parse_gap('+ 1:02:03') == 3723
+	assert np.isnan(parse_gap(np.nan))
+
+
+def test_results_matrix_head_to_head():
+	race_a = pd.DataFrame({'Pos': ['01', '02', '03', 'DNF', 'DNF'], 'Rider': ['A', 'B', 'C', 'D', 'E'], 'Rider_ID': [1, 2, 3, 4, 5],
+		'Time': ['04:00:00', '+ 10', np.nan, np.nan, np.nan]})
+	race_b = pd.DataFrame({'Pos': ['01', '02', '03'], 'Rider': ['B', 'A', 'D'], 'Rider_ID': [2, 1, 4],
+		'Time': ['03:00:00', '+ 30', '+ 01:00']})
+	matrix = ResultsMatrix.from_race_results({'a': race_a, 'b': race_b})
+
+	assert matrix.ranks.shape == (2, 5)
+	assert matrix.co_participation()[0, 0] == 2
+	assert matrix.co_participation()[0, 1] == 2
+
+	wins = matrix.wins()
+	assert wins[0, 1] == 1 and wins[1, 0] == 1
+	assert wins[3, 4] == 0 and wins[4, 3] == 0 # Both DNF
+	assert wins[2, 3] == 1 # Finisher ahead of DNF
+
+	record = matrix.head_to_head(1).set_index('Rider_ID')
+	assert record.loc[2, ['Races', 'Wins', 'Losses']].tolist() == [2, 1, 1]
+	assert record.loc[2, 'Mean_Gap'] == (10 - 30) / 2
+	assert record.loc[3, 'Mean_Gap'] == 10 # Blank time is the same time as the rider ahead
+	assert np.isnan(record.loc[5, 'Mean_Gap'])
+
+	rivalries = matrix.rivalries(min_races=2)
+	assert rivalries[['Rider_ID_A', 'Rider_ID_B']].values.tolist() == [[1, 2], [1, 4], [2, 4]]
+	assert rivalries.set_index(['Rider_ID_A', 'Rider_ID_B']).loc[(1, 4), ['Wins_A', 'Wins_B', 'Mean_Gap']].tolist() == [2, 0, 60 - 30]
+
+
+def test_results_matrix_matches_pairwise_joins():
+	rng = np.random.default_rng(0)
+	results = pd.concat([pd.DataFrame({'Race': race, 'Rider_ID': rng.choice(40, 15, replace=False), 'Pos': np.arange(1, 16), 'Gap': np.sort(rng.integers(0, 300, 15))})
+		for race in range(30)])
+	rivalries = ResultsMatrix(results).rivalries().set_index(['Rider_ID_A', 'Rider_ID_B'])
+
+	for (a, b), row in rivalries.sample(20, random_state=0).iterrows():
+		both = results[results['Rider_ID'] == a].merge(results[results['Rider_ID'] == b], on='Race')
+		assert row['Races'] == len(both)
+		assert row['Wins_A'] == (both['Pos_x'] < both['Pos_y']).sum()
+		assert np.isclose(row['Mean_Gap'], (both['Gap_y'] - both['Gap_x']).mean())
@@ -0,0 +1,79 @@
+from first_cycling_api import RaceEdition, Ranking
+from first_cycling_api.api import FirstCyclingAPI, fc, get_client, use_client
+from first_cycling_api.batch import map_concurrently
+from first_cycling_api.cache import ResponseCache
+from first_cycling_api.instrumentation import Metrics
+
+import requests
+import vcr
+
+my_vcr = vcr.VCR(cassette_library_dir='tests/vcr_cassettes', path_transformer=vcr.VCR.ensure_suffix('.yaml'))
+
+@my_vcr.use_cassette('race/test_2019_amstel', allow_playback_repeats=True)
+def test_clients_are_isolated():
+	cached = FirstCyclingAPI(cache=ResponseCache(), metrics=Metrics())
+	uncached = FirstCyclingAPI(metrics=Metrics())
+
+	for _ in range(2):
+		assert RaceEdition(race_id=9, year=2019, client=cached).results().results_table['Rider'].iloc[0] == 'van der Poel Mathieu'
+		RaceEdition(race_id=9, year=2019, client=uncached).results()
+
+	assert cached.metrics.counters == {'cache_misses': 1, 'requests': 1, 'bytes': cached.metrics.counters['bytes'], 'cache_hits': 1}
+	assert cached.metrics.timings['RaceEditionResults._parse_soup'].count == 2
+	assert uncached.metrics.counters['requests'] == 2
+	assert 'cache_hits' not in uncached.metrics.counters
+	assert cached._store['session'] is not uncached._store['session']
+
+
+@my_vcr.use_cassette('ranking/test_2020_UCI_ranking')
+def test_use_client_sets_context_default():
+	client = FirstCyclingAPI(metrics=Metrics())
+	assert get_client() is fc
+
+	with use_client(client):
+		assert get_client() is client
+		assert map_concurrently(lambda _: get_client(), [1, 2]) == [client, client]
+		ranking = Ranking(h=1, rank=1, y=2020, page=2)
+
+	assert get_client() is fc
+	assert len(ranking.table) == 100
+	assert client.metrics.counters['requests'] == 1
+
+
+def test_response_cache_evicts_least_recently_used():
+	cache = ResponseCache(max_entries=2)
+	cache.put('a', {'r': 1}, b'1')
+	cache.put('b', {}, b'2')
+	assert cache.get('a', {'r': 1}) == b'1'
+	cache.put('c', {}, b'3')
+	assert cache.get('b', {}) is None
+	assert cache.get('a', {'r': 1}) == b'1'
+	assert len(cache) == 2
+
+	stale = ResponseCache(ttl=0)
+	stale.put('a', {}, b'1')
+	assert stale.get('a', {}) is None
+
+
+class ThrottledSession:
+	""" Session answering 429 Too Many Requests once, then serving a ranking page. """
+	def __init__(self):
+		self.statuses = [429, 200]
+
+	def get(self, url, params=None, **kwargs):
+		response = requests.Response()
+		response.status_code, response.url = self.statuses.pop(0), url
+		response._content = b'Too many requests' if response.status_code == 429 else b'<table class="tablesorter"><tr><th>Pos</th></tr><tr><td>1</td></tr></table>'
+		return response
+
+
+def test_error_responses_are_not_cached():
+	import pytest
+
+	client = FirstCyclingAPI(session=ThrottledSession(), cache=ResponseCache())
+	with pytest.raises(requests.HTTPError):
+		Ranking(h=1, page=1, client=client)
+	assert len(client.cache) == 0
+
+	assert Ranking(h=1, page=1, client=client).table['Pos'].tolist() == [1] # Retried rather than served the error page
+	assert len(client.cache) == 1
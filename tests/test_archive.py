@@ -0,0 +1,70 @@
+from first_cycling_api import RaceEdition
+from first_cycling_api.api import fc
+from first_cycling_api.archive import ResponseArchive, reparse, resolve_endpoint
+from first_cycling_api.race.endpoints import RaceEditionResults, RaceVictoryTable
+
+import pickle
+import vcr
+
+my_vcr = vcr.VCR(cassette_library_dir='tests/vcr_cassettes/race', path_transformer=vcr.VCR.ensure_suffix('.yaml'))
+
+
+def test_resolve_endpoint():
+	assert resolve_endpoint('https://firstcycling.com/race.php', {'r': 9, 'y': 2019}) is RaceEditionResults
+	assert resolve_endpoint('https://firstcycling.com/race.php', {'r': 9, 'k': 'W'}) is RaceVictoryTable
+
+
+@my_vcr.use_cassette('test_2019_amstel')
+def test_archive_and_reparse(tmp_path):
+	archive = ResponseArchive(str(tmp_path / 'archive.db'))
+	fc.archive = archive
+	try:
+		results = RaceEdition(race_id=9, year=2019).results()
+	finally:
+		fc.archive = None
+
+	assert len(archive) == 1
+	assert archive.latest('https://firstcycling.com/race.php', {'r': 9, 'y': 2019}) == results.response
+
+	assert reparse(archive, str(tmp_path / 'parsed'), processes=1) == {}
+	with open(tmp_path / 'parsed' / '1.pkl', 'rb') as f:
+		output = pickle.load(f)
+	assert output['endpoint'] == 'RaceEditionResults'
+	assert output['fields']['results_table'].equals(results.results_table)
+
+
+def test_archive_zstd_dictionary_codec(tmp_path):
+	import pytest
+	pytest.importorskip('zstandard')
+
+	pages = [f'<html><head><title>FirstCycling</title></head><body><div class="menu">{"menu " * 200}</div><p>Page {i}</p></body></html>'.encode() for i in range(50)]
+	archive = ResponseArchive(str(tmp_path / 'archive.db'))
+	for i, page in enumerate(pages[:25]):
+		archive.append('https://firstcycling.com/rider.php', {'r': i}, page)
+
+	codec = archive.train_codec(dict_size=4096)
+	for i, page in enumerate(pages[25:], start=25):
+		archive.append('https://firstcycling.com/rider.php', {'r': i}, page)
+	assert len(codec.compress(pages[-1])) < len(pages[-1]) / 10
+
+	# Records are read back with the codec they were stored with, also from a fresh archive object
+	reopened = ResponseArchive(str(tmp_path / 'archive.db'))
+	assert [body for *_, body in reopened.records()] == pages
+
+
+def test_error_responses_are_not_archived(tmp_path):
+	import pytest
+	import requests
+	from first_cycling_api.api import FirstCyclingAPI
+
+	class FailingSession:
+		def get(self, url, params=None, **kwargs):
+			response = requests.Response()
+			response.status_code, response.url, response._content = 500, url, b'Internal Server Error'
+			return response
+
+	archive = ResponseArchive(str(tmp_path / 'archive.db'))
+	client = FirstCyclingAPI(session=FailingSession(), archive=archive)
+	with pytest.raises(requests.HTTPError):
+		RaceEdition(race_id=9, year=2019, client=client).results()
+	assert len(archive) == 0
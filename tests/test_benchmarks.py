@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+pytest.importorskip('numpy')
+pytest.importorskip('yaml')
+
+import load_test
+from mock_server import serve_in_subprocess
+
+
+def test_mock_server_throttles_fails_and_counts():
+	with serve_in_subprocess(throttle_rate=1.0, retry_after=3, seed=0) as url:
+		response = requests.get(f'{url}/race.php', params={'r': 9, 'y': 2019})
+		assert response.status_code == 429
+		assert response.headers['Retry-After'] == '3'
+		assert requests.get(f'{url}/_stats').json() == {'429': 1}
+
+	with serve_in_subprocess(failure_rate=1.0, seed=0) as url:
+		assert requests.get(f'{url}/race.php', params={'r': 9, 'y': 2019}).status_code == 500
+		assert requests.get(f'{url}/_stats').json() == {'500': 1}
+
+
+def test_load_test_runs_against_the_mock_server():
+	with serve_in_subprocess(seed=0) as url:
+		results = load_test.run(url, load_test.workload(4), workers=2, mode='batch', rate=None, max_retries=1, retry_delay=0)
+		assert requests.get(f'{url}/_stats').json() == {'200': 4}
+
+	assert results['errors'] == 0 and results['429s'] == 0 and results['5xx'] == 0
+	assert results['pages/s'] > 0
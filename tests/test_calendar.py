@@ -0,0 +1,17 @@
+from first_cycling_api.calendar.endpoints import CalendarEndpoint
+from first_cycling_api.constants import one_day_categories
+
+
+def test_calendar_category_filter():
+	html = b'''
+	<table class="tablesorter">
+		<tr><th>Date</th><th colspan="2">Race</th><th>CAT</th></tr>
+		<tr><td>16.04</td><td><img src="img/flag/NED.png"></td><td><a href="race.php?r=9&y=2023">Amstel Gold Race</a></td><td>1.WT1</td></tr>
+		<tr><td>03.04</td><td><img src="img/flag/ESP.png"></td><td><a href="race.php?r=6&y=2023">Itzulia Basque Country</a></td><td>2.WT1</td></tr>
+	</table>
+	'''
+	calendar = CalendarEndpoint(html)
+	assert len(calendar.races()) == 2
+	one_day_races = calendar.races(categories=one_day_categories)
+	assert one_day_races['Race_ID'].tolist() == ['9']
+	assert one_day_races['Race_Country'].iloc[0] == 'NED'
@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from first_cycling_api.distributed import RedisTaskQueue, run_worker
+from first_cycling_api.jobs import CrawlJob
+from first_cycling_api.objects import FirstCyclingObject
+from first_cycling_api.endpoints import Endpoint
+from first_cycling_api.ratelimit import RedisRateLimiter
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+class EchoObject(FirstCyclingObject):
+	def _get_response(self, **kwargs):
+		if kwargs['page'] < 0:
+			raise ValueError('No such page')
+		return f'{self.ID}-{kwargs["page"]}'.encode()
+
+	def page(self, page):
+		return self._get_endpoint(endpoint=Endpoint, page=page)
+
+
+def test_redis_queue_shared_by_workers():
+	server = fakeredis.FakeServer()
+	producer = CrawlJob(queue=RedisTaskQueue(fakeredis.FakeRedis(server=server)))
+	for page in range(-1, 5):
+		producer.add(EchoObject(7), 'page', page=page)
+
+	# Two "machines" with their own connections pull from the same queue
+	rate_limiter = RedisRateLimiter(fakeredis.FakeRedis(server=server), rate=100)
+	for _ in range(2):
+		run_worker(RedisTaskQueue(fakeredis.FakeRedis(server=server)), workers=2, rate_limiter=rate_limiter, retry_delay=0, poll_interval=0.01)
+
+	assert producer.status() == {'done': 5, 'failed': 1}
+	assert list(producer.errors().values()) == ["ValueError('No such page')"]
+	assert sorted(endpoint.response for _, endpoint in producer.results()) == [b'7-0', b'7-1', b'7-2', b'7-3', b'7-4']
+
+
+def test_redis_queue_claims_each_task_once():
+	import threading
+
+	server = fakeredis.FakeServer()
+	queue = RedisTaskQueue(fakeredis.FakeRedis(server=server), lease=0.05)
+	for page in range(20):
+		queue.put('EchoObject', [7], 'page', {'page': page})
+
+	claimed = []
+	def claim_all():
+		worker_queue = RedisTaskQueue(fakeredis.FakeRedis(server=server), lease=60)
+		while (task := worker_queue.claim()) is not None:
+			claimed.append(task['id'])
+	threads = [threading.Thread(target=claim_all) for _ in range(4)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+	assert sorted(claimed) == list(range(1, 21))
+	assert queue.counts() == {'running': 20}
+
+	time.sleep(0.06) # Every lease expires
+	other = RedisTaskQueue(fakeredis.FakeRedis(server=server), lease=0.05)
+	queue._requeue_due()
+	other._requeue_due()
+	assert queue.counts() == {'pending': 20}
+
+
+def test_redis_queue_put_is_atomic():
+	import threading
+
+	server = fakeredis.FakeServer()
+	ids = []
+	def put_all():
+		producer_queue = RedisTaskQueue(fakeredis.FakeRedis(server=server))
+		for page in range(10):
+			ids.append(producer_queue.put('EchoObject', [7], 'page', {'page': page}))
+	threads = [threading.Thread(target=put_all) for _ in range(4)]
+	for thread in threads:
+		thread.start()
+	for thread in threads:
+		thread.join()
+
+	# Each task is added and queued exactly once, whichever producer got there first
+	queue = RedisTaskQueue(fakeredis.FakeRedis(server=server))
+	assert len(set(ids)) == 10
+	assert queue.counts() == {'pending': 10}
+	assert sorted(int(task_id) for task_id in queue.client.lrange(queue._key('pending'), 0, -1)) == sorted(set(ids))
+
+	# A producer dying before the transaction is applied leaves no deduplicated task behind
+	client = fakeredis.FakeRedis(server=server)
+	class DyingPipeline(type(client.pipeline())):
+		def execute(self, *args, **kwargs):
+			if self.command_stack:
+				raise ConnectionError('Producer killed')
+			return super().execute(*args, **kwargs)
+	client.pipeline = lambda: DyingPipeline(client.connection_pool, client.response_callbacks, True, None)
+	with pytest.raises(ConnectionError):
+		RedisTaskQueue(client).put('EchoObject', [7], 'page', {'page': 10})
+	assert queue.put('EchoObject', [7], 'page', {'page': 10}) not in ids
+	assert queue.counts() == {'pending': 11}
+
+
+def test_redis_queue_expired_leases_count_as_attempts():
+	queue = RedisTaskQueue(fakeredis.FakeRedis(), lease=-1) # Every lease has expired once taken
+	queue.put('EchoObject', [7], 'page', {'page': 0})
+	assert [queue.claim(max_retries=3)['attempts'] for _ in range(3)] == [0, 1, 2]
+
+	# The worker running the third attempt is killed too, so the task fails instead of being claimed again
+	assert queue.claim(max_retries=3) is None
+	assert queue.counts() == {'failed': 1}
+	assert [(task['attempts'], task['error']) for task in queue.tasks()] == [(3, 'Lease expired')]
@@ -0,0 +1,25 @@
+from first_cycling_api import RaceEdition
+from first_cycling_api.instrumentation import collect, timer, enabled
+
+import vcr
+
+my_vcr = vcr.VCR(cassette_library_dir='tests/vcr_cassettes/race', path_transformer=vcr.VCR.ensure_suffix('.yaml'))
+
+@my_vcr.use_cassette('test_2019_amstel')
+def test_collect_amstel_timings():
+	with collect() as metrics:
+		RaceEdition(race_id=9, year=2019).results()
+	result = metrics.to_dict()
+
+	for stage in ('fetch', 'soup', 'RaceEditionResults._parse_soup', 'RaceEditionResults._get_results_table', 'parse_table.read_html', 'parse_table.postprocess'):
+		assert result['timings'][stage]['count'] >= 1
+	assert result['timings']['fetch']['count'] == 1
+	assert result['counters']['requests'] == 1
+	assert result['counters']['bytes'] > 100000
+	assert 'first_cycling_api_duration_seconds_count{stage="fetch"} 1' in metrics.to_prometheus()
+
+
+def test_disabled_by_default():
+	assert not enabled()
+	with timer('unused'):
+		pass
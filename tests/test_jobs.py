@@ -0,0 +1,87 @@
+from first_cycling_api.jobs import CrawlJob
+from first_cycling_api.objects import FirstCyclingObject
+from first_cycling_api.endpoints import Endpoint
+
+
+class FlakyObject(FirstCyclingObject):
+	""" Object whose pages fail on their first request. """
+	requests = []
+
+	def _get_response(self, **kwargs):
+		FlakyObject.requests.append((self.ID, kwargs['page']))
+		if FlakyObject.requests.count((self.ID, kwargs['page'])) == 1:
+			raise ConnectionError('Transient error')
+		return f'{self.ID}-{kwargs["page"]}'.encode()
+
+	def page(self, page):
+		return self._get_endpoint(endpoint=Endpoint, page=page)
+
+
+def test_crawl_job_retries_and_resumes(tmp_path):
+	path = str(tmp_path / 'job.db')
+	job = CrawlJob(path)
+	for page in range(3):
+		job.add(FlakyObject(1), 'page', page=page)
+	job.add(FlakyObject(1), 'page', page=0) # Duplicate tasks are ignored
+
+	assert job.run(workers=2, retry_delay=0, poll_interval=0.01) == {'done': 3}
+	assert len(FlakyObject.requests) == 6
+	assert sorted(endpoint.response for _, endpoint in job.results()) == [b'1-0', b'1-1', b'1-2']
+
+	# Reopening a finished job does not repeat any requests
+	assert CrawlJob(path).run(workers=2) == {'done': 3}
+	assert len(FlakyObject.requests) == 6
+
+
+class LimiterObject(FirstCyclingObject):
+	""" Object recording the rate limiter of the client each page is fetched with, and of the job's client meanwhile. """
+	seen, client, client_seen = [], None, []
+
+	def _get_response(self, **kwargs):
+		from first_cycling_api.api import get_client
+		LimiterObject.seen.append(get_client().rate_limiter)
+		LimiterObject.client_seen.append(LimiterObject.client.rate_limiter)
+		return b''
+
+	def page(self, page):
+		return self._get_endpoint(endpoint=Endpoint, page=page)
+
+
+def test_crawl_job_rate_limiter_does_not_change_the_client(tmp_path):
+	from first_cycling_api.api import FirstCyclingAPI
+	from first_cycling_api.ratelimit import RateLimiter
+
+	own, crawl = RateLimiter(rate=100), RateLimiter(rate=100)
+	client = LimiterObject.client = FirstCyclingAPI(rate_limiter=own)
+	job = CrawlJob(str(tmp_path / 'job.db'))
+	for page in range(4):
+		job.add(LimiterObject(1), 'page', page=page)
+
+	assert job.run(workers=2, rate_limiter=crawl, client=client, poll_interval=0.01) == {'done': 4}
+	assert LimiterObject.seen == [crawl] * 4
+	assert LimiterObject.client_seen == [own] * 4 # Interactive users of the client keep its rate limiter during the run
+	assert client.rate_limiter is own
+
+
+def test_crawl_job_rejects_process_local_rate_limiter_for_processes(tmp_path):
+	import pytest
+	from first_cycling_api.ratelimit import RateLimiter
+
+	job = CrawlJob(str(tmp_path / 'job.db'))
+	job.add(LimiterObject(1), 'page', page=0)
+	with pytest.raises(ValueError):
+		job.run(workers=2, processes=True, rate_limiter=RateLimiter(rate=10))
+	assert job.status() == {'pending': 1}
+
+
+def test_expired_leases_count_as_attempts(tmp_path):
+	from first_cycling_api.jobs import SQLiteTaskQueue
+
+	queue = SQLiteTaskQueue(str(tmp_path / 'job.db'), lease=-1) # Every lease has expired once taken
+	queue.put('LimiterObject', [1], 'page', {'page': 0})
+	assert [queue.claim(max_retries=3)['attempts'] for _ in range(3)] == [0, 1, 2]
+
+	# The worker running the third attempt is killed too, so the task fails instead of being claimed again
+	assert queue.claim(max_retries=3) is None
+	assert queue.counts() == {'failed': 1}
+	assert [(task['attempts'], task['error']) for task in queue.tasks()] == [(3, 'Lease expired')]
@@ -0,0 +1,43 @@
+from first_cycling_api import RaceEdition
+from first_cycling_api.instrumentation import Metrics, add_hook, collect, remove_hook
+from first_cycling_api.partitions import concat_partitions, map_partitions, parse_record
+
+import vcr
+
+my_vcr = vcr.VCR(cassette_library_dir='tests/vcr_cassettes/race', path_transformer=vcr.VCR.ensure_suffix('.yaml'))
+
+URL = 'https://firstcycling.com/race.php'
+
+
+@my_vcr.use_cassette('test_2019_amstel')
+def test_map_partitions_parses_raw_records():
+	results = RaceEdition(race_id=9, year=2019).results()
+	records = [(URL, {'r': 9, 'y': 2019}, results.response), (URL, {'r': 9, 'y': 2018}, b'')] * 3
+
+	tables = concat_partitions(map_partitions(records, partition_size=4))
+
+	table = tables['RaceEditionResults.results_table']
+	assert len(table) == 3 * len(results.results_table)
+	assert table['Source_Params'].unique().tolist() == ['{"r": 9, "y": 2019}']
+	assert table.drop(columns=['Source_URL', 'Source_Params']).head(len(results.results_table)).equals(results.results_table)
+	assert len(tables['RaceEditionResults.header_details']) == 3
+	assert tables['errors']['Source_Params'].tolist() == ['{"r": 9, "y": 2018}'] * 3
+
+
+@my_vcr.use_cassette('test_2019_amstel')
+def test_from_bytes_has_no_side_effects():
+	response = RaceEdition(race_id=9, year=2019).results().response
+	metrics, calls = Metrics(), []
+	def hook(*call):
+		calls.append(call)
+
+	add_hook(hook)
+	try:
+		with collect(metrics):
+			endpoint = parse_record(URL, {'r': 9, 'y': 2019}, memoryview(response))
+		assert not calls and not metrics.counters and not metrics.timings
+		type(endpoint)(response)
+		assert calls # Parsing directly still reaches the hook
+	finally:
+		remove_hook(hook)
+	assert endpoint.response == response
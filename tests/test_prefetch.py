@@ -0,0 +1,74 @@
+import time
+
+from first_cycling_api import Ranking
+from first_cycling_api.api import FirstCyclingAPI
+from first_cycling_api.cache import ResponseCache
+from first_cycling_api.prefetch import Prefetcher, next_ranking_page, next_stage, previous_rider_year
+
+
+class SlowSession:
+	""" Session returning canned ranking pages after a delay. """
+	def __init__(self, delay):
+		self.delay = delay
+		self.requests = []
+
+	def get(self, url, params):
+		self.requests.append(dict(params))
+		time.sleep(self.delay)
+		page = int(params.get('page', 1))
+		links = ' '.join(f'<a href="ranking.php?h=1&page={p}">{p}</a>' for p in range(1, 5))
+		return type('Response', (), {'content': f'<html><body><p>{links}</p><table class="tablesorter"><tr><th>Pos</th></tr><tr><td>{page}</td></tr></table></body></html>'.encode(), 'raise_for_status': staticmethod(lambda: None)})
+
+
+def test_rules():
+	assert next_ranking_page({'h': 1, 'page': 2}, b'<a href="ranking.php?h=1&page=3">3</a>') == [{'h': 1, 'page': 3}]
+	assert next_ranking_page({'h': 1, 'page': 3}, b'<a href="ranking.php?h=1&page=3">3</a>') == []
+	stages = b'<select name="e"><option value="">GC</option><option value="00">Stage: Prologue</option><option value="05" selected>Stage: 05</option><option value="06">Stage: 06</option></select>'
+	assert next_stage({'r': 6, 'y': 2022, 'e': '00'}, stages) == []
+	assert next_stage({'r': 6, 'y': 2022, 'e': '05'}, stages) == [{'r': 6, 'y': 2022, 'e': '06'}]
+	assert next_stage({'r': 6, 'y': 2022, 'e': '06'}, stages) == [] # Final stage
+	assert next_stage({'r': 6, 'y': 2022, 'e': 'all'}, stages) == []
+
+	years = b'<p class="sidemeny2"><a name="2021" class="2021 year">2021</a> <a name="2020" class="2020 year valgt">2020</a> <a name="2018" class="2018 year">2018</a></p>'
+	assert previous_rider_year({'r': 18655, 'y': 2020}, years) == [{'r': 18655, 'y': 2018}]
+	assert previous_rider_year({'r': 18655}, years) == [{'r': 18655, 'y': 2018}]
+	assert previous_rider_year({'r': 18655, 'y': 2018}, years) == []
+	assert previous_rider_year({'r': 18655, 'high': 1}, years) == []
+
+
+def test_sequential_ranking_pages_are_prefetched():
+	session = SlowSession(delay=0.1)
+	client = FirstCyclingAPI(session=session, prefetcher=Prefetcher())
+
+	for page in range(1, 5):
+		assert Ranking(h=1, page=page, client=client).table['Pos'].iloc[0] == page
+
+	assert [params.get('page', 1) for params in session.requests] == [1, 2, 3, 4]
+	assert client.prefetcher.stats() == {'issued': 3, 'hits': 3, 'wasted': 0, 'failed': 0, 'pending': 0, 'hit_rate': 1.0, 'waste_rate': 0.0}
+
+
+def test_cached_pages_are_not_prefetched():
+	session = SlowSession(delay=0)
+	client = FirstCyclingAPI(session=session, cache=ResponseCache(), prefetcher=Prefetcher())
+	for page in (2, 3):
+		Ranking(h=1, page=page, client=client)
+	client.prefetcher.take(client['ranking.php'].url(), {'h': 1, 'page': 4}) # Wait for the prefetch of page 4
+	session.requests.clear()
+
+	Ranking(h=1, page=1, client=client) # Pages 2 to 4 are cached
+	Ranking(h=1, page=2, client=client) # Cache hit, so nothing is scheduled
+	client.prefetcher.close()
+
+	assert session.requests == [{'h': 1, 'page': 1}]
+	assert client.prefetcher.stats()['issued'] == 2
+
+
+def test_unused_prefetches_count_as_waste():
+	client = FirstCyclingAPI(session=SlowSession(delay=0), prefetcher=Prefetcher(max_pending=1))
+	Ranking(h=1, page=1, client=client)
+	Ranking(h=2, page=1, client=client) # Evicts the prefetch of page 2 for h=1
+	client.prefetcher.close()
+
+	stats = client.prefetcher.stats()
+	assert stats['issued'] == 2 and stats['hits'] == 0 and stats['wasted'] == 2
+	assert stats['waste_rate'] == 1.0
@@ -53,3 +53,123 @@ def test_2023_basque():
     assert results_2023.results_table['Rider'].iloc[0] == 'Vingegaard Jonas'
     assert len(results_2023.standings['youth']) == 26
     assert results_2023.standings['youth']['Rider'].iloc[0] == 'McNulty Brandon'
+
+
+
+@my_vcr.use_cassette('test_2023_basque')
+def test_partial_parse_matches_full_tree():
+    from first_cycling_api.race.endpoints import RaceEditionResults
+
+    results = RaceEdition(race_id=6, year=2023).results()
+    full = RaceEditionResults(results.response, full_tree=True)
+
+    assert results.header_details == full.header_details
+    assert results.results_table.equals(full.results_table)
+    assert results.standings.keys() == full.standings.keys()
+    assert all(results.standings[k].equals(full.standings[k]) for k in full.standings)
+    assert len(list(results.soup.descendants)) < len(list(full.soup.descendants))
+
+
+@my_vcr.use_cassette('test_2023_basque')
+def test_endpoint_pickles_without_soup():
+    import pickle
+    import pytest
+    import copy as copy_module
+    from first_cycling_api.endpoints import MissingResponseError, keep_responses, to_frames, from_frames
+
+    results = RaceEdition(race_id=6, year=2023).results()
+    for copy in (copy_module.copy(results), copy_module.deepcopy(results)): # Copies are not pickles and keep the response
+        assert copy.response == results.response
+        assert copy.soup.h1.text == results.soup.h1.text
+
+    data = pickle.dumps(results, protocol=4)
+    assert len(data) < len(results.response) / 4
+    for copy in (pickle.loads(data), from_frames(to_frames(results))):
+        assert copy.response is None
+        assert copy.results_table.equals(results.results_table)
+        with pytest.raises(MissingResponseError):
+            copy.soup
+
+    with keep_responses():
+        data = pickle.dumps(results, protocol=4)
+    for copy in (pickle.loads(data), from_frames(to_frames(results, keep_response=True))):
+        assert 'soup' not in vars(copy)
+        assert copy.response == results.response
+        assert copy.results_table.equals(results.results_table)
+        assert all(copy.standings[k].equals(results.standings[k]) for k in results.standings)
+        assert copy.soup.h1.text == results.soup.h1.text # Rebuilt on access
+
+def test_stage_profiles_parsing():
+    from first_cycling_api.race.endpoints import RaceStageProfiles
+    from first_cycling_api.constants import Profile
+
+    html = b'''
+    <div class="left"><h1>Itzulia Basque Country <span>- 2023</span></h1><p class="left"></p></div>
+    <select name="y"><option value="2023">2023</option></select>
+    <table class="tablesorter">
+        <tr><th>Stage</th><th>Date</th><th></th><th>Start - Finish</th><th>km</th></tr>
+        <tr><td><a href="race.php?r=6&y=2023&e=01">01</a></td><td>03.04</td><td><img src="img/Smaakupert.png"></td><td>Vitoria-Gasteiz - Vitoria-Gasteiz</td><td>165.6</td></tr>
+        <tr><td><a href="race.php?r=6&y=2023&e=02">02</a></td><td>04.04</td><td><img src="img/Fjell-MF.png"></td><td>Viana - Leitza</td><td>186.3</td></tr>
+    </table>
+    '''
+    profiles = RaceStageProfiles(html)
+    assert profiles.stages_table['Stage'].tolist() == [1, 2]
+    assert profiles.stages_table['Profile'].iloc[1] == Profile['Fjell-MF.png']
+    assert profiles.stages_table['Date'].iloc[0].isoformat() == '2023-04-03'
+    assert profiles.stages_table['Distance'].iloc[0] == 165.6
+    assert profiles.stages_table['Finish'].iloc[1] == 'Leitza'
+
+
+def test_youngest_oldest_winners_parsing():
+    from first_cycling_api.race.endpoints import RaceYoungestOldestWinners
+
+    table = '''<table class="tablesorter">
+        <tr><th>Year</th><th>Rider</th><th>Age</th></tr>
+        <tr><td>{year}</td><td><img src="img/flag/{nat}.png"> <a href="rider.php?r={rider_id}">{name}</a></td><td>{age}</td></tr>
+    </table>'''
+    html = f'''
+    <div class="left"><h1>Amstel Gold Race</h1></div>
+    <select name="y"><option value="2019">2019</option></select>
+    {table.format(year=2019, nat='NED', rider_id=16672, name='van der Poel Mathieu', age='24 years')}
+    {table.format(year=1982, nat='NED', rider_id=1, name='Raas Jan', age='33 years')}
+    '''.encode()
+    winners = RaceYoungestOldestWinners(html)
+    assert winners.youngest_table['Rider_ID'].iloc[0] == 16672
+    assert winners.oldest_table['Rider'].iloc[0] == 'Raas Jan'
+    assert winners.oldest_table['Rider_Country'].iloc[0] == 'NED'
+
+
+class CannedSession:
+    """ Session returning the given response bodies in turn. """
+    def __init__(self, bodies):
+        self.bodies = list(bodies)
+
+    def get(self, url, params):
+        return type('Response', (), {'content': self.bodies.pop(0), 'raise_for_status': staticmethod(lambda: None)})
+
+
+@my_vcr.use_cassette('test_2022_basque', allow_playback_repeats=True)
+def test_live_results_emit_changed_rows():
+    import asyncio
+    from first_cycling_api.api import FirstCyclingAPI, fc
+    from first_cycling_api.race.live import LiveResults
+
+    live = LiveResults(race_id=6, year=2022, interval=0)
+    updates = {update.table: update.rows for update in live.poll()}
+    assert len(updates['results']) == 156
+    assert (updates['results']['Change'] == 'inserted').all()
+
+    assert live.poll() == []
+    assert live.unchanged == 1
+
+    page = fc.get_race_endpoint(6, y=2022)
+    live.client = FirstCyclingAPI(session=CannedSession([page.replace(b'21:59:36', b'21:59:37', 1), page.replace(b'21:59:36', b'21:59:37', 1)]))
+
+    async def collect_updates():
+        return [update async for update in live.updates(max_polls=4)]
+
+    updates = asyncio.run(collect_updates())
+    assert [update.table for update in updates] == ['results']
+    assert updates[0].rows['Rider'].tolist() == ['Martinez Daniel']
+    assert updates[0].rows['Change'].tolist() == ['changed']
+    assert live.polls == 4 and live.unchanged == 2
@@ -1,4 +1,4 @@
-from first_cycling_api import Ranking
+from first_cycling_api import Ranking, RankingHistory, PointsRanking
 
 import vcr
 
@@ -21,3 +21,90 @@ def test_2018_women_junior_fc_ranking():
 	ranking = Ranking(k='fc', rank='wjr', y=2018)
 	assert len(ranking.table) == 100
 	assert ranking.table['Points'].iloc[0] == 2286
+
+def test_ranking_history_deltas():
+	import pandas as pd
+	from first_cycling_api.ranking.history import weeks_between
+
+	weeks = weeks_between('2020-52', '2021-3')
+	assert weeks == ['2020-52', '2020-53', '2021-1', '2021-2', '2021-3']
+
+	tables = [
+		pd.DataFrame({'Pos': [1, 2, 3], 'Rider': ['A', 'B', 'C'], 'Points': [300, 200, 100], 'Rider_ID': [1, 2, 3]}),
+		pd.DataFrame({'Pos': [1, 2, 3], 'Rider': ['A', 'C', 'B'], 'Points': [300, 250, 200], 'Rider_ID': [1, 3, 2]}),
+		pd.DataFrame({'Pos': [1, 2, 3], 'Rider': ['A', 'C', 'D'], 'Points': [300, 250, 210], 'Rider_ID': [1, 3, 4]}),
+		pd.DataFrame({'Pos': [1, 2, 3], 'Rider': ['A', 'C', 'D'], 'Points': [300, 250, 210], 'Rider_ID': [1, 3, 4]}),
+		pd.DataFrame({'Pos': [1, 2], 'Rider': ['D', 'A'], 'Points': [400, 300], 'Rider_ID': [4, 1]}),
+	]
+	history = RankingHistory(keyframe_interval=4)
+	for week, table in zip(weeks, tables):
+		history.add_week(week, table)
+
+	assert len(history._deltas['2021-2'][0]) == 0 # Unchanged week stores nothing
+	for week, table in zip(weeks, tables):
+		snapshot = history.snapshot(week)
+		assert snapshot['Rider_ID'].tolist() == table['Rider_ID'].tolist()
+		assert snapshot['Points'].tolist() == table['Points'].tolist()
+
+	long = history.to_frame()
+	assert len(long) == sum(len(t) for t in tables)
+	assert long.query('Rider_ID == 4')['week'].tolist() == ['2021-1', '2021-2', '2021-3']
+	assert history.riders[4] == 'D'
+
+	import pytest
+	with pytest.raises(ValueError):
+		history.add_week('2021-2', tables[0]) # Out of order weeks would corrupt the deltas
+
+
+def test_ranking_history_load_orders_weeks_and_records_missing_ones(monkeypatch):
+	import pandas as pd
+	from first_cycling_api.ranking import history as history_module
+
+	class FakeRanking:
+		def __init__(self, y, page, **kwargs):
+			self.table = None if y == '2021-2' else pd.DataFrame({'Pos': [1], 'Points': [int(y.split('-')[1])], 'Rider_ID': [1]})
+	monkeypatch.setattr(history_module, 'Ranking', FakeRanking)
+
+	history = RankingHistory()
+	history.load(['2021-3', '2021-1', '2021-2'])
+	assert history.weeks == ['2021-1', '2021-3']
+	assert history.missing_weeks == ['2021-2']
+	assert history.snapshot('2021-3')['Points'].tolist() == [3]
+
+
+def test_points_ranking_window_and_filters():
+	import pandas as pd
+
+	riders = pd.DataFrame({'Birth_Year': [1990, 2001]}, index=pd.Index([1, 2], name='Rider_ID'))
+	ranking = PointsRanking(weeks=52, riders=riders)
+	ranking.add_results(pd.DataFrame({'Rider_ID': [1, 2, 3], 'Rider': ['A', 'B', 'C'], 'Rider_Country': ['BEL', 'BEL', 'FRA'], 'UCI': [100, 50, 50]}), date='2021-04-01', race='a')
+	ranking.add_results(pd.DataFrame({'Rider_ID': [2, 3], 'UCI': [80, None]}), date='2022-03-01', race='b')
+	ranking.add_rider_results(1, 2022, pd.DataFrame({'Date': ['15.03', '4.10'], 'Race': ['X | 1.1', 'Y | 1.1'], 'UCI': [10., 20.], 'Race_ID': [7, 8]}))
+
+	standings = ranking.standings('2021-12-31')
+	assert standings[['Rider_ID', 'Points']].values.tolist() == [[1, 100], [2, 50], [3, 50]]
+	assert standings['Pos'].tolist() == [1, 2, 2]
+
+	standings = ranking.standings('2022-13') # Race a has left the 52-week window
+	assert standings[['Rider_ID', 'Points']].values.tolist() == [[2, 80], [1, 10]]
+	assert ranking.standings('2022-10-31')['Points'].sum() == 80 + 10 + 20
+
+	assert ranking.standings('2021-12-31', nation='FRA')['Rider'].tolist() == ['C']
+	assert ranking.standings('2021-12-31', u23=True)['Rider_ID'].tolist() == [2]
+
+	ranking.add_results(pd.DataFrame({'Rider_ID': [3], 'UCI': [200]}), date='2021-04-01', race='a') # Corrected results replace the old ones
+	assert ranking.standings('2021-12-31')[['Rider_ID', 'Points']].values.tolist() == [[3, 200]]
+
+
+def test_points_ranking_replaces_race_with_zero_points():
+	import pandas as pd
+
+	ranking = PointsRanking()
+	ranking.add_results(pd.DataFrame({'Rider_ID': [1, 2], 'UCI': [100, 50]}), date='2021-04-01', race='a')
+	ranking.add_rider_results(3, 2021, pd.DataFrame({'Date': ['15.03'], 'Race': ['X | 1.1'], 'UCI': [10.], 'Race_ID': [7]}))
+	assert ranking.standings('2021-12-31')['Points'].sum() == 160
+
+	# Points withdrawn from a race, e.g. after a disqualification, remove its previous entries
+	ranking.add_results(pd.DataFrame({'Rider_ID': [1, 2], 'UCI': [0, None]}), date='2021-04-01', race='a')
+	ranking.add_rider_results(3, 2021, pd.DataFrame({'Date': ['15.03'], 'Race': ['X | 1.1'], 'UCI': [0.], 'Race_ID': [7]}))
+	assert ranking.standings('2021-12-31').empty
@@ -9,3 +9,37 @@ def test_roglic_2020_results():
 	roglic = Rider(18655)
 	results_2020 = roglic.year_results(2020)
 	assert results_2020.results_df['UCI'].max() == 850
+
+
+def test_profile_bundle_parsing():
+	from first_cycling_api.rider.endpoints import RiderProfileBundle
+
+	page = '''
+	<p>Jumbo-Visma</p>
+	<p class="sidemeny2"><a href="rider.php?r=18655&y=2020">2020</a><a href="rider.php?r=18655&y=2019">2019</a></p>
+	<table class="tablesorter">
+		<tr><th>Year</th><th>Team</th></tr>
+		{rows}
+	</table>
+	'''
+	row = '<tr><td>{year}</td><td><img src="img/flag/NED.png"> <a href="team.php?l={team_id}">{team}</a></td></tr>'
+	bundle = RiderProfileBundle({
+		'teams': page.format(rows=row.format(year=2020, team_id=17, team='Jumbo-Visma') + row.format(year=2019, team_id=16, team='Jumbo-Visma')).encode(),
+		'best_results': page.format(rows=row.format(year=2020, team_id=17, team='Jumbo-Visma')).encode(),
+	})
+	assert bundle.years_active == [2020, 2019]
+	assert bundle.header_details['current_team'] == 'Jumbo-Visma'
+	assert bundle.tables['teams']['Team_ID'].tolist() == [17, 16]
+	assert len(bundle.tables['best_results']) == 1
+
+
+def test_profile_bundle_rejects_empty_pages():
+	import pytest
+	from first_cycling_api.rider.endpoints import RiderProfileBundle
+
+	with pytest.raises(ValueError):
+		Rider(18655).profile_bundle(pages=[])
+	with pytest.raises(ValueError):
+		Rider(18655).profile_bundle(pages=['year_results'])
+	with pytest.raises(ValueError):
+		RiderProfileBundle({})
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from first_cycling_api.scheduler import DeadlineExceeded, RequestScheduler, request_priority
+
+
+class GatedFetch:
+	""" Fetch which blocks until released, recording the order requests are sent in. """
+	def __init__(self):
+		self.sent = []
+		self.gate = threading.Event()
+
+	def __call__(self, url, params):
+		self.sent.append(params['name'])
+		self.gate.wait()
+		return params['name']
+
+
+def start_request(scheduler, fetch, name, priority='normal', caller=None, timeout=None, errors=None):
+	""" Send a request from a new thread and wait until it is queued or sent. """
+	def send():
+		with request_priority(priority, caller=caller, timeout=timeout):
+			try:
+				scheduler.run(fetch, 'race.php', {'name': name}, caller='client')
+			except DeadlineExceeded as e:
+				errors.append((name, e))
+
+	queued = sum(scheduler.pending().values()) + len(fetch.sent)
+	thread = threading.Thread(target=send)
+	thread.start()
+	while sum(scheduler.pending().values()) + len(fetch.sent) == queued:
+		time.sleep(0.001)
+	return thread
+
+
+def test_interactive_requests_overtake_bulk_and_callers_take_turns():
+	scheduler = RequestScheduler(max_in_flight=1)
+	fetch = GatedFetch()
+	threads = [start_request(scheduler, fetch, 'first', priority='bulk', caller='crawl')]
+	threads += [start_request(scheduler, fetch, f'crawl {i}', priority='bulk', caller='crawl') for i in range(3)]
+	threads += [start_request(scheduler, fetch, 'backfill', priority='bulk', caller='backfill')]
+	threads += [start_request(scheduler, fetch, 'lookup', priority='interactive')]
+	assert scheduler.pending() == {'interactive': 1, 'normal': 0, 'bulk': 4}
+
+	fetch.gate.set()
+	for thread in threads:
+		thread.join()
+
+	assert fetch.sent == ['first', 'lookup', 'crawl 0', 'backfill', 'crawl 1', 'crawl 2']
+	assert scheduler.dispatched == {'interactive': 1, 'normal': 0, 'bulk': 5}
+
+
+def test_requests_fail_when_their_deadline_passes():
+	scheduler = RequestScheduler(max_in_flight=1)
+	fetch = GatedFetch()
+	errors = []
+	threads = [start_request(scheduler, fetch, 'first', priority='bulk')]
+	threads += [start_request(scheduler, fetch, 'late', timeout=0.05, errors=errors)]
+	threads += [start_request(scheduler, fetch, 'next', priority='bulk')]
+
+	threads[1].join()
+	assert [name for name, _ in errors] == ['late']
+	assert scheduler.pending() == {'interactive': 0, 'normal': 0, 'bulk': 1}
+
+	fetch.gate.set()
+	for thread in threads:
+		thread.join()
+	assert fetch.sent == ['first', 'next']
+
+
+def test_request_priority_rejects_unknown_classes():
+	with pytest.raises(ValueError):
+		with request_priority('urgent'):
+			pass
+
+
+def test_promoted_requests_overtake_bulk():
+	scheduler = RequestScheduler(max_in_flight=1)
+	fetch = GatedFetch()
+	threads = [start_request(scheduler, fetch, 'first', priority='bulk', caller='crawl')]
+	threads += [start_request(scheduler, fetch, f'crawl {i}', priority='bulk', caller='crawl') for i in range(2)]
+	threads += [start_request(scheduler, fetch, 'prefetch', priority='bulk', caller='prefetch')]
+
+	assert scheduler.promote('race.php', {'name': 'prefetch'}, 'interactive')
+	assert not scheduler.promote('race.php', {'name': 'unknown'}, 'interactive')
+	assert scheduler.pending() == {'interactive': 1, 'normal': 0, 'bulk': 2}
+
+	fetch.gate.set()
+	for thread in threads:
+		thread.join()
+	assert fetch.sent == ['first', 'prefetch', 'crawl 0', 'crawl 1']
+
+
+def test_dispatch_holds_its_slot_until_exit():
+	scheduler = RequestScheduler(max_in_flight=1)
+	fetch = GatedFetch()
+	fetch.gate.set()
+	with scheduler.dispatch('race.php', {'name': 'stream'}):
+		thread = start_request(scheduler, fetch, 'next')
+		time.sleep(0.05)
+		assert fetch.sent == [] # Waiting while the streamed body is read
+	thread.join()
+	assert fetch.sent == ['next']
@@ -0,0 +1,51 @@
+from first_cycling_api import RaceEdition, Rider
+from first_cycling_api.api import FirstCyclingAPI
+from first_cycling_api.search import NameIndex, normalize
+
+import vcr
+
+my_vcr = vcr.VCR(cassette_library_dir='tests/vcr_cassettes', path_transformer=vcr.VCR.ensure_suffix('.yaml'))
+
+def test_normalize():
+	assert normalize('POGAČAR Tadej') == 'pogacar tadej'
+	assert normalize("Kristoffer Halvorsen-Øxnevad") == 'kristoffer halvorsen oxnevad'
+	assert normalize('Liège–Bastogne–Liège') == 'liege bastogne liege'
+
+
+def test_name_index_search_and_resolve(tmp_path):
+	index = NameIndex(tmp_path / 'names.db')
+	index.add('rider', 45992, 'Pogačar Tadej')
+	index.add('rider', 18655, 'Roglič Primož')
+	index.add('team', 13198, 'Astana Pro Team')
+	index.add('race', 11, 'Liège-Bastogne-Liège')
+
+	assert index.resolve(['Tadej Pogacar', 'pogacar tadei', 'primoz roglic', 'Nobody Known']) == \
+		{'Tadej Pogacar': 45992, 'pogacar tadei': 45992, 'primoz roglic': 18655, 'Nobody Known': None}
+	assert index.resolve(['liege bastogne liege'], kind='race') == {'liege bastogne liege': 11}
+
+	matches = index.search('rog')
+	assert matches['ID'].tolist() == [18655] and matches['Match'].iat[0] == 'prefix'
+	assert index.search('astana', kind='rider').empty
+
+	index.save()
+	assert not index.add('rider', 45992, 'Pogačar Tadej')
+	index.add('rider', 45992, 'Tadej Pogačar') # Renamed entries replace the previous name
+	index.save()
+
+	reloaded = NameIndex(tmp_path / 'names.db')
+	assert len(reloaded) == 4
+	assert reloaded.name('rider', 45992) == 'Tadej Pogačar'
+	assert reloaded.search('pogacar tadej')['Match'].tolist() == ['exact']
+
+
+def test_client_collects_names():
+	index = NameIndex()
+	client = FirstCyclingAPI(name_index=index)
+	with my_vcr.use_cassette('race/test_2019_amstel'):
+		RaceEdition(race_id=9, year=2019, client=client).results()
+	with my_vcr.use_cassette('rider/test_roglic_2020_results'):
+		Rider(18655, client=client).year_results(2020)
+
+	assert index.resolve(['Mathieu van der Poel', 'Jakob Fuglsang']) == {'Mathieu van der Poel': 16672, 'Jakob Fuglsang': 264}
+	assert index.name('team', 13198) == 'Astana Pro Team'
+	assert index.name('race', 2127) == 'Slovenia RR'
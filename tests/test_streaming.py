@@ -0,0 +1,59 @@
+from first_cycling_api import Ranking
+from first_cycling_api.api import FirstCyclingAPI
+from first_cycling_api.cache import ResponseCache
+from first_cycling_api.streaming import iter_rows, stream_rows
+
+import vcr
+
+my_vcr = vcr.VCR(cassette_library_dir='tests/vcr_cassettes', path_transformer=vcr.VCR.ensure_suffix('.yaml'))
+
+@my_vcr.use_cassette('ranking/test_2020_UCI_ranking')
+def test_stream_rows_matches_parsed_table():
+	client = FirstCyclingAPI(cache=ResponseCache())
+	rows = list(stream_rows('ranking.php', table_class='tablesorter', client=client, h=1, rank=1, y=2020, page=2))
+	table = Ranking(h=1, rank=1, y=2020, page=2, client=client).table # Served from the cache filled by streaming
+
+	assert len(rows) == len(table) == 100
+	assert [row['Rider'] for row in rows] == table['Rider'].tolist()
+	assert [row['Rider_ID'] for row in rows] == table['Rider_ID'].tolist()
+	assert [row['Team_ID'] for row in rows] == table['Team_ID'].tolist()
+
+
+def test_rows_are_yielded_before_the_page_ends():
+	rows = ''.join(f'<tr><td>{i}</td><td><a href="rider.php?r={i}&y=2020">Rider {i}</a></td></tr>' for i in range(1, 201))
+	page = f'<html><body><table class="other"><tr><td>x</td></tr></table><table class="tablesorter"><tr><th>Pos</th><th>Rider</th></tr>{rows}</table></body></html>'.encode()
+	chunks = [page[i:i + 512] for i in range(0, len(page), 512)]
+
+	fed = []
+	def feed():
+		for chunk in chunks:
+			fed.append(chunk)
+			yield chunk
+
+	first_row_at = None
+	streamed = []
+	for row in iter_rows(feed(), table_class='tablesorter'):
+		first_row_at = first_row_at or len(fed)
+		streamed.append(row)
+
+	assert first_row_at < 3 < len(chunks)
+	assert len(streamed) == 200
+	assert streamed[0] == {'Pos': '1', 'Rider': 'Rider 1', 'Rider_ID': 1, 'Rider_Country': None}
+
+
+@my_vcr.use_cassette('ranking/test_2020_UCI_ranking')
+def test_stream_rows_does_not_leak_instrumentation():
+	from first_cycling_api.instrumentation import Metrics, collect, increment, _collectors
+
+	client = FirstCyclingAPI(metrics=Metrics())
+	with collect() as outer:
+		rows = stream_rows('ranking.php', table_class='tablesorter', client=client, h=1, rank=1, y=2020, page=2)
+		next(rows)
+		increment('caller') # Between rows, in the caller's context
+		next(rows)
+	assert len(list(rows)) == 98 # Finished after the outer collector has exited
+
+	assert 'caller' not in client.metrics.counters
+	assert outer.counters['caller'] == 1
+	assert client.metrics.counters['requests'] == 1
+	assert _collectors.get() == ()
@@ -0,0 +1,49 @@
+from first_cycling_api import Team
+from first_cycling_api.api import FirstCyclingAPI
+from first_cycling_api.archive import resolve_endpoint
+from first_cycling_api.team.endpoints import TeamEndpoint
+
+import requests
+import vcr
+
+my_vcr = vcr.VCR(cassette_library_dir='tests/vcr_cassettes/rider', path_transformer=vcr.VCR.ensure_suffix('.yaml'))
+
+team_page = '''
+<h1>Team Jumbo-Visma 2020</h1>
+<table class="tablesorter">
+	<tr><th></th><th>Rider</th><th>Age</th></tr>
+	<tr><td><img src="img/flag/SLO.png"></td><td><a href="rider.php?r=18655&y=2020">Roglic Primoz</a></td><td>30</td></tr>
+	<tr><td><img src="img/flag/NED.png"></td><td><a href="rider.php?r=1581&y=2020">Kruijswijk Steven</a></td><td>33</td></tr>
+</table>
+<table class="tablesorter">
+	<tr><th>Date</th><th>Race</th><th>Winner</th></tr>
+	<tr><td>08.11</td><td><a href="race.php?r=23&y=2020">Vuelta a Espana</a></td><td><a href="rider.php?r=18655&y=2020">Roglic Primoz</a></td></tr>
+</table>
+'''.encode()
+
+
+def test_team_page_parsing():
+	team = TeamEndpoint(team_page)
+	assert team.header_details == {'name': 'Team Jumbo-Visma', 'year': 2020}
+	assert team.roster['Rider_ID'].tolist() == [18655, 1581]
+	assert team.results_table['Race_ID'].tolist() == ['23']
+	assert team.results_table['Winner_ID'].tolist() == [18655]
+	assert team.results_table['Rider_ID'].tolist() == [18655]
+	assert resolve_endpoint('https://firstcycling.com/team.php', {'l': 17535}) is TeamEndpoint
+
+
+class UnavailableRiderSession(requests.Session):
+	""" Session failing every request for Kruijswijk's pages. """
+	def get(self, url, params=None, **kwargs):
+		if str(params.get('r')) == '1581':
+			raise requests.ConnectionError('Rider 1581 unavailable')
+		return super().get(url, params=params, **kwargs)
+
+
+@my_vcr.use_cassette('test_roglic_2020_results')
+def test_expand_roster():
+	client = FirstCyclingAPI(session=UnavailableRiderSession())
+	results = Team(17535, client=client).expand_roster(max_workers=2, team=TeamEndpoint(team_page))
+	assert list(results) == [18655, 1581]
+	assert results[18655].results_df['Race'].iloc[0] == 'Slovenia RR | CN'
+	assert isinstance(results[1581], requests.ConnectionError)